@@ -30,9 +30,86 @@
 # Note: line item attributes are assigned to sub components for
 #       parceling out information.
 #
+# SNI is repeated by the carousel on every bearer: SNI component frames and components
+# with the same bytes as an earlier decode are not checked and parsed again, the decode is
+# taken over from a TPEG_SNI_cache stored as Registry["SNICache"] (created on first use).
+# Registry updates of a component (e.g. the fast tuning table) are done by its register(),
+# also for decodes taken over: an earlier table sent again replaces the one sent in between.
+# Decodes that logged errors are not kept, they are parsed and reported again when repeated.
 #
-from .TPEG_error import TPEG_log_error
-from .TPEG_data_types import encodeIntUnTi, encodeIntUnLi, encodeIntUnLoMB
+#
+from .TPEG_error import TPEG_log_error, TPEG_error_count
+from .TPEG_data_types import encodeIntUnTi, encodeIntUnLi
+from .TPEG_output import TPEG_render, TPEG_render_segments, TPEG_item_segments
+from .TPEG_writer import TPEG_to_binary
+
+# SNI cache events
+SNI_ADDED   = 'added'
+SNI_UPDATED = 'updated'
+
+# per instance state not taken over from a cached decode
+_SNI_instance_state = ('Registry', '_render_key', '_render_segments')
+
+# number of SNI component frames kept
+SNI_CACHED_FRAMES = 64
+
+#
+# === class TPEG_SNI_cache ===
+#
+class TPEG_SNI_cache(object):
+    def __init__(self, listeners=()):
+        """
+        Last decode of every SNI component by (SID, component ID, level, line item attributes).
+
+        listeners are called as listener(event, key, component) when a component is decoded
+        for the first time (added) or its bytes changed (updated), after its Registry updates.
+        """
+        self.entries   = {}  # key -> (class, attr_string, decoded state)
+        self.frames    = {}  # (SID, frame bytes) -> decoded frame continuation, oldest first
+        self.listeners = list(listeners)
+
+    @staticmethod
+    def of(Registry):
+        """ cache of Registry, created on first use """
+        cache = Registry.get("SNICache")
+        if cache is None:
+            cache = Registry["SNICache"] = TPEG_SNI_cache()
+        return cache
+
+    def take_frame(self, frame, data, Registry):
+        """ take over the decoded continuation of an unchanged SNI component frame, redo its Registry updates """
+        continuation = self.frames.get((frame.SID, data))
+        if continuation is None:
+            return False
+
+        frame.frame_continuation = continuation
+        for component in continuation.components:
+            component.register(Registry)
+        return True
+
+    def store_frame(self, frame, data):
+        """ keep the decoded continuation of an SNI component frame parsed without errors """
+        if len(self.frames) >= SNI_CACHED_FRAMES:
+            del self.frames[next(iter(self.frames))]
+        self.frames[(frame.SID, data)] = frame.frame_continuation
+
+    def take(self, component, key):
+        """ take over the decode of an unchanged component, False if not cached """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not type(component) or entry[1] != component.attr_string:
+            return False
+
+        component.__dict__.update(entry[2])
+        return True
+
+    def store(self, component, key):
+        """ keep the decode of a component parsed without errors, notify the listeners """
+        event = SNI_UPDATED if key in self.entries else SNI_ADDED
+        state = {name: value for name, value in component.__dict__.items() if name not in _SNI_instance_state}
+        self.entries[key] = (type(component), component.attr_string, state)
+
+        for listener in self.listeners:
+            listener(event, key, component)
 
 
 #
@@ -57,6 +134,9 @@ class TPEG_SNI_base_component(object):
         self.subcomponents = []
         self.componentsDict = componentsDict
 
+        self._render_key = None  # cached output, see render()
+        self._render_segments = None
+
     def parse_attributes(self, TPEGstring):
         # default behavior: store attribute bytes as string
         pass
@@ -86,57 +166,74 @@ class TPEG_SNI_base_component(object):
 
         return Component
 
-    def attributes_out(self):
+    #
+    # pretty print, rendered into a TPEG_output (see TPEG_output.py)
+    #
+    def attributes_out(self, output=None):
         # print attributes
-        print(self.levelprefix + "  " + "Attributes:")
-        # first pass: determine max length of attributes
-        length = 0
-        for [i, j] in self.attributes:
-            if len(i) > length:
-                if i != '_raw_':
-                    length = len(i)
-        # second pass; pretty print attributes (aligned)
-        for [i, j] in self.attributes:
-            if i != '_raw_':
-                if len(i) < length:
-                    for k in range(length - len(i)):
-                        i = i + ' '
-                print(self.levelprefix + "  +", i, "=", j)
-
-    def out(self):
+        TPEG_render(self.render_attributes, output)
+
+    def out(self, output=None):
         # print component
+        TPEG_render(self.render, output)
+
+    def render_attributes(self, output):
+        TPEG_render_segments(self.attribute_segments(), output)
+
+    def attribute_segments(self):
+        return [self.levelprefix + "  " + "Attributes:\n"] + \
+               TPEG_item_segments(self.levelprefix, self.attributes, skip=('_raw_',), complex_nodes=False)
+
+    def segments(self):
+        segments = []
         if self.id == 0:
-            print("")
+            segments.append("\n")
 
-        print(
-                          self.levelprefix + self.name + ", ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type)
+        segments.append(self.levelprefix + self.name + ", ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + "\n")
         if len(self.attributes) > 0:
-            self.attributes_out()
+            segments.extend(self.attribute_segments())
+
+        segments.extend(self.subcomponents)
+
+        return segments
+
+    def render(self, output):
+        # the text of this component is cached, only the sub components are rendered again
+        key = (len(self.attributes), len(self.subcomponents))
+        if self._render_key != key:
+            self._render_segments = self.segments()
+            self._render_key = key
 
-        for comp in self.subcomponents:
-            comp.out()
+        TPEG_render_segments(self._render_segments, output)
 
     #
     # Trailer to be printed after toplevel component in frame
-    def component_trailer_out(self):
-        print(
-                          self.levelprefix + "---- End " + self.name + " -- (Component ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + ") ----\n")
+    def component_trailer_out(self, output=None):
+        TPEG_render(self.render_trailer, output)
+
+    def render_trailer(self, output):
+        output.write(self.levelprefix + "---- End " + self.name + " -- (Component ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + ") ----\n\n")
 
     #
     #
     # re-compose component as binary string
     def to_binary(self):
-        comp_string = b''
-        for component in self.subcomponents:
-            comp_string += component.to_binary()
+        return TPEG_to_binary(self)
 
-        # SNI component does not encode length of attributes; 'line items' including leading attributes are associated with sub components
-        binary_string = self.attr_string + comp_string
+    def write_binary(self, writer):
+        # include line item attribute prefix (e.g. for bearer and linkage information) here
+        writer.write(self.line_attr_string)
+        writer.IntUnTi(self.id)
 
         # SNI component does encode lenght of component as IntUnLi
-        # include line item attribute prefix (e.g. for bearer and linkage information) here
-        #
-        return self.line_attr_string + self.id.to_bytes(1, 'big') + encodeIntUnLi(len(binary_string)) + binary_string
+        pos = writer.reserve(2)
+
+        # SNI component does not encode length of attributes; 'line items' including leading attributes are associated with sub components
+        writer.write(self.attr_string)
+        for component in self.subcomponents:
+            component.write_binary(writer)
+
+        writer.patch_IntUnLi(pos, writer.len() - pos - 2)
 
     #
     # overall parse command
@@ -163,6 +260,13 @@ class TPEG_SNI_base_component(object):
         # store attribute_string, any sub components are included in this string
         self.attr_string = bytes(COMPstring.data)
 
+        # repetition of the last decode of this component: nothing to parse
+        cache = TPEG_SNI_cache.of(Registry)
+        key   = (Registry.get("SID"), self.id, self.level, self.line_attr_string)
+        if cache.take(self, key):
+            self.register(Registry)
+            return
+
         #
         # check original string for reconstruction
         comp_string = self.line_attr_string
@@ -170,6 +274,7 @@ class TPEG_SNI_base_component(object):
         comp_string += encodeIntUnLi(self.comp_length)
         comp_string += self.attr_string
 
+        errors = TPEG_error_count()
         self.parse_attributes(COMPstring)
 
         # create reconstruction string
@@ -179,9 +284,21 @@ class TPEG_SNI_base_component(object):
         if comp_string != rec_string:
             TPEG_log_error(self.levelprefix + '==> ' + self.name + " Comp ID %2d" % self.id,
                            "to_binary() function does not yield original string")
+
+        self.register(Registry)
+
+        # decodes with errors are parsed (and reported) again on every repetition
+        if TPEG_error_count() == errors:
+            cache.store(self, key)
         #
         return
 
+    #
+    # Registry updates of the decoded component, none by default
+    #
+    def register(self, Registry):
+        pass
+
 
 if __name__ == '__main__':
     print("TPEG_SNI_base_component")
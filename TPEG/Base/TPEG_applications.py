@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# Registry of TPEG applications
+#
+# Maps the application ID (AID) to the frame continuation class of the application.
+# Applications are registered by name ("module:class") and imported on first use, i.e.
+# when an SNI fast tuning table or a frame refers to the AID, so the application modules
+# and their code tables are not loaded by tools never seeing them.
+#
+# Applications of other packages are found through the entry point group
+# "tpeg.applications": entry point name is the AID, value the frame continuation class,
+# e.g. in pyproject.toml:
+#
+#   [project.entry-points."tpeg.applications"]
+#   10 = "tpeg_pkm.TPEG_PKM:TPEG_PKM_frame_continuation"
+#
+import importlib
+
+from .TPEG_error import TPEG_log_error
+
+TPEG_ENTRY_POINT_GROUP = "tpeg.applications"
+
+# applications of this package
+TPEG_APPLICATIONS = {
+    0:  "TpegApps.TPEG_SNI:TPEG_SNI_frame_continuation",
+    5:  "TpegApps.TPEG_TEC:TPEG_TEC_frame_continuation",
+    7:  "TpegApps.TPEG_TFP:TPEG_TFP_frame_continuation",
+    15: "TpegApps.TPEG_EAW:TPEG_EAW_frame_continuation",
+    }
+
+# === class TPEG_application_registry ===
+class TPEG_application_registry(object):
+    """
+    AID -> frame continuation class, to be passed as ApplicationFramesDict.
+
+    Lookups behave as a dictionary: unknown AIDs and applications failing to import raise
+    KeyError, which makes the component frame skip the frame.
+    """
+
+    def __init__(self, applications=TPEG_APPLICATIONS, entry_points=True):
+        # AID -> "module:class" or class
+        self.applications = dict(applications)
+        # AID -> class, resolved applications
+        self.resolved     = {}
+        # AIDs failed to import, reported once
+        self.failed       = set()
+        self.entry_points = entry_points
+
+    def register(self, AID, application):
+        """ register a frame continuation class or its name "module:class" for AID """
+        self.applications[AID] = application
+        self.resolved.pop(AID, None)
+        self.failed.discard(AID)
+
+    def _load_entry_points(self):
+        # read once, on the first AID not registered; registered applications take precedence
+        self.entry_points = False
+        try:
+            from importlib.metadata import entry_points
+            found = entry_points()
+            found = found.select(group=TPEG_ENTRY_POINT_GROUP) if hasattr(found, "select") \
+                else found.get(TPEG_ENTRY_POINT_GROUP, [])
+        except Exception as e:
+            TPEG_log_error("==> TPEG applications: entry points not readable: %s" % e)
+            return
+
+        for entry in found:
+            try:
+                AID = int(entry.name)
+            except ValueError:
+                TPEG_log_error("==> TPEG applications: entry point %s is no AID, skipped" % entry.name)
+                continue
+            self.applications.setdefault(AID, entry.value)
+
+    def _resolve(self, application):
+        if not isinstance(application, str):
+            return application
+
+        module, _, name = application.partition(":")
+        return getattr(importlib.import_module(module), name)
+
+    def __getitem__(self, AID):
+        application = self.resolved.get(AID)
+        if application is not None:
+            return application
+
+        if AID not in self.applications and self.entry_points:
+            self._load_entry_points()
+
+        if AID not in self.applications or AID in self.failed:
+            raise KeyError(AID)
+
+        try:
+            application = self._resolve(self.applications[AID])
+        except Exception as e:
+            self.failed.add(AID)
+            TPEG_log_error("==> TPEG applications: AID %d (%s) registration failed: %s" %
+                           (AID, self.applications[AID], e))
+            raise KeyError(AID)
+
+        self.resolved[AID] = application
+        return application
+
+    def __setitem__(self, AID, application):
+        self.register(AID, application)
+
+    def __contains__(self, AID):
+        if AID not in self.applications and self.entry_points:
+            self._load_entry_points()
+        return AID in self.applications
+
+    def get(self, AID, default=None):
+        try:
+            return self[AID]
+        except KeyError:
+            return default
+
+    def keys(self):
+        if self.entry_points:
+            self._load_entry_points()
+        return sorted(self.applications)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+
+if __name__ == '__main__':
+    print("TPEG_applications")
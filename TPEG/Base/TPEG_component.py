@@ -30,7 +30,8 @@
 #
 from .TPEG_error import TPEG_log_error, TPEG_error_set_object, TPEG_error_unset_object
 from .TPEG_string import TPEG_string
-from .TPEG_data_types import encodeIntUnTi, encodeIntUnLoMB
+from .TPEG_writer import TPEG_to_binary
+from .TPEG_output import TPEG_render, TPEG_render_segments, TPEG_item_segments
 
 
 class TPEG_component_base(object):
@@ -50,6 +51,18 @@ class TPEG_component_base(object):
 
         self.componentsDict = componentsDict  # list of allowed subcomponents to be parsed
 
+        self._render_key = None  # cached output, see render()
+        self._render_segments = None
+
+        # incremental re-encoding, see update() and encode_attributes()
+        self.parent = None        # enclosing component or data structure
+        self.dirty = False        # this node or a node below changed since parsing (or last write)
+        self.changed = False      # fields of this node changed, head is re-encoded
+        self._attr_start = 0      # length of the parse string when attribute parsing started
+        self._head_length = 0     # leading attribute bytes written by encode_head()
+        self._attr_offset = None  # position of this node in the attribute bytes of its parent
+        self._attr_size = 0       # and the number of bytes it takes there
+
     def datastructures(self, dstype=None):
         return [value for [t, value] in self.attributes if
                 t == '_complex_' and (dstype is None or value.type == dstype)]
@@ -57,7 +70,14 @@ class TPEG_component_base(object):
     def parse_n_attributes_of_type(self, TPEGstring, name, func):
         # parse n items in one go
         n = TPEGstring.IntUnLoMB()  # number of items
-        for i in range(n):
+        start = 0
+        if func == TPEGstring.IntUnTi:
+            # fixed size items: decode all available in one call
+            values = TPEGstring.read_uint8_array(min(n, TPEGstring.len()))
+            self.attributes.extend([['%s_%d' % (name, i), value] for i, value in enumerate(values)])
+            start = len(values)
+
+        for i in range(start, n):
             if TPEGstring.len() == 0:
                 TPEG_log_error(
                     self.levelprefix + "==> From %s %d (of %d) %s attribute length exhausted" % (name, i, n, self.name))
@@ -69,7 +89,13 @@ class TPEG_component_base(object):
     def parse_datastructure(self, TPEGstring, name, ds_class):
         # parse datastructure: create instance & store as complex attribute
         DataStructure = ds_class(self.level + 1, Cname=name)
+        DataStructure.parent = self
+
+        lb = TPEGstring.len()
         DataStructure.parse(TPEGstring, Registry=self.Registry)
+        DataStructure._attr_offset = self._attr_start - lb
+        DataStructure._attr_size = lb - TPEGstring.len()
+
         self.attributes.append(['_complex_', DataStructure])
 
     def parse_n_datastructures_of_type(self, TPEGstring, name, ds_class):
@@ -84,40 +110,126 @@ class TPEG_component_base(object):
 
         return n
 
-    def annotations_out(self):
+    #
+    # pretty print, rendered into a TPEG_output (see TPEG_output.py)
+    #
+    def annotations_out(self, output=None):
         # print annotations
-        # first pass: determine max length of annotations
-        length = 0
-        for [i, j] in self.annotations:
-            if len(i) > length:
-                if i not in ['_raw_', '_complex_']:
-                    length = len(i)
-        # second pass; pretty print annotations (aligned)
-        for [i, j] in self.annotations:
-            if i not in ['_raw_', '_complex_']:
-                if len(i) < length:
-                    i = i + ' ' * (length - len(i))
-                print(self.levelprefix + "  #", i, "=", j)
-            elif i in ['_complex_']:
-                j.out()  # print datastructure or component
-
-    def attributes_out(self):
+        TPEG_render(self.render_annotations, output)
+
+    def attributes_out(self, output=None):
         # print attributes
+        TPEG_render(self.render_attributes, output)
+
+    def out(self, output=None):
+        TPEG_render(self.render, output)
+
+    def render_annotations(self, output):
+        TPEG_render_segments(TPEG_item_segments(self.levelprefix, self.annotations, marker='#'), output)
+
+    def render_attributes(self, output):
+        TPEG_render_segments(self.attribute_segments(), output)
+
+    def attribute_segments(self):
+        return TPEG_item_segments(self.levelprefix, self.attributes)
+
+    def segments(self):
+        # text and node segments of this node
+        return TPEG_item_segments(self.levelprefix, self.annotations, marker='#') + self.attribute_segments()
+
+    def render(self, output):
+        # the text of this node is cached, only the (sub) nodes are rendered again
+        key = (len(self.attributes), len(self.annotations), len(getattr(self, 'subcomponents', ())))
+        if self._render_key != key:
+            self._render_segments = self.segments()
+            self._render_key = key
+
+        TPEG_render_segments(self._render_segments, output)
+
+    #
+    # re-compose as binary string, see write_binary()
+    def to_binary(self):
+        return TPEG_to_binary(self)
 
-        # first pass: determine max length of attributes
-        length = 0
-        for [i, j] in self.attributes:
-            if len(i) > length:
-                if i not in ['_raw_', '_complex_']:
-                    length = len(i)
-        # second pass; pretty print attributes (aligned)
-        for [i, j] in self.attributes:
-            if i not in ['_raw_', '_complex_']:
-                if len(i) < length:
-                    i = i + ' ' * (length - len(i))
-                print(self.levelprefix + "  +", i, "=", j)
-            elif i in ['_complex_']:
-                j.out()  # print datastructure or component
+    #
+    # editing: fields listed in update_fields can be changed, only the changed nodes
+    # and the path up to the top-level component are re-encoded
+    #
+    update_fields = ()
+
+    def update(self, **fields):
+        """ change fields of this node (see update_fields) """
+        for name, value in fields.items():
+            if name not in self.update_fields:
+                TPEG_log_error(self.levelprefix + "==> " + self.name + ": field %s cannot be updated" % name)
+                continue
+
+            self.update_field(name, value)
+            self.changed = True
+
+        if self.changed:
+            self.mark_dirty()
+
+    def update_field(self, name, value):
+        setattr(self, name, value)
+        self.set_attribute(name, value)
+
+    def set_attribute(self, name, value, present=True):
+        """ replace (or add, or remove if not present) the printed value of an attribute """
+        for i, [key, old] in enumerate(self.attributes):
+            if key == name:
+                if present:
+                    self.attributes[i] = [name, value]
+                else:
+                    del self.attributes[i]
+                break
+        else:
+            if present:
+                self.attributes.append([name, value])
+
+        self._render_key = None
+
+    def mark_dirty(self):
+        # this node and all enclosing nodes have to be re-encoded
+        node = self
+        while node is not None and not node.dirty:
+            node.dirty = True
+            node = node.parent
+
+    def encode_head(self, writer):
+        # write the first _head_length attribute bytes from changed fields
+        writer.write(self.attr_string[:self._head_length])
+
+    def encode_attributes(self, writer):
+        """
+        Write the attribute bytes: a re-encoded head if fields changed, changed data
+        structures re-encoded and all other bytes as parsed.
+        """
+        attr_string = self.attr_string
+        base = writer.len()
+        pos = 0
+        if self.changed:
+            self.encode_head(writer)
+            pos = self._head_length
+            self._head_length = writer.len() - base
+
+        for [key, node] in self.attributes:
+            if key != '_complex_' or node._attr_offset is None or node._attr_offset < pos:
+                continue
+
+            writer.write(attr_string[pos:node._attr_offset])
+            pos = node._attr_offset + node._attr_size
+
+            node._attr_offset = writer.len() - base
+            node.write_binary(writer)
+            node._attr_size = writer.len() - base - node._attr_offset
+
+        writer.write(attr_string[pos:])
+
+        self.attr_string = bytes(writer.data[base:])
+        self.attr_length = len(self.attr_string)
+        self.dirty = self.changed = False
+        self._render_key = None
 
     def parse_subcomponent(self, level, TPEGstring, Cname=None):
         # get subcomponentID
@@ -135,6 +247,7 @@ class TPEG_component_base(object):
         else:
             Component = CompClass(CompID, level)
 
+        Component.parent = self
         Component.parse(TPEGstring, Registry=self.Registry)
         return Component
 
@@ -158,28 +271,36 @@ class TPEG_datastructure(TPEG_component_base):
                     self.levelprefix + "==> From %s %d (of %d) %s attribute length exhausted" % (name, i, n, self.name))
                 break
 
-            Component = self.parse_subcomponent(self, level + 1, TPEGstring, Cname=Cname)
+            lb = TPEGstring.len()
+            Component = self.parse_subcomponent(level + 1, TPEGstring, Cname=Cname)
+            Component._attr_offset = self._attr_start - lb
+            Component._attr_size = lb - TPEGstring.len()
+
             self.attributes.append(['_complex_', Component])
 
         return n
 
-    def attributes_out(self):
-        print(self.levelprefix + "  " + "Attributes")
-        super().attributes_out()
+    def attribute_segments(self):
+        return [self.levelprefix + "  " + "Attributes\n"] + super().attribute_segments()
 
-    def out(self):
-        print(self.levelprefix + self.name + " -- (DataStructure, type=" + self.type + ") ")
+    def segments(self):
+        segments = [self.levelprefix + self.name + " -- (DataStructure, type=" + self.type + ") \n"]
         if self.annotations:
-            self.annotations_out()
+            segments.extend(TPEG_item_segments(self.levelprefix, self.annotations, marker='#'))
 
         if self.attributes:
-            self.attributes_out()
+            segments.extend(self.attribute_segments())
+
+        return segments
 
     #
     #
     # re-compose datastructre as binary string
-    def to_binary(self):
-        return self.attr_string
+    def write_binary(self, writer):
+        if self.dirty:
+            self.encode_attributes(writer)
+        else:
+            writer.write(self.attr_string)
 
     #
     # overall parse command
@@ -193,7 +314,7 @@ class TPEG_datastructure(TPEG_component_base):
 
         # parse attributes
         try:
-            lb = TPEGstring.len()
+            lb = self._attr_start = TPEGstring.len()
             self.attr_string = TPEGstring.data
             self.parse_attributes(TPEGstring)
             la = TPEGstring.len()
@@ -218,47 +339,59 @@ class TPEG_component(TPEG_component_base):
         super().__init__(level=level, componentsDict=componentsDict, Cname=Cname, Ctype=Ctype)
         self.id = id
         self.comp_length = 0
+        self.comp_string = None  # parsed bytes following the component id, reused while not dirty
         self.subcomponents = []
 
     def parse_attributes(self, TPEGstring):
         # default behavior: store attribute bytes as string
         self.attributes.append(['_raw_', TPEGstring.advance(self.attr_length)])
 
-    def attributes_out(self):
-        print(self.levelprefix + "  " + "Attributes (length Attribute block %2d):" % self.attr_length)
-        super().attributes_out()
+    def attribute_segments(self):
+        return [self.levelprefix + "  " + "Attributes (length Attribute block %2d):\n" % self.attr_length] + \
+               super().attribute_segments()
 
-    def out(self):
-        # print self, self.id, self.name
-
-        print(
-                self.levelprefix + self.name + " -- (Component ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + ") ")
+    def segments(self):
+        segments = [self.levelprefix + self.name + " -- (Component ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + ") \n"]
         if self.annotations:
-            self.annotations_out()
+            segments.extend(TPEG_item_segments(self.levelprefix, self.annotations, marker='#'))
 
         if self.attributes:
-            self.attributes_out()
+            segments.extend(self.attribute_segments())
+
+        segments.extend(self.subcomponents)
 
-        for comp in self.subcomponents:
-            comp.out()
+        return segments
 
     #
     # Trailer to be printed after toplevel component in frame
-    def component_trailer_out(self):
-        print(
-                self.levelprefix + "---- End " + self.name + " -- (Component ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + ") ----\n")
+    def component_trailer_out(self, output=None):
+        TPEG_render(self.render_trailer, output)
+
+    def render_trailer(self, output):
+        output.write(self.levelprefix + "---- End " + self.name + " -- (Component ID=%02d" % self.id + ", CompLen=%2d" % self.comp_length + ", type=" + self.type + ") ----\n\n")
 
     #
     #
     # re-compose component as binary string
-    def to_binary(self):
+    def write_binary(self, writer):
+        writer.IntUnTi(self.id)
+        if not self.dirty and self.comp_string is not None:
+            # unchanged: bytes as parsed (or last written)
+            writer.write(self.comp_string)
+            return
 
-        comp_string = b''
+        start = writer.len()
+
+        self.encode_attributes(writer)
+        writer.insert_IntUnLoMB(start, self.attr_length)
         for component in self.subcomponents:
-            comp_string += component.to_binary()
+            component.write_binary(writer)
+
+        # component length precedes the component
+        self.comp_length = writer.len() - start
+        writer.insert_IntUnLoMB(start, self.comp_length)
 
-        binary_string = encodeIntUnLoMB(len(self.attr_string)) + self.attr_string + comp_string
-        return bytes([self.id]) + encodeIntUnLoMB(len(binary_string)) + binary_string
+        self.comp_string = bytes(writer.data[start:])
 
     #
     # overall parse command
@@ -270,6 +403,7 @@ class TPEG_component(TPEG_component_base):
         # store Registry for sub components and sub data structures parsing
         self.Registry = Registry
 
+        parse_data = TPEGstring.data
         self.comp_length = TPEGstring.IntUnLoMB()
 
         # create string of length of component for isolated parsing of rest component
@@ -282,6 +416,7 @@ class TPEG_component(TPEG_component_base):
 
         # create substring of needed length
         COMPstring = TPEGstring.popstring(self.comp_length)
+        self.comp_string = parse_data[:len(parse_data) - TPEGstring.len()]
 
         self.attr_length = COMPstring.IntUnLoMB()
 
@@ -291,6 +426,7 @@ class TPEG_component(TPEG_component_base):
         if self.attr_length > 0:
             # create string of lenght attribute block for isolated parsing of attribute block
             ATTRstring = COMPstring.popstring(self.attr_length)
+            self._attr_start = ATTRstring.len()
 
             #
             # store attribute_string for re-assembly
@@ -33,13 +33,13 @@ import sys
 #
 from .TPEG_string import TPEG_string
 from .TPEG_CRC import TPEG_CRC
-from .TPEG_error import TPEG_log_error, TPEG_error_set_context, TPEG_error_unset_context
-#
-from .TPEG_data_types import encodeIntUnTi, encodeIntUnLi, encodeIntUnLoMB
+from .TPEG_error import TPEG_log_error, TPEG_error_set_context, TPEG_error_unset_context, TPEG_error_count
+from .TPEG_output import TPEG_render, TPEG_render_segments, TPEG_item_segments
+from .TPEG_writer import TPEG_to_binary
 #
 #
 from .TPEG_component import TPEG_component
-from .TPEG_SNI_base_component import TPEG_SNI_base_component
+from .TPEG_SNI_base_component import TPEG_SNI_base_component, TPEG_SNI_cache
 
 
 #
@@ -61,7 +61,7 @@ class TPEG_component_frame(object):
         self.hdrCRC = 0
         self.attributes = []
         self.frame_continuation = False
-        self.continuation_string = ''
+        self.continuation_string = b''
         self.componentsDict = componentsDict
 
     #
@@ -69,7 +69,12 @@ class TPEG_component_frame(object):
     #
     def parse(self, TPEGstring, Registry={}):
         CompFrameString = self.parse_header(TPEGstring)
+        self.parse_frame(CompFrameString, Registry)
 
+    #
+    # select and parse the frame continuation, also used to replay frames buffered until SNI
+    #
+    def parse_frame(self, CompFrameString, Registry={}):
         # set current SID in the registry
         Registry["SID"] = self.SID
 
@@ -86,6 +91,13 @@ class TPEG_component_frame(object):
 
         except KeyError:
             self.continuation_string = CompFrameString.string()
+            #
+            # SCID not (yet) in the SNI fast tuning table: keep for replay when SNI arrives
+            pending = Registry.get("PendingFrames")
+            if pending is not None and self.SCID != 0 and self.SCID not in Registry.get(self.SID, {}):
+                pending.add(self)
+                return
+
             TPEG_log_error(
                 "==> TPEG Component frame: no AID registered/frame_type known for SCID %d, skipped\n" % self.SCID)
             return
@@ -105,9 +117,25 @@ class TPEG_component_frame(object):
                 "==> TPEG Component frame: Encryption ID %d unknown for SCID %d, skipped\n" % (EncID, self.SCID))
             return
 
+        # unchanged SNI frame: its decode is taken over, nothing to check or parse
+        if self.SCID == 0:
+            cache  = TPEG_SNI_cache.of(Registry)
+            data   = CompFrameString.string()
+            if cache.take_frame(self, data, Registry):
+                return
+            errors = TPEG_error_count()
+
         # unencrypted content now, parse
         self.frame_continuation.parse(CompFrameString, Registry=Registry)
 
+        if self.SCID == 0:
+            if TPEG_error_count() == errors:
+                cache.store_frame(self, data)
+
+            # SNI may have registered SCIDs of buffered frames
+            if Registry.get("PendingFrames") is not None:
+                Registry["PendingFrames"].replay(self.SID, Registry)
+
     #
     # parsing of standard component header
     #
@@ -155,60 +183,51 @@ class TPEG_component_frame(object):
     # binary conversion
     #
     def to_binary(self):
-        if not self.frame_continuation:
-            return self.continuation_string  # return stored continuation string
-
-        # here a valid frame continuation is present, SCID is known
-        frame_continuation_string = self.frame_continuation.to_binary()
+        return TPEG_to_binary(self)
 
-        fieldlength = len(frame_continuation_string)
+    def write_binary(self, writer):
+        writer.IntUnTi(self.SCID)
+        pos = writer.reserve(4)  # fieldlength and hdrCRC
+        start = writer.len()
 
-        # calculate header CRC
-        l = [self.SCID, (fieldlength >> 8) & 0xFF, (fieldlength) & 0xFF]
+        if self.frame_continuation:
+            # here a valid frame continuation is present, SCID is known
+            self.frame_continuation.write_binary(writer)
+        else:
+            writer.write(self.continuation_string)  # write stored continuation string
 
-        # add first 13 bytes payload or rest
-        # determine size of TPEGstring max to 13
-        flen = min(13, fieldlength)
-        for item in frame_continuation_string[:flen]:
-            l.append(ord(item))
-
-        # final calculate header CRC
-        hdrCRC = TPEG_CRC(l)
+        fieldlength = writer.len() - start
 
-        component_frame_string = encodeIntUnTi(self.SCID) + encodeIntUnLi(fieldlength) + encodeIntUnLi(
-            hdrCRC) + frame_continuation_string
+        # calculate header CRC on header and first 13 bytes payload or rest
+        l = [self.SCID, (fieldlength >> 8) & 0xFF, (fieldlength) & 0xFF]
+        l.extend(writer.data[start:start + 13])
 
-        return component_frame_string
+        writer.patch_IntUnLi(pos, fieldlength)
+        writer.patch_IntUnLi(pos + 2, TPEG_CRC(l))
 
     #
-    # pretty print attributes
+    # pretty print, rendered into a TPEG_output (see TPEG_output.py)
     #
-    def attributes_out(self):
+    def attributes_out(self, output=None):
         # print attributes
-        print(self.levelprefix + "  " + "Header attributes:")
-        # first pass: determine max length of attributes
-        length = 0
-        for [i, j] in self.attributes:
-            if len(i) > length:
-                if i != '_raw_':
-                    length = len(i)
-        # second pass; pretty print attributes (aligned)
-        for [i, j] in self.attributes:
-            if i != '_raw_':
-                if len(i) < length:
-                    for k in range(length - len(i)):
-                        i = i + ' '
-                print(self.levelprefix + "  +", i, "=", j)
+        TPEG_render(self.render_attributes, output)
+
+    def render_attributes(self, output):
+        output.write(self.levelprefix + "  " + "Header attributes:\n")
+        TPEG_render_segments(TPEG_item_segments(self.levelprefix, self.attributes, skip=('_raw_',), complex_nodes=False), output)
 
     #
     # pretty print frame
     #
-    def out(self):
-        print(self.levelprefix + "TPEG component frame: (fieldlength=%d)" % self.fieldlength)
-        self.attributes_out()
+    def out(self, output=None):
+        TPEG_render(self.render, output)
+
+    def render(self, output):
+        output.write(self.levelprefix + "TPEG component frame: (fieldlength=%d)\n" % self.fieldlength)
+        self.render_attributes(output)
 
         if self.frame_continuation != False:
-            self.frame_continuation.out()
+            self.frame_continuation.render(output)
 
 
 #
@@ -222,6 +241,7 @@ class TPEG_comp_frame_continuation(object):
         self.components = []
         self.componentsDict = componentsDict
         self.SCID = id
+        self.repetitions = 0  # messages skipped as repeated, see TPEG_dedup.py
         self.level = level
         self.levelprefix = ""
         for i in range(level):
@@ -241,10 +261,20 @@ class TPEG_comp_frame_continuation(object):
         # first parse attributes
         self.parse_attributes(TPEGstring)
         #
+        # filter for carousel repetitions (not for SNI)
+        duplicates = Registry.get("DuplicateFilter") if self.SCID != 0 else None
+        #
         # then parse components
         while TPEGstring.len() > 0:
             CompID = TPEGstring.IntUnTi()
 
+            if duplicates is not None:
+                length = duplicates.repeated_length(TPEGstring.data, Registry.get("SID"), self.SCID, CompID)
+                if length:
+                    TPEGstring.advance(length)
+                    self.repetitions += 1
+                    continue
+
             # print "TPEG_frame_continuation: %d components, remaining length %d"%(len(self.components),TPEGstring.len()+1)
             if CompID in self.componentsDict:
                 Comp = self.componentsDict[CompID](CompID, level=self.level + 1)
@@ -265,45 +295,41 @@ class TPEG_comp_frame_continuation(object):
                 self.components.append(Comp)
 
         self.attributes.append(["Components parsed", len(self.components)])
+        if self.repetitions:
+            self.attributes.append(["Repetitions skipped", self.repetitions])
 
     #
     # to binary
     #
     def to_binary(self):
-        frame_continuation_string = b''
-        for comp in self.components:
-            frame_continuation_string += comp.to_binary()
+        return TPEG_to_binary(self)
 
-        return frame_continuation_string
+    def write_binary(self, writer):
+        for comp in self.components:
+            comp.write_binary(writer)
 
     #
-    # pretty print attributes
+    # pretty print, rendered into a TPEG_output (see TPEG_output.py)
     #
-    def attributes_out(self):
+    def attributes_out(self, output=None):
         # print attributes
-        print(self.levelprefix + "  " + "Extended Attributes:")
-        # first pass: determine max length of attributes
-        length = 0
-        for [i, j] in self.attributes:
-            if len(i) > length:
-                if i != '_raw_':
-                    length = len(i)
-        # second pass; pretty print attributes (aligned)
-        for [i, j] in self.attributes:
-            if i != '_raw_':
-                if len(i) < length:
-                    for k in range(length - len(i)):
-                        i = i + ' '
-                print(self.levelprefix + "  +", i, "=", j)
-
-    def out(self):
-        self.attributes_out()
-        print("")
+        TPEG_render(self.render_attributes, output)
+
+    def render_attributes(self, output):
+        output.write(self.levelprefix + "  " + "Extended Attributes:\n")
+        TPEG_render_segments(TPEG_item_segments(self.levelprefix, self.attributes, skip=('_raw_',), complex_nodes=False), output)
+
+    def out(self, output=None):
+        TPEG_render(self.render, output)
+
+    def render(self, output):
+        self.render_attributes(output)
+        output.write("\n")
         for comp in self.components:
-            comp.out()
+            comp.render(output)
             #
             # for top-level components print trailer
-            comp.component_trailer_out()
+            comp.render_trailer(output)
 
 
 class TPEG_ProtectedComp_frame(TPEG_comp_frame_continuation):
@@ -328,16 +354,13 @@ class TPEG_ProtectedComp_frame(TPEG_comp_frame_continuation):
     #
     # to_binary
     #
-    def to_binary(self):
+    def write_binary(self, writer):
+        start = writer.len()
         # add attributes and components
-        frame_continuation_string = TPEG_comp_frame_continuation.to_binary(self)
-
-        # calculate dataCRC
-        dataCRC = TPEG_CRC([i for i in frame_continuation_string])
-
-        frame_continuation_string += encodeIntUnLi(dataCRC)
+        TPEG_comp_frame_continuation.write_binary(self, writer)
 
-        return frame_continuation_string
+        # add dataCRC
+        writer.IntUnLi(writer.CRC(start))
 
 
 class TPEG_ProtectedCountedComp_frame(TPEG_comp_frame_continuation):
@@ -363,9 +386,9 @@ class TPEG_ProtectedCountedComp_frame(TPEG_comp_frame_continuation):
 
         TPEG_comp_frame_continuation.parse_continuation(self, CompString, Registry=Registry)
 
-        if len(self.components) != self.messageCount:
+        if len(self.components) + self.repetitions != self.messageCount:
             TPEG_log_error("==> TPEG_ProtectedCountedComp_frame: messageCount (actual=%d, sent=%d) not correct ..."
-                           % (len(self.components), self.messageCount))
+                           % (len(self.components) + self.repetitions, self.messageCount))
 
     def parse_attributes(self, TPEGstring):
         self.messageCount = TPEGstring.IntUnTi()
@@ -375,17 +398,14 @@ class TPEG_ProtectedCountedComp_frame(TPEG_comp_frame_continuation):
     #
     # to_binary
     #
-    def to_binary(self):
+    def write_binary(self, writer):
+        start = writer.len()
         # add attributes and components
-        messageCount = len(self.components)
-        frame_continuation_string = encodeIntUnTi(messageCount) + TPEG_comp_frame_continuation.to_binary(self)
-
-        # calculate dataCRC
-        dataCRC = TPEG_CRC([ord(i) for i in frame_continuation_string])
-
-        frame_continuation_string += encodeIntUnLi(dataCRC)
+        writer.IntUnTi(len(self.components))
+        TPEG_comp_frame_continuation.write_binary(self, writer)
 
-        return frame_continuation_string
+        # add dataCRC
+        writer.IntUnLi(writer.CRC(start))
 
 
 class TPEG_ProtectedPrioComp_frame(TPEG_comp_frame_continuation):
@@ -417,16 +437,14 @@ class TPEG_ProtectedPrioComp_frame(TPEG_comp_frame_continuation):
     #
     # to_binary
     #
-    def to_binary(self):
+    def write_binary(self, writer):
+        start = writer.len()
         # add attributes and components
-        frame_continuation_string = encodeIntUnTi(self.groupPriority) + TPEG_comp_frame_continuation.to_binary(self)
-
-        # calculate dataCRC
-        dataCRC = TPEG_CRC([ord(i) for i in frame_continuation_string])
+        writer.IntUnTi(self.groupPriority)
+        TPEG_comp_frame_continuation.write_binary(self, writer)
 
-        frame_continuation_string += encodeIntUnLi(dataCRC)
-
-        return frame_continuation_string
+        # add dataCRC
+        writer.IntUnLi(writer.CRC(start))
 
 
 class TPEG_ProtPrioCountedComp_frame(TPEG_comp_frame_continuation):
@@ -452,9 +470,9 @@ class TPEG_ProtPrioCountedComp_frame(TPEG_comp_frame_continuation):
 
         TPEG_comp_frame_continuation.parse_continuation(self, CompString, Registry=Registry)
 
-        if len(self.components) != self.messageCount:
+        if len(self.components) + self.repetitions != self.messageCount:
             TPEG_log_error("==> TPEG_ProtPrioCountedComp_frame: messageCount (actual=%d, sent=%d) not correct ..."
-                           % (len(self.components), self.messageCount))
+                           % (len(self.components) + self.repetitions, self.messageCount))
 
     def parse_attributes(self, TPEGstring):
         self.groupPriority = TPEGstring.IntUnTi()
@@ -467,18 +485,15 @@ class TPEG_ProtPrioCountedComp_frame(TPEG_comp_frame_continuation):
     #
     # to_binary
     #
-    def to_binary(self):
+    def write_binary(self, writer):
+        start = writer.len()
         # add attributes and components
-        messageCount = len(self.components)
-        frame_continuation_string = encodeIntUnTi(self.groupPriority) + encodeIntUnTi(
-            messageCount) + TPEG_comp_frame_continuation.to_binary(self)
-
-        # calculate dataCRC
-        dataCRC = TPEG_CRC([ord(i) for i in frame_continuation_string])
-
-        frame_continuation_string += encodeIntUnLi(dataCRC)
+        writer.IntUnTi(self.groupPriority)
+        writer.IntUnTi(len(self.components))
+        TPEG_comp_frame_continuation.write_binary(self, writer)
 
-        return frame_continuation_string
+        # add dataCRC
+        writer.IntUnLi(writer.CRC(start))
 
 
 #
@@ -60,30 +60,22 @@ def UShort2ByteString(val):
 #
 # encode multi-byte
 def encodeIntUnLoMB(val):
-    result = b''
-    sizes = [0x80, 0x4000, 0x200000, 0x10000000]
+    if val < 0x80:
+        return bytes((val,))
 
-    nbytes = 5
-    for i, size in enumerate(sizes):
-        if val < size:
-            nbytes = i + 1
-            break
+    result = [val & 0x7F]
+    val >>= 7
+    while val > 0 and len(result) < 5:
+        result.append((val & 0x7F) | 0x80)  # turn on continuity
+        val >>= 7
 
-    for i in range(nbytes):
-        byte = (val & 0x7F)
-        if i > 0:  # turn on continuity
-            byte += 0x80
-        result = bytes([byte]) + result
-        val = val >> 7
-
-    return result
+    result.reverse()
+    return bytes(result)
 
 
 #
 #
 def encodeIntSiLoMB(val):
-    result = b''
-
     sizes = [0x40, 0x2000, 0x100000, 0x80000000]
 
     nbytes = 1
@@ -93,15 +85,13 @@ def encodeIntSiLoMB(val):
             nbytes = i + 1
             break
 
-    for i in range(nbytes):
-        byte = val & 0x7f
-        val = val >> 7
+    result = [val & 0x7F]
+    for i in range(1, nbytes):
+        val >>= 7
+        result.append((val & 0x7F) | 0x80)  # turn on continuity
 
-        if i > 0:  # turn on continuity
-            byte += 0x80
-        result = bytes([byte]) + result
-
-    return result
+    result.reverse()
+    return bytes(result)
 
 
 #
@@ -163,65 +153,33 @@ def encodeIntSiLi(val):
 #
 #
 def encodeIntUn24(intval):
-    result = []
-
     if intval < 0 or intval > 0xFFFFFF:
         print("==> encodeIntUn24: value out of range", intval)
-    else:
-        for i in range(3):
-            result.append(intval & 0xFF)
-            intval = intval >> 8
-
-        result.reverse()
+        return b''
 
-    ret = b''
-    for x in result:
-        ret += bytes([x])
-
-    return ret
+    return intval.to_bytes(3, 'big')
 
 
 #
 #
 #
 def encodeIntSi24(intval):
-    result = []
-
     if intval < -8388608 or intval > 8388607:
         print("==> encodeIntSi24: value out of range", intval)
-    else:
-        for i in range(3):
-            result.append(intval & 0xFF)
-            intval = intval >> 8
-
-        result.reverse()
+        return b''
 
-    ret = b''
-    for x in result:
-        ret += bytes([x])
-
-    return ret
+    return intval.to_bytes(3, 'big', signed=True)
 
 
 #
 #
 #
 def encodeIntUnLo(intval):
-    result = []
     if intval < 0 or intval > 0xFFFFFFFF:
         print("==> encodeIntUnLo: value out of range", intval)
-    else:
-        for i in range(4):
-            result.append(intval & 0xFF)
-            intval = intval >> 8
-
-        result.reverse()
-
-    ret = b''
-    for x in result:
-        ret += bytes([x])
+        return b''
 
-    return ret
+    return intval.to_bytes(4, 'big')
 
 
 #
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Suppression of carousel repetitions
+#
+# Messages are fingerprinted by the bytes of their first sub component (the MMC with
+# messageID, versionID, expiry time and cancelFlag) without parsing the rest of the
+# message. Fingerprints are remembered in an LRU of bounded size, optionally backed by a
+# Bloom filter remembering many more for a target false positive rate.
+#
+# A TPEG_duplicate_filter stored as Registry["DuplicateFilter"] makes the component frame
+# continuations skip repeated messages before they are decoded.
+#
+import math
+import hashlib
+from collections import OrderedDict
+
+
+#
+#
+def _IntUnLoMB_at(data, pos):
+    # (value, position after) of an IntUnLoMB at data[pos]
+    val = 0
+    while True:
+        el = data[pos]
+        pos += 1
+        val = (val << 7) + (el & 0x7F)
+        if (el & 0x80) == 0:
+            return val, pos
+
+
+def TPEG_message_fingerprint(data):
+    """
+    (fingerprint, message length) of the message following its component id in data (bytes or
+    list), the fingerprint are the bytes of the first sub component; None if there is none.
+    """
+    try:
+        comp_length, start = _IntUnLoMB_at(data, 0)
+        attr_length, pos = _IntUnLoMB_at(data, start)
+        pos += attr_length
+
+        # first sub component: id, length and content
+        sub_length, sub = _IntUnLoMB_at(data, pos + 1)
+        end = sub + sub_length
+        if end > start + comp_length or end > len(data):
+            return None
+    except IndexError:
+        return None
+
+    return bytes(data[pos:end]), start + comp_length
+
+
+#
+# === class TPEG_bloom_filter ===============================================
+#
+class TPEG_bloom_filter(object):
+    def __init__(self, capacity, error_rate=0.001):
+        """ set of byte strings with false positives at error_rate for up to capacity members """
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # double hashing on one digest
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+
+#
+# === class TPEG_duplicate_filter ===========================================
+#
+class TPEG_duplicate_filter(object):
+    def __init__(self, max_entries=65536, bloom_capacity=0, error_rate=0.001):
+        """
+        Remember the last max_entries fingerprints (LRU). With bloom_capacity, fingerprints dropped
+        from the LRU are still recognised by a Bloom filter (cleared once bloom_capacity is reached).
+        """
+        self.max_entries = max_entries
+        self.recent = OrderedDict()
+        self.bloom = TPEG_bloom_filter(bloom_capacity, error_rate) if bloom_capacity else None
+
+        self.repetitions = 0
+        self.novel = 0
+
+    def seen(self, key):
+        """ True if key was seen before, else remember it """
+        if key in self.recent:
+            self.recent.move_to_end(key)
+            self.repetitions += 1
+            return True
+
+        if self.bloom is not None and key in self.bloom:
+            self.repetitions += 1
+            return True
+
+        self.novel += 1
+        self.recent[key] = True
+        if len(self.recent) > self.max_entries:
+            self.recent.popitem(last=False)
+
+        if self.bloom is not None:
+            if self.bloom.count >= self.bloom.capacity:
+                self.bloom.clear()
+            self.bloom.add(key)
+
+        return False
+
+    def repeated_length(self, data, SID, SCID, CompID):
+        """
+        Length of the message following CompID in data if it repeats a message seen before in
+        the service component (SID, SCID), else 0.
+        """
+        fingerprint = TPEG_message_fingerprint(data)
+        if fingerprint is None:
+            return 0
+
+        mmc, length = fingerprint
+        key = b'%s/%d/%d/%d/' % (str(SID).encode(), SCID, CompID, length) + mmc
+        return length if self.seen(key) else 0
+
+    def clear(self):
+        self.recent.clear()
+        if self.bloom is not None:
+            self.bloom.clear()
@@ -101,6 +101,11 @@ def TPEG_error_reset():
     return
 
 
+def TPEG_error_count():
+    """ number of errors logged so far """
+    return len(_error_log)
+
+
 def TPEG_log_error(error_text, show=True):
     global _error_context
     global _error_object_stack
@@ -33,8 +33,8 @@ import zlib
 from .TPEG_error import TPEG_log_error, TPEG_error_set_context, TPEG_error_unset_context
 from .TPEG_string import TPEG_string
 from .TPEG_CRC import TPEG_CRC
-#
-from .TPEG_data_types import encodeIntUnTi, encodeIntUnLi, encodeIntUnLoMB
+from .TPEG_output import TPEG_render
+from .TPEG_writer import TPEG_to_binary
 #
 from .TPEG_component_frame import TPEG_component_frame
 
@@ -132,46 +132,51 @@ class TPEG_Transport_Frame(object):
         TPEG_error_unset_context()
         #
 
-    def out(self):
+    def out(self, output=None):
+        TPEG_render(self.render, output)
+
+    def render(self, output):
         if self.serviceframe:
-            print("TPEG transport frame: (type=%1d), (ServiceFrameLength=%d), (headerCRC=0x%04X)" % (
+            output.write("TPEG transport frame: (type=%1d), (ServiceFrameLength=%d), (headerCRC=0x%04X)\n" % (
             self.ServiceFrameType,
             self.serviceFrameLength,
             self.hdrCRC))
-            self.serviceframe.out()
+            self.serviceframe.render(output)
 
         elif self.ServiceFrameType >= 0:
-            print("TPEG transport frame: (Unknown type=%1d), (ServiceFrameLength=%d), (headerCRC=0x%04X)" % (
+            output.write("TPEG transport frame: (Unknown type=%1d), (ServiceFrameLength=%d), (headerCRC=0x%04X)\n" % (
             self.ServiceFrameType,
             self.serviceFrameLength,
             self.hdrCRC))
 
     def to_binary(self):
-        transport_frame_string = b'unknown service frame'
-        if self.serviceframe:
-            transport_frame_string = self.serviceframe.to_binary()
+        return TPEG_to_binary(self)
 
-        serviceFrameLength = len(transport_frame_string)
+    def write_binary(self, writer):
         serviceFrameType = self.ServiceFrameType
 
+        writer.IntUnLi(0xFF0F)
+        pos = writer.reserve(4)  # serviceFrameLength and hdrCRC
+        writer.IntUnTi(serviceFrameType)
+        start = writer.len()
+
+        if self.serviceframe:
+            self.serviceframe.write_binary(writer)
+        else:
+            writer.write(b'unknown service frame')
+
+        serviceFrameLength = writer.len() - start
+
         # ---- hdr CRC ------------------------------------------------
         # construct list
         l = [0xFF, 0x0F, (serviceFrameLength >> 8) & 0xFF, (serviceFrameLength) & 0xFF, serviceFrameType]
 
         # add first 11 bytes payload or rest
-        # determine size of TPEGstring max to 11
-        flen = min(11, serviceFrameLength)
-        for i in range(flen):
-            l.append(transport_frame_string[i])
-
-        # do CRC check
-        hdrCRC = TPEG_CRC(l)
-
-        # ---- finalise transport_frame_string
-        transport_frame_string = b'\xFF\x0F' + encodeIntUnLi(serviceFrameLength) + encodeIntUnLi(hdrCRC) + \
-                                 encodeIntUnTi(serviceFrameType) + transport_frame_string
+        l.extend(writer.data[start:start + 11])
 
-        return transport_frame_string
+        # ---- finalise header
+        writer.patch_IntUnLi(pos, serviceFrameLength)
+        writer.patch_IntUnLi(pos + 2, TPEG_CRC(l))
 
 
 #
@@ -225,31 +230,30 @@ class TPEG_ServiceFrame0(object):
             TPEG_log_error("==> TPEG Stream Directory data CRC (actual=0x%04X, sent=0x%04X) not correct ..." % (
             dataCRC, self.frameCRC))
 
-    def out(self):
-        print(self.levelprefix + "TPEG stream directory: (# SIDs= %d)" % self.attr_length)
+    def out(self, output=None):
+        TPEG_render(self.render, output)
+
+    def render(self, output):
+        output.write(self.levelprefix + "TPEG stream directory: (# SIDs= %d)\n" % self.attr_length)
         for i in range(self.attr_length):
-            print(self.levelprefix + "SID %2d   = %s" % (i, self.SIDs[i]))
+            output.write(self.levelprefix + "SID %2d   = %s\n" % (i, self.SIDs[i]))
 
-        print(self.levelprefix + "data CRC = 0x%04X" % (self.frameCRC))
+        output.write(self.levelprefix + "data CRC = 0x%04X\n" % (self.frameCRC))
 
     #
     # binary conversion for service frame 0
     #
     def to_binary(self):
-        service_frame_string = encodeIntUnTi(len(self.SIDs))
+        return TPEG_to_binary(self)
 
-        for SID in self.SIDs:
-            SID = SID.split('.')
-            SID_string = b''
-            for SIDel in SID:
-                SID_string += int(SIDel).to_bytes(1, 'big') # is 1 enough for length?
-
-            service_frame_string += SID_string
+    def write_binary(self, writer):
+        start = writer.len()
+        writer.IntUnTi(len(self.SIDs))
 
-        dataCRC = TPEG_CRC([ord(i) for i in service_frame_string])
-        service_frame_string += encodeIntUnLi(dataCRC)
+        for SID in self.SIDs:
+            writer.ServiceIdentifier(SID)
 
-        return service_frame_string
+        writer.IntUnLi(writer.CRC(start))
 
 
 class TPEG_ServiceFrame1(object):
@@ -311,45 +315,44 @@ class TPEG_ServiceFrame1(object):
             ServCompFrame.parse(TPEGstring, Registry=Registry)
             self.CompFrames.append(ServCompFrame)
 
-    def out(self):
-        print(self.levelprefix + "TPEG service data frame: (SID = %s), (ServEncID=%d)" % (self.SID, self.EncID))
+    def out(self, output=None):
+        TPEG_render(self.render, output)
+
+    def render(self, output):
+        output.write(self.levelprefix + "TPEG service data frame: (SID = %s), (ServEncID=%d)\n" % (self.SID, self.EncID))
         if self.LTE:
-            print("")
-            self.LTE.out()
-            self.LTE.component_trailer_out()
+            output.write("\n")
+            self.LTE.render(output)
+            self.LTE.render_trailer(output)
 
         for frame in self.CompFrames:
-            frame.out()
+            frame.render(output)
 
     #
     # binary conversion for service frame 1
     #
     def to_binary(self):
+        return TPEG_to_binary(self)
+
+    def write_binary(self, writer):
+        # header information
+        writer.ServiceIdentifier(self.SID)
+        writer.IntUnTi(self.EncID)
 
-        # first string component frames together
-        service_frame_string = b''
+        # then string component frames together
+        start = writer.len()
         for frame in self.CompFrames:
-            service_frame_string += frame.to_binary()
+            frame.write_binary(writer)
 
-        if len(service_frame_string) > 8181:  # 8KB - 11 bytes overhead
-            TPEG_log_error("==> TPEG Service data Frame: uncompressed size too large: %d" % len(service_frame_string))
+        if self.EncID == 0 and writer.len() - start > 8181:  # 8KB - 11 bytes overhead
+            TPEG_log_error("==> TPEG Service data Frame: uncompressed size too large: %d" % (writer.len() - start))
 
         # then apply zlib compression / encryption
         if self.EncID == 107:
-            service_frame_string = zlib.compress(service_frame_string)
-
-        if self.EncID != 0 and len(service_frame_string) > 8181:  # 8KB - 11 bytes overhead
-            TPEG_log_error("==> TPEG Service data Frame: compressed size too large: %d" % len(service_frame_string))
-
-        # then add header information
-        SID = self.SID.split('.')
-        SID_string = b''
-        for SIDel in SID:
-            SID_string += int(SIDel).to_bytes(1, 'big')     # is 1 enough for length?
-
-        service_frame_string = SID_string + encodeIntUnTi(self.EncID) + service_frame_string
+            writer.data[start:] = zlib.compress(writer.data[start:])
 
-        return service_frame_string
+        if self.EncID != 0 and writer.len() - start > 8181:  # 8KB - 11 bytes overhead
+            TPEG_log_error("==> TPEG Service data Frame: compressed size too large: %d" % (writer.len() - start))
 
 #
 # ===================================================================================================
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# buffered text output for pretty printing of decoded TPEG structures
+#
+# All out() methods render into a TPEG_output, which collects the text and writes it
+# to the caller supplied text stream in large blocks. The rendered text is identical
+# to printing every line with print().
+#
+import sys
+
+
+#
+# formatting of attribute values, resolved once per value type
+#
+_registered_formatters = {}     # type -> formatter, see TPEG_register_value_formatter()
+_value_formatters      = {}     # cache: value type -> formatter (None: value is a str)
+
+
+def TPEG_register_value_formatter(typ, formatter):
+    """ register a function formatting attribute values of type typ (and subclasses) """
+    _registered_formatters[typ] = formatter
+    _value_formatters.clear()
+
+
+def TPEG_format_value(value):
+    """ format an attribute value as print() would, unless a formatter is registered """
+    typ = value.__class__
+    try:
+        formatter = _value_formatters[typ]
+    except KeyError:
+        formatter = None if typ is str else str
+        for base in typ.__mro__:
+            if base in _registered_formatters:
+                formatter = _registered_formatters[base]
+                break
+        _value_formatters[typ] = formatter
+
+    if formatter is None:
+        return value
+    return formatter(value)
+
+
+#
+# aligned "key = value" lines, as list of text and node segments
+#
+def TPEG_item_segments(prefix, items, marker='+', skip=('_raw_', '_complex_'), complex_nodes=True):
+    """
+    Render a list of [key, value] items to segments.
+
+    Keys in skip are not printed; with complex_nodes '_complex_' values are returned
+    as node segments (to be rendered by the caller), all other keys are padded to the
+    longest printed key.
+    """
+    segments = []
+    lines    = []
+
+    length = 0
+    for key, value in items:
+        if len(key) > length and key not in skip:
+            length = len(key)
+
+    head = prefix + '  ' + marker + ' '
+    for key, value in items:
+        if key not in skip:
+            lines.append(head + key.ljust(length) + ' = ' + TPEG_format_value(value) + '\n')
+        elif complex_nodes and key == '_complex_':
+            if lines:
+                segments.append(''.join(lines))
+                lines = []
+            segments.append(value)
+
+    if lines:
+        segments.append(''.join(lines))
+
+    return segments
+
+
+def TPEG_render_segments(segments, output):
+    """ write text segments, render node segments """
+    write = output.write
+    for segment in segments:
+        if segment.__class__ is str:
+            write(segment)
+        else:
+            segment.render(output)
+
+
+#
+# === class TPEG_output ===============================================
+#
+class TPEG_output(object):
+    def __init__(self, stream=None, buffer_size=1 << 20):
+        """ buffered output to a text stream (default: sys.stdout) """
+        self.stream      = stream if stream is not None else sys.stdout
+        self.buffer_size = buffer_size
+        self._parts      = []
+        self._size       = 0
+
+    def write(self, text):
+        """ add text to the buffer, write buffer to the stream when full """
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def line(self, text=''):
+        """ add a line of text, like print(text) """
+        self.write(text + '\n')
+
+    def flush(self):
+        """ write buffered text to the stream """
+        if self._parts:
+            self.stream.write(''.join(self._parts))
+            self._parts = []
+            self._size  = 0
+
+
+def TPEG_render(render, output=None):
+    """
+    Call render(output) with a TPEG_output.
+
+    output may be a TPEG_output (buffer is shared with the caller), a text stream or
+    None for sys.stdout; in the latter cases the rendered text is written on return.
+    """
+    if isinstance(output, TPEG_output):
+        render(output)
+    else:
+        output = TPEG_output(output)
+        render(output)
+        output.flush()
+
+
+if __name__ == '__main__':
+    print("TPEG_output")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Packing of encoded application messages into TPEG transport frames
+#
+# Messages are distributed over as few service frames as possible (first fit decreasing)
+# while every service frame stays within the size limit, measured after compression for
+# compressed frames. Messages of one priority share a component frame.
+#
+import zlib
+#
+from .TPEG_error import TPEG_log_error
+from .TPEG_writer import TPEG_writer, TPEG_to_binary
+from .TPEG_frame import TPEG_Transport_Frame, TPEG_ServiceFrame1
+from .TPEG_component_frame import TPEG_component_frame, TPEG_ProtectedCountedComp_frame, TPEG_ProtPrioCountedComp_frame
+
+# max size of the service frame payload (8KB - 11 bytes overhead)
+TPEG_MAX_SERVICE_FRAME_PAYLOAD = 8181
+
+# max number of messages in one (counted) component frame
+TPEG_MAX_MESSAGE_COUNT = 255
+
+# component frame continuations with a messageCount attribute
+_counted_frames = (TPEG_ProtectedCountedComp_frame, TPEG_ProtPrioCountedComp_frame)
+
+# service encryption IDs of frames compressed by TPEG_ServiceFrame1.write_binary()
+_compressed_EncIDs = (107,)
+
+
+class TPEG_encoded_component(object):
+    def __init__(self, binary_string):
+        """ an already encoded component (e.g. complete application message) """
+        self.binary_string = binary_string
+
+    def write_binary(self, writer):
+        writer.write(self.binary_string)
+
+
+#
+# a service frame being filled
+#
+class _frame_bin(object):
+    def __init__(self, compress):
+        self.groups = {}    # priority -> list of component frames (lists of messages)
+        self.order = []     # (priority, message) in order of packing
+        self.size = 0       # uncompressed payload size
+        self.compressor = zlib.compressobj() if compress else None
+        self.compressed = 0  # compressed bytes output so far
+        self.closed = False  # no further messages
+
+    def group_for(self, priority, max_count):
+        """ component frame to add a message of priority to, None if a new one is needed """
+        frames = self.groups.get(priority)
+        if frames and (max_count is None or len(frames[-1]) < max_count):
+            return frames[-1]
+        return None
+
+    def fits(self, message, priority, overhead, max_count, limit):
+        if self.closed:
+            return False
+
+        new_group = self.group_for(priority, max_count) is None
+        size = self.size + len(message) + (overhead if new_group else 0)
+        if self.compressor is None:
+            return size <= limit
+
+        # size after compression: continue a copy of the compressor with the message
+        compressor = self.compressor.copy()
+        estimate = self.compressed + len(compressor.compress(message)) + len(compressor.flush())
+        ngroups = sum(len(frames) for frames in self.groups.values()) + new_group
+        return estimate + overhead * ngroups <= limit
+
+    def add(self, message, priority, overhead, max_count):
+        group = self.group_for(priority, max_count)
+        if group is None:
+            group = []
+            self.groups.setdefault(priority, []).append(group)
+            self.size += overhead
+
+        group.append(message)
+        self.order.append((priority, message))
+        self.size += len(message)
+        if self.compressor is not None:
+            self.compressed += len(self.compressor.compress(message))
+
+    def remove_last(self):
+        priority, message = self.order.pop()
+        frames = self.groups[priority]
+        frames[-1].pop()
+        if not frames[-1]:
+            frames.pop()
+            if not frames:
+                del self.groups[priority]
+
+        return priority, message
+
+
+#
+# === class TPEG_frame_packer ===============================================
+#
+class TPEG_frame_packer(object):
+    def __init__(self, SID, SCID, EncID=0, continuation_class=TPEG_ProtPrioCountedComp_frame,
+                 max_size=TPEG_MAX_SERVICE_FRAME_PAYLOAD):
+        """
+        Pack messages for one service component (SID, SCID) into transport frames.
+
+        continuation_class is the application frame continuation, e.g. TPEG_TEC_frame_continuation;
+        EncID 107 frames are zlib compressed and measured after compression.
+        """
+        self.SID = SID
+        self.SCID = SCID
+        self.EncID = EncID
+        self.continuation_class = continuation_class
+        self.max_size = max_size
+
+        self.messages = []  # (priority, encoded message)
+
+        # fixed size of a component frame around its messages: header, prio/count attributes, dataCRC
+        probe = self.new_component_frame(0, [])
+        self.overhead = len(probe.to_binary())
+        self.max_count = TPEG_MAX_MESSAGE_COUNT if issubclass(continuation_class, _counted_frames) else None
+
+    def add(self, message, priority=0):
+        """ add an encoded message (bytes) or a component (with write_binary()) """
+        if not isinstance(message, (bytes, bytearray)):
+            message = TPEG_to_binary(message)
+        self.messages.append((priority, bytes(message)))
+
+    def new_component_frame(self, priority, messages):
+        continuation = self.continuation_class(self.SCID)
+        continuation.groupPriority = priority
+        continuation.messageCount = len(messages)
+        continuation.components = [TPEG_encoded_component(message) for message in messages]
+
+        frame = TPEG_component_frame(1, SID=self.SID)
+        frame.SCID = self.SCID
+        frame.frame_continuation = continuation
+
+        return frame
+
+    def new_transport_frame(self, bin):
+        serviceframe = TPEG_ServiceFrame1(0)
+        serviceframe.SID = self.SID
+        serviceframe.EncID = self.EncID
+        for priority in sorted(bin.groups):
+            for messages in bin.groups[priority]:
+                serviceframe.CompFrames.append(self.new_component_frame(priority, messages))
+
+        frame = TPEG_Transport_Frame(0)
+        frame.ServiceFrameType = 1
+        frame.serviceframe = serviceframe
+
+        return frame
+
+    def payload_size(self, frame):
+        """ service frame size after SID and EncID, as written (compressed) """
+        writer = TPEG_writer()
+        frame.serviceframe.write_binary(writer)
+        return writer.len() - 4
+
+    def pack(self):
+        """ return list of TPEG_Transport_Frame holding all messages added """
+        compress = self.EncID in _compressed_EncIDs
+        bins = []
+
+        # first fit decreasing
+        pending = sorted(self.messages, key=lambda item: len(item[1]), reverse=True)
+        while pending:
+            retry = []
+            for priority, message in pending:
+                for bin in bins:
+                    if bin.fits(message, priority, self.overhead, self.max_count, self.max_size):
+                        break
+                else:
+                    bin = _frame_bin(compress)
+                    bins.append(bin)
+                    if not bin.fits(message, priority, self.overhead, self.max_count, self.max_size):
+                        TPEG_log_error("==> TPEG frame packer: message of %d bytes does not fit in a service frame"
+                                       % len(message))
+
+                bin.add(message, priority, self.overhead, self.max_count)
+
+            # compressed sizes are estimates (messages are grouped by priority in the frame): check
+            # the real size and re-pack what does not fit
+            for bin in bins:
+                while compress and len(bin.order) > 1 and \
+                        self.payload_size(self.new_transport_frame(bin)) > self.max_size:
+                    retry.append(bin.remove_last())
+                    bin.closed = True
+
+            pending = sorted(retry, key=lambda item: len(item[1]), reverse=True)
+
+        return [self.new_transport_frame(bin) for bin in bins]
+
+    def to_binary(self):
+        """ all messages packed, as binary string of transport frames """
+        writer = TPEG_writer()
+        for frame in self.pack():
+            frame.write_binary(writer)
+        return writer.string()
+
+
+if __name__ == '__main__':
+    print("TPEG_packer")
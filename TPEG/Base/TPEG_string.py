@@ -29,9 +29,11 @@
 #
 #
 import sys, zlib, struct, math
+from array import array
 #
 #
 from .TPEG_error import TPEG_log_error
+from .TPEG_output import TPEG_register_value_formatter
 #
 # datetime is needed for unix time conversion
 from datetime import datetime
@@ -57,33 +59,115 @@ def _tostring(a, b):
     return a + chr(b)
 
 
+#
+# ISO way of coordinate conversion
+def _WGS84Coord(val):
+    return round((1.0 * val - math.copysign(0.5, val)) * 360.0 / 2 ** 24, 5)
+
+
+#
+# compiled record layouts for read_records(), by struct format
+_record_structs = {}
+
+# a signed 24 bit integer pair as signed high byte and unsigned low word each
+_int24_pair_struct = struct.Struct('>bHbH')
+
+
+#
+# decoded TPEG strings
+#
+def _decode_text(data):
+    """ decode string bytes as UTF-8, invalid sequences are replaced """
+    return bytes(data).decode('utf-8', errors='replace')
+
+
+class TPEG_text(str):
+    """ text of a (Short/Long)String; printed in double quotes """
+    __slots__ = ()
+
+
+class TPEG_localised_text(TPEG_text):
+    """ text of a Localised(Short/Long)String with its language code """
+    __slots__ = ('language',)
+
+    def __new__(cls, text, language):
+        self = super().__new__(cls, text)
+        self.language = language
+        return self
+
+    def __getnewargs__(self):
+        return str(self), self.language
+
+
+TPEG_register_value_formatter(TPEG_text, lambda text: '"' + text + '"')
+TPEG_register_value_formatter(TPEG_localised_text, lambda text: 'LangCode: %d, "' % text.language + text + '"')
+
+
 #
 # Helper class for selectors
 #
+# bit 0 of a selector is the 0x40 bit of its first byte: each byte holds 7 bits in reversed
+# order, precomputed here for all 7 bit values
+_selector_bits = [sum(1 << j for j in range(7) if el & (0x40 >> j)) for el in range(128)]
+
+
 class TPEG_BitArray:
+    __slots__ = ('value', 'mask', '_bits')
+
     def __init__(self, value):
         ''' given a list of unsigned integers (incl possible continuation flags, return TPEG_BitArray class '''
         self.value = value
-        self.bits = []
+        self._bits = None
 
-        # convert to options
+        # convert to one integer, bit n is option n
+        mask = 0
+        shift = 0
         for el in value:
-            self.bits.extend([el & 0x40, el & 0x20, el & 0x10, el & 0x08, el & 0x04, el & 0x02, el & 0x01])
-
-        # convert to True/False
-        self.options = [x > 0 and True or False for x in self.bits]
+            mask |= _selector_bits[el & 0x7F] << shift
+            shift += 7
+        self.mask = mask
 
         return
 
+    @classmethod
+    def from_mask(cls, mask, nbytes=1):
+        """ selector with the bits of integer mask set, at least nbytes long """
+        value = []
+        while mask or len(value) < nbytes:
+            value.append(_selector_bits[mask & 0x7F] | 0x80)  # continuation, except last byte
+            mask >>= 7
+        value[-1] &= 0x7F
+
+        return cls(value)
+
+    @property
+    def bits(self):
+        """ masked selector bits (0 if not set) as list, 7 per byte """
+        if self._bits is None:
+            self._bits = [el & m for el in self.value for m in (0x40, 0x20, 0x10, 0x08, 0x04, 0x02, 0x01)]
+        return self._bits
+
+    @property
+    def options(self):
+        """ selector bits as list of True/False """
+        return [x > 0 for x in self.bits]
+
     def is_set(self, bit):
-        val = False
-        try:
-            val = self.options[bit]
-        except:
-            pass
+        return bit >= 0 and (self.mask >> bit) & 1 == 1
 
-        # print "BitArray Option %d has value"%bit, val, self.options
-        return val
+    def __iter__(self):
+        """ iterate over the numbers of the set bits """
+        mask = self.mask
+        bit = 0
+        while mask:
+            if mask & 1:
+                yield bit
+            mask >>= 1
+            bit += 1
+
+
+# selectors of a single byte are shared, see TPEG_string.BitArray()
+_single_byte_selectors = [TPEG_BitArray([el]) for el in range(128)]
 
 
 #
@@ -151,10 +235,59 @@ class TPEG_string:
 
         return TPEGstring
 
+    #
+    # bulk readers: decode n items of a fixed layout in one call
+    #
+    def _popbytes(self, size, n, name):
+        """ pop the bytes of n records of size bytes (only whole records if data is short)"""
+        available = len(self.data) // size
+        if n > available:
+            TPEG_log_error("==> TPEG string: not enough data for %s(%d)" % (name, n))
+            n = available
+
+        length = size * n
+        data = bytes(self.data[:length])
+        self.data = self.data[length:]
+
+        return data
+
+    def read_uint8_array(self, n):
+        """ decode n Unsigned Integer Tiny as array('B')"""
+        return array('B', self._popbytes(1, n, 'read_uint8_array'))
+
+    def read_uint16be_array(self, n):
+        """ decode n Unsigned Integer Little (big endian) as array('H')"""
+        values = array('H', self._popbytes(2, n, 'read_uint16be_array'))
+        if sys.byteorder == 'little':
+            values.byteswap()
+
+        return values
+
+    def read_int24_pairs(self, n):
+        """ decode n pairs of Signed Integer 24 bit as list of tuples"""
+        data = self._popbytes(6, n, 'read_int24_pairs')
+
+        return [((a << 16) | b, (c << 16) | d) for a, b, c, d in _int24_pair_struct.iter_unpack(data)]
+
+    def read_records(self, fmt, n):
+        """ decode n records of struct format fmt (e.g. '>BhhHh') as list of tuples"""
+        try:
+            record = _record_structs[fmt]
+        except KeyError:
+            record = _record_structs[fmt] = struct.Struct(fmt)
+
+        return list(record.iter_unpack(self._popbytes(record.size, n, 'read_records')))
+
     def BitArray(self):
         """ decode a BitArray"""
         val = []
         try:
+            el = self.data[0]
+            if el < 0x80:
+                # no continuation: by far the most frequent case
+                self.data = self.data[1:]
+                return _single_byte_selectors[el]
+
             i = 0
             done = False
 
@@ -182,11 +315,8 @@ class TPEG_string:
         except IndexError:
             TPEG_log_error("==> TPEG string: not enough data for ByteFieldAttribute")
 
-        s = ''
-        for i in data:
-            s = s + chr(i)
-
-        return s
+        # arbitrary bytes: one character per byte
+        return bytes(data).decode('latin-1')
 
     def IntUnTi(self):
         """ decode an Unsigned Integer Tiny"""
@@ -236,7 +366,17 @@ class TPEG_string:
     def IntSi24asWGS84Coord(self):
         val = self.IntSi24()
 
-        return round((1.0 * val - math.copysign(0.5, val)) * 360.0 / 2 ** 24, 5)
+        return _WGS84Coord(val)
+
+    def WGS84CoordinatePair(self):
+        """ decode longitude and latitude (Signed Integer 24 bit each) in one go"""
+        if len(self.data) < 6:
+            # short data: report as the single coordinate readers do
+            return self.IntSi24asWGS84Coord(), self.IntSi24asWGS84Coord()
+
+        [(lon, lat)] = self.read_int24_pairs(1)
+
+        return _WGS84Coord(lon), _WGS84Coord(lat)
 
     def IntUnLi(self):
         """ decode an Unsigned Integer Little"""
@@ -385,11 +525,7 @@ class TPEG_string:
         except IndexError:
             TPEG_log_error("==> TPEG string: not enough data for ShortString")
 
-        s = ''
-        for i in data:
-            s = s + chr(i)
-
-        return '"' + s + '"'
+        return TPEG_text(_decode_text(data))
 
     def LongString(self):
         data = []
@@ -399,11 +535,7 @@ class TPEG_string:
         except IndexError:
             TPEG_log_error("==> TPEG string: not enough data for LongString")
 
-        s = ''
-        for i in data:
-            s = s + chr(i)
-
-        return '"' + s + '"'
+        return TPEG_text(_decode_text(data))
 
     def LocalisedShortString(self):
         data = []
@@ -415,11 +547,7 @@ class TPEG_string:
         except IndexError:
             TPEG_log_error("==> TPEG string: not enough data for LocalisedShortString")
 
-        s = 'LangCode: %d, ' % LCcode + "\""
-        for i in data:
-            s = s + chr(i)
-        s += "\""
-        return s
+        return TPEG_localised_text(_decode_text(data), LCcode)
 
     def LocalisedLongString(self):
         data = []
@@ -431,11 +559,7 @@ class TPEG_string:
         except IndexError:
             TPEG_log_error("==> TPEG string: not enough data for LongString")
 
-        s = 'LangCode: %d, ' % LCcode + "\""
-        for i in data:
-            s = s + chr(i)
-
-        return s + "\""
+        return TPEG_localised_text(_decode_text(data), LCcode)
 
     def ServiceIdentifier(self):
         SIDa = self.IntUnTi()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# Compiled TPEG code tables
+#
+# The code tables (code -> text dictionaries, main tables and switch tables selected by a
+# main code) are compiled once at import into flat lookup structures:
+#   - per table a tuple indexed by code with the texts and one with the preformatted
+#     "code: text" strings, and the sorted code list
+#   - one dictionary (table, switch code, code) -> "code: text" for the decoders
+#   - reverse indexes text -> code, by exact text and by normalised text, built on first
+#     use as decoders never need them
+#
+from .TPEG_error import TPEG_log_error
+
+# codes of the placeholder entries present in every switch table
+_TPEG_placeholders = (0, 255)
+
+def TPEG_normalise(text):
+    """ lower case text with only letters and digits, used as key of the reverse indexes """
+    return ''.join(c for c in text.lower() if c.isalnum())
+
+# === class TPEG_code_table ===
+class TPEG_code_table:
+    """ one compiled code table """
+    __slots__ = ('name', 'switch_code', 'table', 'texts', 'formatted', 'codes', '_index')
+
+    def __init__(self, name, table, switch_code=None):
+        self.name        = name
+        self.switch_code = switch_code
+        self.table       = table
+        self.codes       = tuple(sorted(table))
+        #
+        # codes are IntUnTi, the tuples are indexed by code directly
+        size = self.codes[-1] + 1 if self.codes else 0
+        self.texts     = tuple(table.get(code) for code in range(size))
+        self.formatted = tuple(None if text is None else "%d: %s" % (code, text)
+                               for code, text in enumerate(self.texts))
+        self._index    = None
+
+    @property
+    def index(self):
+        """ text (exact and normalised) -> code, first code of a text wins """
+        if self._index is None:
+            self._index = {}
+            for code in self.codes:
+                text = self.table[code]
+                self._index.setdefault(text, code)
+                self._index.setdefault(TPEG_normalise(text), code)
+        return self._index
+
+    def text(self, code):
+        """ text of code, None if unknown """
+        if 0 <= code < len(self.texts):
+            return self.texts[code]
+        return None
+
+    def code(self, text, default=None):
+        """ code of text (exact or normalised), default if unknown """
+        code = self.index.get(text)
+        if code is None:
+            code = self.index.get(TPEG_normalise(text), default)
+        return code
+
+# === class TPEG_code_tables ===
+class TPEG_code_tables:
+    """ the compiled main and switch tables of one application (e.g. 'EAW') """
+
+    def __init__(self, application, tables, switch_tables):
+        self.application   = application
+        self.tables        = {}
+        self.formatted     = {}
+        self.switch_tables = switch_tables
+        self.switch_index  = {}
+
+        for name, table in tables.items():
+            self._add(TPEG_code_table(name, table))
+
+        for name, switched in switch_tables.items():
+            for switch_code, table in switched.items():
+                self._add(TPEG_code_table(name, table, switch_code))
+
+    def _add(self, compiled):
+        key = (compiled.name, compiled.switch_code)
+        self.tables[key] = compiled
+        for code in compiled.codes:
+            self.formatted[(compiled.name, compiled.switch_code, code)] = compiled.formatted[code]
+        return compiled
+
+    def table(self, TPEG_table, switch_code=None):
+        """ compiled table, None if unknown """
+        return self.tables.get((TPEG_table, switch_code))
+
+    def code_to_text(self, code, TPEG_table, switch_code=None):
+        """ "code: text" of a code, an error text for unknown codes or tables """
+        text = self.formatted.get((TPEG_table, switch_code, code))
+        if text is not None:
+            return text
+
+        if (TPEG_table, switch_code) in self.tables:
+            text = str(code)+": Invalid/Unknown Code in table %s"%TPEG_table
+
+            if switch_code is not None:
+                text += ", switched with code "+str(switch_code)
+        else:
+            text = str(code)+": Invalid/Unknown %s table %s"%(self.application, TPEG_table)
+            error_string = "==> %s: unknown table  %s"%(self.application, TPEG_table)
+
+            if switch_code is not None:
+                error_string += ", switched with code "+str(switch_code)
+                text         += ", switched with code "+str(switch_code)
+
+            TPEG_log_error(error_string)
+
+        return text
+
+    def code_list(self, TPEG_table, switch_code=None):
+        """ sorted list of the codes of a table, None if unknown """
+        compiled = self.tables.get((TPEG_table, switch_code))
+        if compiled is None:
+            return None
+        return list(compiled.codes)
+
+    def text_to_code(self, text, TPEG_table, switch_code=None, default=None):
+        """ code of a text (exact or normalised) in a table, default if unknown """
+        compiled = self.tables.get((TPEG_table, switch_code))
+        if compiled is None:
+            return default
+        return compiled.code(text, default)
+
+    def text_to_switch_code(self, text, TPEG_table, default=None):
+        """ (main code, sub code) of a text of one of the switch tables of TPEG_table """
+        index = self.switch_index.get(TPEG_table)
+        if index is None:
+            if TPEG_table not in self.switch_tables:
+                return default
+            #
+            # sub table texts -> (main code, sub code), placeholders left out
+            index = self.switch_index[TPEG_table] = {}
+            for switch_code, table in self.switch_tables[TPEG_table].items():
+                for code in sorted(table):
+                    if code not in _TPEG_placeholders:
+                        index.setdefault(table[code], (switch_code, code))
+                        index.setdefault(TPEG_normalise(table[code]), (switch_code, code))
+        found = index.get(text)
+        if found is None:
+            found = index.get(TPEG_normalise(text), default)
+        return found
+
+if __name__ == '__main__':
+    print("TPEG_tables")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+# Warm start of the SNI registry
+#
+# Component frames are decoded through the SNI fast tuning table (SNI component 01) stored
+# in Registry[SID][SCID] = [AID, OriginatorSID, COID, optime, EncID, SafetyFlag]. Until the
+# carousel brings SNI component 01, frames of a joined broadcast or mid-stream capture
+# cannot be decoded. Two helpers shorten that:
+#
+# A TPEG_SNI_snapshot stored as Registry["SNISnapshot"] keeps the last fast tuning table
+# (with its sni_table_version) of every SID in a small JSON file per SID, and fills a new
+# Registry from these files. Tables loaded from files are replaced by the live SNI when it
+# arrives; files are only rewritten when the live table differs.
+#
+# A TPEG_pending_frames stored as Registry["PendingFrames"] keeps component frames whose
+# SCID is not yet known, and parses them in place once an SNI frame registers their SCID.
+#
+import os
+import json
+from collections import deque
+
+from .TPEG_error  import TPEG_log_error
+from .TPEG_string import TPEG_string
+
+# === class TPEG_SNI_snapshot ===
+class TPEG_SNI_snapshot(object):
+    """ fast tuning tables per SID, persisted as <directory>/SNI_<SID>.json """
+
+    def __init__(self, directory):
+        self.directory = directory
+        # SID -> (sni_table_version, {SCID: [AID, OriginatorSID, COID, optime, EncID, SafetyFlag]})
+        self.tables    = {}
+        # SIDs of a Registry filled from files, not yet confirmed by live SNI
+        self.warm      = set()
+        self.load()
+
+    def _filename(self, SID):
+        return os.path.join(self.directory, "SNI_%s.json" % SID)
+
+    def load(self):
+        """ read all snapshot files of the directory """
+        if not os.path.isdir(self.directory):
+            return
+
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("SNI_") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                table = {int(SCID): entry for SCID, entry in snapshot["components"].items()}
+                self.tables[snapshot["SID"]] = (snapshot["sni_table_version"], table)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                TPEG_log_error("==> SNI snapshot: %s not readable, skipped: %s" % (name, e))
+
+    def warm_start(self, Registry):
+        """ fill Registry with the stored tables, live entries are kept """
+        Registry["SNISnapshot"] = self
+        for SID, (version, table) in self.tables.items():
+            live = Registry.setdefault(SID, {})
+            for SCID, entry in table.items():
+                if SCID not in live:
+                    live[SCID] = list(entry)
+            self.warm.add(SID)
+
+    def update(self, Registry, SID, version, components):
+        """ live fast tuning table of SID (SNI component 01), components as [SCID, AID, ...] rows """
+        table = {component[0]: list(component[1:]) for component in components}
+
+        if SID in self.warm:
+            # first live table: SCIDs of the stored table no longer announced are dropped
+            self.warm.discard(SID)
+            live = Registry.get(SID, {})
+            for SCID in [SCID for SCID in live if SCID not in table]:
+                del live[SCID]
+
+        if self.tables.get(SID) != (version, table):
+            self.tables[SID] = (version, table)
+            self.write(SID)
+
+    def write(self, SID):
+        """ write the table of SID, replacing the file at once """
+        version, table = self.tables[SID]
+        snapshot = {"SID": SID, "sni_table_version": version,
+                    "components": {str(SCID): entry for SCID, entry in sorted(table.items())}}
+        filename = self._filename(SID)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(filename + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=1)
+            os.replace(filename + ".tmp", filename)
+        except OSError as e:
+            TPEG_log_error("==> SNI snapshot: %s not written: %s" % (filename, e))
+
+# === class TPEG_pending_frames ===
+class TPEG_pending_frames(object):
+    """ component frames with an unknown SCID, replayed when SNI registers the SCID """
+
+    def __init__(self, max_frames=1024):
+        self.max_frames = max_frames
+        # component frames of all SIDs and SCIDs, oldest first
+        self.frames     = deque()
+        # frames decoded by replay, taken by exporters writing frames as they are parsed
+        self.replayed   = []
+
+    def add(self, frame):
+        """ keep frame (continuation_string holds its content), the oldest frame is dropped when full """
+        self.frames.append(frame)
+        if len(self.frames) > self.max_frames:
+            self._skip(self.frames.popleft())
+
+    def _skip(self, frame):
+        TPEG_log_error(
+            "==> TPEG Component frame: no AID registered/frame_type known for SCID %d, skipped\n" % frame.SCID)
+
+    def replay(self, SID, Registry):
+        """ parse the frames of SID whose SCID is registered now """
+        table  = Registry.get(SID, {})
+        frames = [frame for frame in self.frames if frame.SID == SID and frame.SCID in table]
+        if frames:
+            self.frames = deque(frame for frame in self.frames if frame.SID != SID or frame.SCID not in table)
+            for frame in frames:
+                frame.parse_frame(TPEG_string(frame.continuation_string), Registry)
+                self.replayed.append(frame)
+        Registry["SID"] = SID
+
+    def take_replayed(self):
+        """ frames decoded by replay since the last call """
+        replayed, self.replayed = self.replayed, []
+        return replayed
+
+    def drop(self):
+        """ skip all frames still waiting, e.g. at the end of a recording """
+        for frame in self.frames:
+            self._skip(frame)
+        self.frames.clear()
+
+
+if __name__ == '__main__':
+    print("TPEG_warm_start")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# TPEG binary writer: the encoding counterpart of TPEG_string
+#
+# All write_binary() methods write into one growing bytearray. Lengths which precede
+# their content are either reserved and back-patched (fixed size) or inserted once the
+# content is written (multi-byte lengths).
+#
+import struct
+#
+from .TPEG_CRC import TPEG_CRC
+from .TPEG_data_types import encodeIntUnLoMB, encodeIntSiLoMB
+
+
+_IntSiTi = struct.Struct('>b')
+_IntUnLi = struct.Struct('>H')
+_IntSiLi = struct.Struct('>h')
+_IntUnLo = struct.Struct('>L')
+
+
+#
+# === class TPEG_writer ===============================================
+#
+class TPEG_writer:
+    def __init__(self, data=b''):
+        self.data = bytearray(data)
+
+    def len(self):
+        """ return length of written data"""
+        return len(self.data)
+
+    def string(self):
+        return bytes(self.data)
+
+    def write(self, data):
+        """ append bytes (or list of byte values)"""
+        self.data.extend(data)
+
+    #
+    # length prefixes and CRCs
+    #
+    def reserve(self, length):
+        """ reserve length bytes to be patched later, return their position"""
+        pos = len(self.data)
+        self.data += bytes(length)
+        return pos
+
+    def patch_IntUnLi(self, pos, val):
+        """ write an Unsigned Integer Little at a reserved position"""
+        try:
+            _IntUnLi.pack_into(self.data, pos, val)
+        except struct.error:
+            print("==> TPEG writer: IntUnLi value out of range", val)
+
+    def insert_IntUnLoMB(self, pos, val):
+        """ insert an Unsigned Integer MultiByte at position pos (e.g. length of the data written since pos)"""
+        self.data[pos:pos] = encodeIntUnLoMB(val)
+
+    def CRC(self, start=0, end=None):
+        """ TPEG CRC of the written data from start (to end)"""
+        return TPEG_CRC(self.data[start:end])
+
+    #
+    # primitives
+    #
+    def IntUnTi(self, val):
+        """ encode an Unsigned Integer Tiny"""
+        if 0 <= val <= 0xFF:
+            self.data.append(val)
+        else:
+            print("==> TPEG writer: IntUnTi value out of range", val)
+
+    def IntSiTi(self, val):
+        """ encode a Signed Integer Tiny"""
+        try:
+            self.data += _IntSiTi.pack(val)
+        except struct.error:
+            print("==> TPEG writer: IntSiTi value out of range", val)
+
+    def IntUnLi(self, val):
+        """ encode an Unsigned Integer Little"""
+        try:
+            self.data += _IntUnLi.pack(val)
+        except struct.error:
+            print("==> TPEG writer: IntUnLi value out of range", val)
+
+    def IntSiLi(self, val):
+        """ encode a Signed Integer Little"""
+        try:
+            self.data += _IntSiLi.pack(val)
+        except struct.error:
+            print("==> TPEG writer: IntSiLi value out of range", val)
+
+    def IntUn24(self, val):
+        """ encode an Unsigned Integer 24 bit"""
+        if 0 <= val <= 0xFFFFFF:
+            self.data += val.to_bytes(3, 'big')
+        else:
+            print("==> TPEG writer: IntUn24 value out of range", val)
+
+    def IntSi24(self, val):
+        """ encode a Signed Integer 24 bit"""
+        if -0x800000 <= val <= 0x7FFFFF:
+            self.data += val.to_bytes(3, 'big', signed=True)
+        else:
+            print("==> TPEG writer: IntSi24 value out of range", val)
+
+    def IntUnLo(self, val):
+        """ encode an Unsigned Integer Long"""
+        try:
+            self.data += _IntUnLo.pack(val)
+        except struct.error:
+            print("==> TPEG writer: IntUnLo value out of range", val)
+
+    def IntUnLoMB(self, val):
+        """ encode an Unsigned Integer MultiByte"""
+        self.data += encodeIntUnLoMB(val)
+
+    def IntSiLoMB(self, val):
+        """ encode a Signed Integer MultiByte"""
+        self.data += encodeIntSiLoMB(val)
+
+    def BitArray(self, selector):
+        """ encode a selector (TPEG_BitArray)"""
+        self.data.extend(selector.value)
+
+    def DateTime(self, timestamp):
+        """ encode an UTC timestamp (seconds since 1970)"""
+        self.IntUnLo(timestamp)
+
+    def ServiceIdentifier(self, SID):
+        """ encode a SID given as 'a.b.c'"""
+        for SIDel in SID.split('.'):
+            self.IntUnTi(int(SIDel))
+
+    #
+    # strings, all strings are written as UTF-8
+    #
+    def ShortString(self, string):
+        data = string.encode('utf-8')
+        if len(data) > 255:
+            print("==> TPEG writer: ShortString too long", len(data), "truncated")
+            data = data[:255]
+
+        self.data.append(len(data))
+        self.data += data
+
+    def LongString(self, string):
+        data = string.encode('utf-8')
+        if len(data) > 65535:
+            print("==> TPEG writer: LongString too long", len(data), "truncated")
+            data = data[:65535]
+
+        self.data += _IntUnLi.pack(len(data))
+        self.data += data
+
+    def LocalisedShortString(self, string, LC=None):
+        """ LC defaults to the language of a decoded string, otherwise English (38)"""
+        self.IntUnTi(getattr(string, 'language', 38) if LC is None else LC)
+        self.ShortString(string)
+
+    def LocalisedLongString(self, string, LC=None):
+        """ LC defaults to the language of a decoded string, otherwise English (38)"""
+        self.IntUnTi(getattr(string, 'language', 38) if LC is None else LC)
+        self.LongString(string)
+
+
+def TPEG_to_binary(obj):
+    """ binary string of a frame, component or data structure, written by its write_binary()"""
+    writer = TPEG_writer()
+    obj.write_binary(writer)
+    return writer.string()
+
+
+if __name__ == '__main__':
+    print("TPEG_writer")
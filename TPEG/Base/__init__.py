@@ -35,5 +35,12 @@ __all__ = ["TPEG_CRC",
            "TPEG_SNI_base_component",
            "TPEG_component_frame",
            "TPEG_frame",
-           "TPEG_sync_frame"
+           "TPEG_sync_frame",
+           "TPEG_output",
+           "TPEG_writer",
+           "TPEG_packer",
+           "TPEG_dedup",
+           "TPEG_tables",
+           "TPEG_applications",
+           "TPEG_warm_start"
            ]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+#
+# Copyright 2023-2024 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# This file converts CAP 1.2 alerts (files, feeds or zip archives of them) into TPEG binary
+# frames with EAW messages. Files are converted on a process pool, all messages are packed
+# into transport frames after one SNI frame.
+
+import sys
+import optparse
+
+from Base.TPEG_error import TPEG_error_suppress_reports
+
+from TpegApps.TPEG_EAW_CAP import CAP_sources, CAP_transcode, EAW_frames, EAW_MAX_COORDINATES
+from typing import List, Tuple
+from optparse import Values
+
+
+def parse_options() -> Tuple[Values, List[str]]:
+    """
+    Parse command line options for the CAP to EAW converter.
+
+    Returns:
+        A tuple containing the parsed options and arguments.
+    """
+    usage = "usage: %prog [options] <CAP files or zip archives>"
+    parser = optparse.OptionParser(usage)
+
+    # define defaults
+    parser.set_defaults(processes=None,
+                        max_coordinates=EAW_MAX_COORDINATES,
+                        SID="0.225.225",
+                        SCID=5,
+                        COID=20,
+                        EncID=0,
+                        suppress_errors=False,
+                        output=None)
+    #
+    #
+    # configuration options
+    parser.add_option("-p", "--processes",
+                      help="number of worker processes (default number of CPUs)",
+                      action="store", type="int", dest="processes")
+    parser.add_option("-c", "--max_coordinates",
+                      help="max number of coordinates of the areas of a message (default %default)",
+                      action="store", type="int", dest="max_coordinates")
+    parser.add_option("--SID",
+                      help="service ID (default %default)",
+                      action="store", type="string", dest="SID")
+    parser.add_option("--SCID",
+                      help="service component ID of EAW (default %default)",
+                      action="store", type="int", dest="SCID")
+    parser.add_option("--COID",
+                      help="content ID of EAW (default %default)",
+                      action="store", type="int", dest="COID")
+    parser.add_option("--EncID",
+                      help="service encryption ID, 107 for compressed frames (default %default)",
+                      action="store", type="int", dest="EncID")
+    parser.add_option("-o", "--output",
+                      help="write TPEG frames to file instead of stdout (default stdout)",
+                      action="store", type="string", dest="output")
+    #
+    # binary options
+    parser.add_option("-E", "--WithoutErrors",
+                      help="Suppress showing of errors (default %default)",
+                      action="store_true", dest="suppress_errors")
+    #
+
+    (options, args) = parser.parse_args()
+
+    if len(args) == 0:
+        parser.print_help()
+        exit(0)
+
+    return options, args
+
+
+# run when file is run on command line
+if __name__ == '__main__':
+
+    options, args = parse_options()
+    #
+    # do not show error reports if suppressed
+    if options.suppress_errors:
+        TPEG_error_suppress_reports(options.suppress_errors)
+
+    messages = CAP_transcode(CAP_sources(args), options.processes, options.max_coordinates)
+    frames = EAW_frames(messages, options.SID, options.SCID, options.COID, options.EncID)
+
+    if options.output:
+        with open(options.output, 'wb') as f:
+            f.write(frames)
+    else:
+        sys.stdout.buffer.write(frames)
+
+    sys.exit(0)
@@ -35,14 +35,28 @@ import json
 from time import sleep
 
 from Base.TPEG_error import TPEG_error_suppress_reports
-from Base.TPEG_string import TPEG_string
+from Base.TPEG_string import TPEG_string, TPEG_text
+from Base.TPEG_output import TPEG_format_value
 from Base.TPEG_frame import TPEG_Transport_Frame
 from Base.TPEG_sync_frame import TPEG_sync_frame
+from Base.TPEG_applications import TPEG_application_registry, TPEG_APPLICATIONS
+from Utils.TPEGquery import TPEG_query
 
-from TpegApps import *
 from typing import List, Tuple, Dict, Optional, Union
 from optparse import Values
 
+# AID to frame continuation mapping of SNI, TEC and EAW, imported when first referred to
+TPEG_applications = TPEG_application_registry({AID: TPEG_APPLICATIONS[AID] for AID in (0, 5, 15)},
+                                              entry_points=False)
+
+# OpenLR locations of the AffectedArea and InformationArea containers
+_OLR_DESCRIPTIONS = TPEG_query("LRC/LRC_OLR/OLR_LocationDescription")
+_OLR_POLYGONS = TPEG_query("LRC/LRC_OLR/OLR_PolygonLR")
+_OLR_POLYGON_COORDINATES = TPEG_query("OLR_PolygonLR/*")
+_OLR_RECTANGLES = TPEG_query("LRC/LRC_OLR/OLR_RectangleLR")
+_OLR_RECTANGLE_COORDINATES = TPEG_query("OLR_RectangleLR/*/OLR_AbsoluteGeoCoordinate")
+
+
 def export_TPEG_EAW_to_JSON(bytestring: bytes, fname: str) -> List[Dict[str, Union[str, Dict[str, str]]]]:
     """
     Parse a binary TPEG string and export it to JSON.
@@ -55,11 +69,6 @@ def export_TPEG_EAW_to_JSON(bytestring: bytes, fname: str) -> List[Dict[str, Uni
         A list of dictionaries representing the parsed TPEG data.
     """
     exported_data = []
-    # AID to frame continuation mapping for TPEG applications
-    TPEGappFrameDict = {}
-    TPEGappFrameDict[0] = TPEG_SNI.TPEG_SNI_frame_continuation
-    TPEGappFrameDict[5] = TPEG_TEC.TPEG_TEC_frame_continuation
-    TPEGappFrameDict[15] = TPEG_EAW.TPEG_EAW_frame_continuation
     TPEGstring = TPEG_string(bytestring)
     frames = []
     # print("\n\n")
@@ -68,7 +77,7 @@ def export_TPEG_EAW_to_JSON(bytestring: bytes, fname: str) -> List[Dict[str, Uni
 
     while TPEGstring.len() > 0:
         if TPEG_sync_frame(TPEGstring, AppName="TPEG"):
-            TPEGframe = TPEG_Transport_Frame(0, ApplicationFramesDict=TPEGappFrameDict)
+            TPEGframe = TPEG_Transport_Frame(0, ApplicationFramesDict=TPEG_applications)
             TPEGframe.parse(TPEGstring, Registry)
             frames.append(TPEGframe)
 
@@ -145,82 +154,71 @@ def export_TPEG_EAW_to_JSON(bytestring: bytes, fname: str) -> List[Dict[str, Uni
                 eaw_data[subcomponent.name] = {}
                 # 2.2.1) LocalisedAlertTextInfo
                 for pair in subcomponent.attributes:
-                    if type(pair[1]) != type(""):
+                    if not isinstance(pair[1], str):
                         continue
                     # print(pair[1])
-                    eaw_data[subcomponent.name][pair[0]] = pair[1].replace('"', '')
+                    eaw_data[subcomponent.name][pair[0]] = str(pair[1])
                 # 2.2.2) AffectedArea
                 # TODO: handle cases for EAW_LocalisedAlertTextInfo and other components
                 if subcomponent.type == "LRC":
-                    for lrc_subcomponent in subcomponent.subcomponents:
-                        # TODO: handle cases for ETL, GLR, TMC
-                        if lrc_subcomponent.type == "LRC_OLR":
-                            for olr_sub in lrc_subcomponent.subcomponents:
-                                if olr_sub.type == "OLR_LocationDescription":
-                                    for pair in olr_sub.attributes:
-                                        eaw_data[subcomponent.name][pair[0]] = pair[1]
-                                if olr_sub.type == "OLR_PolygonLR":
-                                    if "coordinates" not in eaw_data:
-                                        eaw_data["coordinates"] = []
-                                    polygon_coordinates = []
-                                    last_abs_coord = None
-                                    # Coordinates
-                                    for pair in olr_sub.attributes:
-                                        if pair[0] == "_complex_" and pair[1].type == "OLR_AbsoluteGeoCoordinate":
-                                            # Parse abs coord pair
-                                            coord = [0, 0]
-                                            for coord_string_part in pair[1].attributes:
-                                                if coord_string_part[0] == "longitude":
-                                                    coord[0] = coord_string_part[1]
-                                                elif coord_string_part[0] == "latitude":
-                                                    coord[1] = coord_string_part[1]
-                                            polygon_coordinates.append(coord)
-                                            last_abs_coord = coord
-                                            # print(coord)
-                                        elif pair[0] == "_complex_" and pair[1].type == "OLR_RelativeGeoCoordinate":
-                                            if not last_abs_coord:
-                                                continue
-                                            # Parse rel coord pair
-                                            coord = [0, 0]
-                                            divisor = 100000
-                                            for coord_string_part in pair[1].attributes:
-                                                if coord_string_part[0] == "delta longitude":
-                                                    coord[0] = truncate(
-                                                        last_abs_coord[0] + coord_string_part[1]/divisor, 5)
-                                                elif coord_string_part[0] == "delta latitude":
-                                                    coord[1] = truncate(
-                                                        last_abs_coord[1] + coord_string_part[1]/divisor, 5)
-                                            polygon_coordinates.append(coord)
-                                            last_abs_coord = coord
-                                    eaw_data["coordinates"].append(polygon_coordinates)
+                    # TODO: handle cases for ETL, GLR, TMC
+                    for description in _OLR_DESCRIPTIONS(subcomponent):
+                        for pair in description.attributes:
+                            # texts as printed, localised ones with their 'LangCode: ' prefix
+                            value = TPEG_format_value(pair[1]) if isinstance(pair[1], TPEG_text) else pair[1]
+                            eaw_data[subcomponent.name][pair[0]] = value
+                    for polygon in _OLR_POLYGONS(subcomponent):
+                        if "coordinates" not in eaw_data:
+                            eaw_data["coordinates"] = []
+                        polygon_coordinates = []
+                        last_abs_coord = None
+                        # Coordinates
+                        for coordinate in _OLR_POLYGON_COORDINATES(polygon):
+                            if coordinate.type == "OLR_AbsoluteGeoCoordinate":
+                                # Parse abs coord pair
+                                coord = [0, 0]
+                                for coord_string_part in coordinate.attributes:
+                                    if coord_string_part[0] == "longitude":
+                                        coord[0] = coord_string_part[1]
+                                    elif coord_string_part[0] == "latitude":
+                                        coord[1] = coord_string_part[1]
+                                polygon_coordinates.append(coord)
+                                last_abs_coord = coord
+                            elif coordinate.type == "OLR_RelativeGeoCoordinate":
+                                if not last_abs_coord:
+                                    continue
+                                # Parse rel coord pair
+                                coord = [0, 0]
+                                divisor = 100000
+                                for coord_string_part in coordinate.attributes:
+                                    if coord_string_part[0] == "delta longitude":
+                                        coord[0] = truncate(
+                                            last_abs_coord[0] + coord_string_part[1]/divisor, 5)
+                                    elif coord_string_part[0] == "delta latitude":
+                                        coord[1] = truncate(
+                                            last_abs_coord[1] + coord_string_part[1]/divisor, 5)
+                                polygon_coordinates.append(coord)
+                                last_abs_coord = coord
+                        eaw_data["coordinates"].append(polygon_coordinates)
             frame_data["alertInformation"] = eaw_data
 
         # 3) informationArea
         if information_area_container:
             area_data = {}
-            for subcomponent in information_area_container.subcomponents:
-                # TODO: handle cases for ETL, GLR, TMC
-                if subcomponent.type == "LRC_OLR":
-                    for shape in subcomponent.subcomponents:
-                        if shape.type == "OLR_RectangleLR":
-                            area_data["rectangle"] = {}
-                            for pair in shape.attributes:
-                                # print(pair[1].type)
-                                # print(pair[1].attributes)
-                                for pair in pair[1].attributes:
-                                    if pair[0] == "_complex_" and pair[1].type == "OLR_AbsoluteGeoCoordinate":
-                                        # Parse abs coord pair
-                                        coord = [0, 0]
-                                        for coord_string_part in pair[1].attributes:
-                                            name = pair[1].name if pair[1].name == "lowerLeftCoordinate" or pair[
-                                                1].name == "upperRightCoordinate" else "undefinedCoordinates"
-                                            if name not in area_data["rectangle"]:
-                                                area_data["rectangle"][name] = {}
-                                            if coord_string_part[0] == "longitude":
-                                                coord[0] = coord_string_part[1]
-                                            elif coord_string_part[0] == "latitude":
-                                                coord[1] = coord_string_part[1]
-                                        area_data["rectangle"][name] = coord
+            # TODO: handle cases for ETL, GLR, TMC
+            for shape in _OLR_RECTANGLES(information_area_container):
+                area_data["rectangle"] = {}
+                for coordinate in _OLR_RECTANGLE_COORDINATES(shape):
+                    # Parse abs coord pair
+                    coord = [0, 0]
+                    for coord_string_part in coordinate.attributes:
+                        if coord_string_part[0] == "longitude":
+                            coord[0] = coord_string_part[1]
+                        elif coord_string_part[0] == "latitude":
+                            coord[1] = coord_string_part[1]
+                    name = coordinate.name if coordinate.name == "lowerLeftCoordinate" or \
+                        coordinate.name == "upperRightCoordinate" else "undefinedCoordinates"
+                    area_data["rectangle"][name] = coord
             frame_data["informationArea"] = area_data
 
         # print("\n")
@@ -40,15 +40,21 @@ from Base.TPEG_string     import TPEG_string
 from Base.TPEG_frame      import TPEG_Transport_Frame
 from Base.TPEG_CRC        import TPEG_CRC
 from Base.TPEG_component  import TPEG_component
+from Base.TPEG_output     import TPEG_output
+from Base.TPEG_dedup      import TPEG_duplicate_filter
+from Base.TPEG_applications import TPEG_application_registry
+from Base.TPEG_warm_start import TPEG_SNI_snapshot, TPEG_pending_frames
 #
 from Base.TPEG_sync_frame import TPEG_sync_frame
 #
-import TpegApps
-from TpegApps import *
 from typing import List, Tuple, Dict, Optional, Union
 from optparse import Values
 
 
+# AID to frame continuation mapping, applications are imported when first referred to
+TPEG_applications = TPEG_application_registry()
+
+
 def parse_options() -> Tuple[Values, List[str]]:
     """
     Parse command line options for the TPEG parser.
@@ -60,7 +66,8 @@ def parse_options() -> Tuple[Values, List[str]]:
     parser = optparse.OptionParser(usage)
 
     # define defaults
-    parser.set_defaults(max_file_size=500000, suppress_errors=False)
+    parser.set_defaults(max_file_size=500000, suppress_errors=False, skip_repetitions=False,
+                        warm_start=None, buffer_frames=False)
     #
     #
     # configuration options; keep -e -s -v for compatibility
@@ -72,6 +79,15 @@ def parse_options() -> Tuple[Values, List[str]]:
     parser.add_option("-E", "--WithoutErrors",
                       help="Suppress showing of errors (default %default)",
                       action="store_true", dest="suppress_errors")
+    parser.add_option("-R", "--SkipRepetitions",
+                      help="Skip messages repeated by the carousel, over all files (default %default)",
+                      action="store_true", dest="skip_repetitions")
+    parser.add_option("-W", "--WarmStart",
+                      help="directory with SNI snapshots: start with the stored fast tuning tables, keep them up to date",
+                      action="store", type="string", dest="warm_start")
+    parser.add_option("-B", "--BufferFrames",
+                      help="keep frames received before their SNI and decode them when it arrives (default %default)",
+                      action="store_true", dest="buffer_frames")
     #
 
     (options, args) = parser.parse_args()
@@ -83,26 +99,18 @@ def parse_options() -> Tuple[Values, List[str]]:
     return options, args
 
 
-def parse_TPEG_binary(bytestring: bytes, fname: str) -> None:
+def parse_TPEG_binary(bytestring: bytes, fname: str, duplicates: Optional[TPEG_duplicate_filter] = None,
+                      snapshot: Optional[TPEG_SNI_snapshot] = None, buffer_frames: bool = False) -> None:
     """
     Parse a binary TPEG string.
 
     Args:
         bytestring: The binary TPEG string to parse.
         fname: The name of the file from which the bytestring was read.
+        duplicates: Filter of messages seen before, repetitions are skipped.
+        snapshot: Stored SNI fast tuning tables to start with, updated from live SNI.
+        buffer_frames: Keep frames received before their SNI, decode them when it arrives.
     """
-    # AID to frame continuation mapping for TPEG applications
-    TPEGappFrameDict    = {}
-    TPEGappFrameDict[ 0] = TPEG_SNI.TPEG_SNI_frame_continuation
-    TPEGappFrameDict[ 5] = TPEG_TEC.TPEG_TEC_frame_continuation
-    TPEGappFrameDict[15] = TPEG_EAW.TPEG_EAW_frame_continuation
-    # Register TFP parser (AID=7)
-    try:
-        from TpegApps import TPEG_TFP
-        TPEGappFrameDict[7] = TPEG_TFP.TPEG_TFP_frame_continuation
-    except Exception as e:
-        TPEG_log_error(f"TFP parser registration failed: {e}")
-
     TPEGstring = TPEG_string(bytestring)
 
     frames = []
@@ -110,16 +118,28 @@ def parse_TPEG_binary(bytestring: bytes, fname: str) -> None:
     print("\n\n")
     # TPEG registry
     Registry = {}
+    if duplicates is not None:
+        Registry["DuplicateFilter"] = duplicates
+    if snapshot is not None:
+        snapshot.warm_start(Registry)
+    if buffer_frames:
+        Registry["PendingFrames"] = TPEG_pending_frames()
 
     while TPEGstring.len() > 0:
          if TPEG_sync_frame(TPEGstring,AppName="TPEG"):
-              TPEGframe = TPEG_Transport_Frame(0,ApplicationFramesDict=TPEGappFrameDict)
+              TPEGframe = TPEG_Transport_Frame(0,ApplicationFramesDict=TPEG_applications)
               TPEGframe.parse(TPEGstring, Registry)
               frames.append(TPEGframe)
 
+    if buffer_frames:
+        Registry["PendingFrames"].drop()
+
+    # render all frames into one buffered output
+    output = TPEG_output(sys.stdout)
     for frame in frames:
-        frame.out()
-        print("\n")
+        frame.render(output)
+        output.write("\n\n")
+    output.flush()
 
 
 # run when file is run on command line
@@ -133,6 +153,10 @@ if __name__ == '__main__':
 
     files = args #contains the list of *.s files
 
+    # one filter for all files: repetitions of earlier recordings are skipped as well
+    duplicates = TPEG_duplicate_filter() if options.skip_repetitions else None
+    snapshot   = TPEG_SNI_snapshot(options.warm_start) if options.warm_start else None
+
     print(f"TPEG parser: number of files {len(files)}")
 
     for fname in files:
@@ -151,7 +175,7 @@ if __name__ == '__main__':
                     print(f"\nTruncated {zipfname} to {options.max_file_size / 1000} KB\n")
                     sleep(1)
 
-                parse_TPEG_binary(bytestring, zipfname)
+                parse_TPEG_binary(bytestring, zipfname, duplicates, snapshot, options.buffer_frames)
             #
             fzip.close()
         else:
@@ -164,7 +188,7 @@ if __name__ == '__main__':
                     print(f"\nTruncated {fname} to {options.max_file_size / 1000} KB\n")
                     sleep(1)
 
-                parse_TPEG_binary(bytestring, fname)
+                parse_TPEG_binary(bytestring, fname, duplicates, snapshot, options.buffer_frames)
                 f.close()
             else:
                 print(f"==> {fname} could not be opened..")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+#
+# Copyright 2023-2024 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# This file exports binary TPEG frames of any application (SNI, TEC, EAW, TFP, ...) as
+# newline delimited JSON: one TPEG message per line, written as soon as its frame is parsed.
+
+import sys
+import zipfile
+import optparse
+
+from Base.TPEG_error import TPEG_error_suppress_reports, TPEG_log_error
+from Base.TPEG_string import TPEG_string
+from Base.TPEG_frame import TPEG_Transport_Frame
+from Base.TPEG_sync_frame import TPEG_sync_frame
+from Base.TPEG_applications import TPEG_application_registry
+from Base.TPEG_warm_start import TPEG_SNI_snapshot, TPEG_pending_frames
+
+from Utils.TPEGjson import TPEG_NDJSON_exporter, TPEG_NDJSON_stream
+
+from typing import List, Tuple, Optional
+from optparse import Values
+
+# AID to frame continuation mapping, applications are imported when first referred to
+TPEG_applications = TPEG_application_registry()
+
+
+def export_TPEG_to_NDJSON(bytestring: bytes, exporter: TPEG_NDJSON_exporter,
+                          snapshot: Optional[TPEG_SNI_snapshot] = None, buffer_frames: bool = False) -> int:
+    """
+    Parse a binary TPEG string and write every message as one JSON line.
+
+    Args:
+        bytestring: The binary TPEG string to parse.
+        exporter: The NDJSON exporter to write the messages to.
+        snapshot: Stored SNI fast tuning tables to start with, updated from live SNI.
+        buffer_frames: Keep frames received before their SNI, export them when it arrives.
+
+    Returns:
+        The number of messages written.
+    """
+    TPEGstring = TPEG_string(bytestring)
+    # TPEG registry
+    Registry = {}
+    if snapshot is not None:
+        snapshot.warm_start(Registry)
+    pending = TPEG_pending_frames() if buffer_frames else None
+    if pending is not None:
+        Registry["PendingFrames"] = pending
+
+    count = 0
+    while TPEGstring.len() > 0:
+        if TPEG_sync_frame(TPEGstring, AppName="TPEG"):
+            TPEGframe = TPEG_Transport_Frame(0, ApplicationFramesDict=TPEG_applications)
+            TPEGframe.parse(TPEGstring, Registry)
+            # component frames of earlier transport frames decoded after their SNI came in
+            if pending is not None:
+                current = getattr(getattr(TPEGframe, "serviceframe", None), "CompFrames", [])
+                for frame in pending.take_replayed():
+                    if frame not in current:
+                        count += exporter.export_frame(frame)
+            # export each frame as soon as it is parsed, frames are not kept
+            count += exporter.export_frame(TPEGframe)
+
+    if pending is not None:
+        pending.drop()
+
+    return count
+
+
+def parse_options() -> Tuple[Values, List[str]]:
+    """
+    Parse command line options for the TPEG NDJSON exporter.
+
+    Returns:
+        A tuple containing the parsed options and arguments.
+    """
+    usage = "usage: %prog [options] <binary TPEG frame files>"
+    parser = optparse.OptionParser(usage)
+
+    # define defaults
+    parser.set_defaults(max_file_size=500000,
+                        suppress_errors=False,
+                        output=None,
+                        warm_start=None,
+                        buffer_frames=False)
+    #
+    #
+    # configuration options; keep -e -s -v for compatibility
+    parser.add_option("-s", "--max_size",
+                      help="set max file size (bytes) to truncate individual input files (default %default)",
+                      action="store", type="int", dest="max_file_size")
+    parser.add_option("-o", "--output",
+                      help="write NDJSON to file instead of stdout (default stdout)",
+                      action="store", type="string", dest="output")
+    parser.add_option("-W", "--WarmStart",
+                      help="directory with SNI snapshots: start with the stored fast tuning tables, keep them up to date",
+                      action="store", type="string", dest="warm_start")
+    parser.add_option("-B", "--BufferFrames",
+                      help="keep frames received before their SNI and export them when it arrives (default %default)",
+                      action="store_true", dest="buffer_frames")
+    #
+    # binary options
+    parser.add_option("-E", "--WithoutErrors",
+                      help="Suppress showing of errors (default %default)",
+                      action="store_true", dest="suppress_errors")
+    #
+
+    (options, args) = parser.parse_args()
+
+    if len(args) == 0:
+        parser.print_help()
+        exit(0)
+
+    return options, args
+
+
+# run when file is run on command line
+if __name__ == '__main__':
+
+    options, args = parse_options()
+    #
+    # do not show error reports if suppressed
+    if options.suppress_errors:
+        TPEG_error_suppress_reports(options.suppress_errors)
+
+    if options.output:
+        stream = open(options.output, 'w', buffering=1 << 20, encoding='utf-8')
+    else:
+        stream = TPEG_NDJSON_stream()
+
+    exporter = TPEG_NDJSON_exporter(stream)
+    snapshot = TPEG_SNI_snapshot(options.warm_start) if options.warm_start else None
+
+    for fname in args:
+        if zipfile.is_zipfile(fname):
+            fzip = zipfile.ZipFile(fname, "r")
+            for zipfname in fzip.namelist():
+                bytestring = fzip.read(zipfname)
+                # truncate if needed
+                if len(bytestring) > options.max_file_size:
+                    bytestring = bytestring[:options.max_file_size]
+
+                export_TPEG_to_NDJSON(bytestring, exporter, snapshot, options.buffer_frames)
+            #
+            fzip.close()
+        else:
+            try:
+                with open(fname, "rb") as f:
+                    bytestring = f.read()
+            except OSError:
+                TPEG_log_error(f"==> {fname} could not be opened..")
+                continue
+
+            # truncate if needed
+            if len(bytestring) > options.max_file_size:
+                bytestring = bytestring[:options.max_file_size]
+
+            export_TPEG_to_NDJSON(bytestring, exporter, snapshot, options.buffer_frames)
+
+    stream.close()
+    sys.exit(0)
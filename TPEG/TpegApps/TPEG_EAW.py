@@ -127,17 +127,28 @@ class EAW_CapTimeInfo(TPEG_datastructure):
         TPEG_datastructure.__init__(self,level,componentsDict,Cname,Ctype)
 
     def parse_attributes(self,TPEGstring):
+        # times as timestamp (seconds since 1970), None if not present
+        self.effective = self.onset = self.expires = None
+
         selector = TPEGstring.BitArray();
         if selector.is_set(0):
+            self.effective = self.timestamp(TPEGstring)
             self.attributes.append(['effective', TPEGstring.DateTime()])
 
         if selector.is_set(1):
+            self.onset = self.timestamp(TPEGstring)
             self.attributes.append(['onset',     TPEGstring.DateTime()])
 
         if selector.is_set(2):
+            self.expires = self.timestamp(TPEGstring)
             self.attributes.append(['expires',   TPEGstring.DateTime()])
 
         return
+
+    def timestamp(self,TPEGstring):
+        if TPEGstring.len() < 4:
+            return None
+        return TPEGstring.data[0]<<24 | TPEGstring.data[1]<<16 | TPEGstring.data[2]<<8 | TPEGstring.data[3]
 #
 #
 #
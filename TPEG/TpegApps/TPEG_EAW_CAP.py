@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Transcoding of CAP 1.2 alerts into TPEG EAW messages
+#
+# CAP_alerts() reads the alerts of a CAP file or stream (single alerts or feeds) with
+# iterparse, releasing every alert element once it is converted to a dict. CAP_to_EAW()
+# builds the TPEG_EAW_component of an alert: MMC from identifier, references and msgType,
+# AlertInformation with the codes of the first info block (looked up in reverse indexes of
+# the EAW tables, built once), a LocalisedAlertTextInfo per info block and the areas as OLR
+# polygons and circles, simplified to the EAW coordinate budget.
+#
+# CAP_transcode() converts files on a process pool, EAW_frames() packs the encoded
+# messages into transport frames after an SNI frame announcing the EAW service component.
+#
+import os, sys
+import zlib
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+#
+from Base.TPEG_error           import TPEG_log_error
+from Base.TPEG_string          import TPEG_BitArray
+from Base.TPEG_writer          import TPEG_writer, TPEG_to_binary
+from Base.TPEG_data_types      import encodeWGS84coordinate, encodeIntSiLi, encodeIntUnTi, encodeIntUnLi, \
+                                      encodeIntUnLoMB, encodeMajorMinorVersion
+from Base.TPEG_packer          import TPEG_frame_packer
+from Base.TPEG_tables          import TPEG_normalise
+#
+from TpegMMC.TPEG_MMC          import TPEG_MMC_component
+from TpegLRC.TPEG_LRC          import TPEG_LRC_component
+from TpegLRC.TPEG_LRC_OLR      import TPEG_LRC_OLR_component, OLR_PolygonLocationReference, \
+                                      OLR_CircleLocationReference, OLR_RectangleLocationReference
+from TpegLRC.TPEG_LRC_geometry import TPEG_shape
+from TpegLRC.TPEG_LRC_simplify import TPEG_simplify_polygon, TPEG_OLR_relative_coordinates
+#
+from .TPEG_SNI                 import TPEG_SNI_frame_continuation
+from .TPEG_EAW                 import TPEG_EAW_frame_continuation, TPEG_EAW_component, \
+                                      EAW_AlertInformation_component, EAW_LocalisedAlertTextInfo_component, \
+                                      EAW_AlertInfoParameters_component
+from .TPEG_EAW_tables          import EAW_text_to_code, _EAW_compiled
+
+# EAW application ID and the specification versions of SNI and EAW announced in the SNI
+EAW_AID     = 15
+EAW_VERSION = (1, 1)
+SNI_VERSION = (3, 2)
+
+# max number of coordinates of the areas of one EAW message
+EAW_MAX_COORDINATES = 400
+
+# expiry of alerts without expires (s after sent)
+CAP_DEFAULT_EXPIRY = 86400
+
+# CAP elements occurring more than once
+_CAP_lists = ('info', 'category', 'responseType', 'eventCode', 'parameter', 'resource', 'area',
+              'polygon', 'circle', 'geocode', 'code')
+
+# CAP msgType -> EAW_006 alertUserStatus
+_CAP_msgTypes = {'alert': 1, 'update': 2, 'cancel': 3}
+
+# CAP values differing from the EAW table texts
+_CAP_terms = {'EAW_005': {'verylikely': 'likely'}}
+
+def EAW_code(table, text, default=0):
+    """ code of a CAP value (e.g. 'Immediate') in EAW table (e.g. 'EAW_003'), default if not found """
+    code = EAW_text_to_code(text or '', table)
+    if code is None:
+        code = EAW_text_to_code(_CAP_terms.get(table, {}).get(TPEG_normalise(text or ''), ''), table, default=default)
+    return code
+
+def _EAW_types(table, texts):
+    # unique (main, sub) codes of texts matching a sub table entry (sub None) or a main table entry
+    types = []
+    for text in texts:
+        text  = text or ''
+        found = _EAW_compiled.text_to_switch_code(text, table)
+        if found is None:
+            code  = EAW_text_to_code(text, table)
+            found = code is not None and (code, None)
+        if found and found[0] not in (0, 255) and found not in types:
+            types.append(found)
+    return types
+
+#
+# CAP reading
+#
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _CAP_element(element):
+    item = {}
+    for child in element:
+        name = _local(child.tag)
+        value = _CAP_element(child) if len(child) else (child.text or '').strip()
+        if name in _CAP_lists:
+            item.setdefault(name, []).append(value)
+        else:
+            item[name] = value
+    return item
+
+def CAP_alerts(source):
+    """ iterate over the alerts (as dicts, repeated elements as lists) of a CAP file name or stream """
+    root = None
+    try:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            if root is None:
+                root = element
+            if event == 'end' and _local(element.tag) == 'alert':
+                yield _CAP_element(element)
+                element.clear()
+                if root is not element:
+                    del root[:]
+    except ET.ParseError as e:
+        TPEG_log_error("==> CAP: %s: %s" % (getattr(source, 'name', source), e))
+
+def _CAP_time(text):
+    # CAP dateTime (with time zone) as timestamp, None if not given or invalid
+    if not text:
+        return None
+    try:
+        time = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        TPEG_log_error("==> CAP: invalid dateTime %s" % text)
+        return None
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return int(time.timestamp())
+
+def _CAP_coordinates(text):
+    # CAP "lat,lon lat,lon ..." as list of (lon, lat)
+    values = [float(value) for value in text.replace(',', ' ').split()]
+    if len(values) % 2:
+        raise ValueError("odd number of coordinate values")
+    return list(zip(values[1::2], values[0::2]))
+
+#
+# encoding
+#
+def _component(component, attributes, subcomponents=()):
+    # component with encoded attributes, written by write_binary()
+    component.attr_string = attributes
+    component.subcomponents = list(subcomponents)
+    for subcomponent in component.subcomponents:
+        subcomponent.parent = component
+    component.dirty = True
+    return component
+
+def _selector(writer, values):
+    # selector of the values present, then the values by their writer functions
+    writer.BitArray(TPEG_BitArray.from_mask(sum(1 << bit for bit, (value, write) in enumerate(values)
+                                                if value)))
+    for value, write in values:
+        if value:
+            write(value)
+
+def _write_list(writer, items, write):
+    writer.IntUnLoMB(len(items))
+    for item in items:
+        write(item)
+
+def _write_type(writer, main, sub):
+    # EAW_EventType, EAW_InstructionType
+    writer.IntUnTi(main)
+    _selector(writer, [(sub, writer.IntUnTi)])
+
+def _alert_information(alert, info, texts, areas):
+    writer = TPEG_writer()
+    writer.IntUnTi(1)                                    # alertLevel: CAP derived level
+    _write_list(writer, [EAW_code('EAW_002', category) for category in info.get('category', [])],
+                writer.IntUnTi)
+    writer.IntUnTi(EAW_code('EAW_003', info.get('urgency')))
+    writer.IntUnTi(EAW_code('EAW_004', info.get('severity')))
+    writer.IntUnTi(EAW_code('EAW_005', info.get('certainty')))
+    _selector(writer, [(_CAP_time(info.get(name)), writer.DateTime) for name in ('effective', 'onset', 'expires')])
+
+    events = [info.get('event')] + [code.get('value') for code in info.get('eventCode', [])]
+    instructions = (info.get('instruction') or '').splitlines()
+    _selector(writer, [
+        (_CAP_msgTypes.get((alert.get('msgType') or '').lower()), writer.IntUnTi),
+        ([EAW_code('EAW_007', response) for response in info.get('responseType', [])],
+         lambda codes: _write_list(writer, codes, writer.IntUnTi)),
+        (_EAW_types('EAW_010', events),
+         lambda types: _write_list(writer, types, lambda t: _write_type(writer, *t))),
+        (_EAW_types('EAW_011', instructions),
+         lambda types: _write_list(writer, types, lambda t: _write_type(writer, *t)))])
+
+    return _component(EAW_AlertInformation_component(3), writer.string(), texts + areas)
+
+def _localised_text(info):
+    writer = TPEG_writer()
+    writer.ShortString(info.get('language') or 'en-US')
+
+    def write_uri(uri):
+        writer.LongString(uri)   # EAW_AnyURI
+
+    _selector(writer, [(info.get(name), write_uri if name == 'web' else writer.LongString)
+                       for name in ('event', 'audience', 'senderName', 'headline', 'description',
+                                    'instruction', 'web', 'contact')])
+    return _component(EAW_LocalisedAlertTextInfo_component(4), writer.string())
+
+def _parameters(info):
+    parameters = [(p.get('valueName', ''), p.get('value', '')) for p in info.get('parameter', [])]
+    if not parameters:
+        return []
+
+    writer = TPEG_writer()
+    def write_parameter(parameter):
+        writer.LongString(parameter[0])
+        writer.LongString(parameter[1])
+
+    _selector(writer, [(None, writer.LongString),
+                       (parameters, lambda items: _write_list(writer, items, write_parameter))])
+    return [_component(EAW_AlertInfoParameters_component(6), writer.string())]
+
+def _coordinate(lon, lat):
+    # OLR_AbsoluteGeoCoordinate without altitude
+    return encodeWGS84coordinate(lon, lat) + encodeIntUnTi(0)
+
+def _polygon(ring, holes=()):
+    # OLR polygons are closed implicitly
+    if len(ring) > 1 and tuple(ring[0]) == tuple(ring[-1]):
+        ring = ring[:-1]
+    start, path = TPEG_OLR_relative_coordinates(ring)
+    writer = TPEG_writer()
+    writer.write(_coordinate(*start))
+    writer.IntUnLoMB(len(path))
+    for dlon, dlat in path:
+        writer.write(encodeIntSiLi(dlon) + encodeIntSiLi(dlat))
+        writer.IntUnTi(0)                                # selector: no altitude
+    writer.IntUnTi(0)                                    # selector: not fuzzy
+    return _component(OLR_PolygonLocationReference(5), writer.string(),
+                      [_polygon(hole) for hole in holes])
+
+def _circle(lon, lat, radius):
+    # center, radius, not fuzzy
+    attributes = _coordinate(lon, lat) + encodeIntUnLoMB(int(round(radius))) + encodeIntUnTi(0)
+    return _component(OLR_CircleLocationReference(4), attributes)
+
+def _rectangle(west, south, east, north):
+    # lower left and upper right corner, not fuzzy
+    attributes = _coordinate(west, south) + _coordinate(east, north) + encodeIntUnTi(0)
+    return _component(OLR_RectangleLocationReference(6), attributes)
+
+def _OLR_location(ID, name, locations):
+    olr = _component(TPEG_LRC_OLR_component(8), encodeMajorMinorVersion(1, 1), locations)
+    return _component(TPEG_LRC_component(ID, Cname=name), b'', [olr])
+
+def _affected_areas(infos, max_coordinates):
+    # OLR polygons and circles of the info blocks (polygons simplified together) and their shapes
+    rings, circles = [], []
+    for info in infos:
+        for area in info.get('area', []):
+            for polygon in area.get('polygon', []):
+                try:
+                    ring = _CAP_coordinates(polygon)
+                except ValueError:
+                    TPEG_log_error("==> CAP: invalid polygon %s" % polygon[:40])
+                    continue
+                if len(ring) >= 4 and ring not in rings:
+                    rings.append(ring)
+            for circle in area.get('circle', []):
+                try:
+                    center, radius = circle.split()
+                    [(lon, lat)] = _CAP_coordinates(center)
+                    circles.append((lon, lat, float(radius) * 1000))   # km
+                except ValueError:
+                    TPEG_log_error("==> CAP: invalid circle %s" % circle)
+
+    circles = list(dict.fromkeys(circles))
+    if not rings and not circles:
+        return [], []
+
+    # the closing vertex of a ring is not encoded
+    budget = max_coordinates - len(circles) + len(rings)
+    if sum(len(ring) for ring in rings) > budget:
+        rings = TPEG_simplify_polygon(rings, max_points=max(budget, 4 * len(rings)), preserve_topology=True)
+        rings = [ring.tolist() if hasattr(ring, 'tolist') else ring for ring in rings]
+
+    locations = [_polygon(ring) for ring in rings] + [_circle(*circle) for circle in circles]
+    shapes = [TPEG_shape('polygon', ring) for ring in rings] + \
+             [TPEG_shape('circle', [(lon, lat)], radius) for lon, lat, radius in circles]
+    return [_OLR_location(5, "AffectedArea", locations)], shapes
+
+def _message_id(alert):
+    # updates and cancels keep the message ID of the first alert they refer to
+    references = (alert.get('references') or '').split()
+    first = references[0].split(',') if references else [alert.get('sender', ''), alert.get('identifier', '')]
+    return zlib.crc32(','.join(first[:2]).encode('utf-8')) & 0x7FFFFFFF, len(references) & 0xFF
+
+def CAP_to_EAW(alert, max_coordinates=EAW_MAX_COORDINATES, default_expiry=CAP_DEFAULT_EXPIRY):
+    """ TPEG_EAW_component of a CAP alert (see CAP_alerts()), None without info blocks """
+    infos = alert.get('info', [])
+    if not infos:
+        TPEG_log_error("==> CAP: alert %s without info" % alert.get('identifier'))
+        return None
+
+    sent = _CAP_time(alert.get('sent'))
+    expires = [time for time in (_CAP_time(info.get('expires')) for info in infos) if time is not None]
+    messageID, versionID = _message_id(alert)
+
+    mmc = TPEG_MMC_component(1)
+    mmc.update(messageID=messageID, versionID=versionID,
+               messageExpiryTime=max(expires) if expires else (sent or 0) + default_expiry,
+               cancelFlag=(alert.get('msgType') or '').lower() == 'cancel', messageGenerationTime=sent)
+
+    texts = [_localised_text(info) for info in infos]
+    areas, shapes = _affected_areas(infos, max_coordinates)
+    components = [mmc, _alert_information(alert, infos[0], texts, areas + _parameters(infos[0]))]
+
+    # information area: bbox of the affected areas
+    if shapes:
+        wests, souths, easts, norths = zip(*[shape.bbox for shape in shapes])
+        bbox = (min(wests), min(souths), max(easts), max(norths))
+        components.append(_OLR_location(2, "InformationArea", [_rectangle(*bbox)]))
+
+    return _component(TPEG_EAW_component(0), b'', components)
+
+#
+# batch transcoding
+#
+def CAP_sources(names, batch=64):
+    """ (file name, None) of CAP files and (file name, tuple of up to batch members) of zip archives """
+    sources = []
+    for name in names:
+        if zipfile.is_zipfile(name):
+            with zipfile.ZipFile(name) as archive:
+                members = [member for member in archive.namelist() if not member.endswith('/')]
+            sources.extend((name, tuple(members[i:i + batch])) for i in range(0, len(members), batch))
+        else:
+            sources.append((name, None))
+    return sources
+
+def _CAP_stream_to_EAW(stream, max_coordinates):
+    return [TPEG_to_binary(message) for message in
+            (CAP_to_EAW(alert, max_coordinates) for alert in CAP_alerts(stream)) if message]
+
+def CAP_source_to_EAW(source, max_coordinates=EAW_MAX_COORDINATES):
+    """ encoded EAW messages (binary strings) of the alerts of a source (see CAP_sources()) """
+    name, members = source
+    try:
+        if members is None:
+            with open(name, 'rb') as stream:
+                return _CAP_stream_to_EAW(stream, max_coordinates)
+
+        # the archive directory is read once for all members
+        messages = []
+        with zipfile.ZipFile(name) as archive:
+            for member in members:
+                with archive.open(member) as stream:
+                    messages.extend(_CAP_stream_to_EAW(stream, max_coordinates))
+        return messages
+    except (OSError, zipfile.BadZipFile) as e:
+        TPEG_log_error("==> CAP: %s could not be read: %s" % (name, e))
+        return []
+
+def CAP_transcode(sources, processes=None, max_coordinates=EAW_MAX_COORDINATES):
+    """ encoded EAW messages of all sources (see CAP_sources()) in order, converted on a process pool """
+    if processes == 1 or len(sources) <= 1:
+        for source in sources:
+            yield from CAP_source_to_EAW(source, max_coordinates)
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        for messages in pool.map(CAP_source_to_EAW, sources, [max_coordinates] * len(sources)):
+            yield from messages
+
+def EAW_SNI_components(SCID, COID, table_version=1):
+    """ encoded SNI components announcing EAW on SCID: fast tuning (SNI_01) and versioning (SNI_14) """
+    fast_tuning = bytes([table_version, 125, SCID, 0, COID]) + encodeIntUnLi(EAW_AID)
+    versioning = bytes([table_version, 0, *SNI_VERSION, SCID, *EAW_VERSION])
+    return [bytes([ID]) + encodeIntUnLi(len(attributes)) + attributes
+            for ID, attributes in ((0x01, fast_tuning), (0x0E, versioning))]
+
+def EAW_frames(messages, SID='0.225.225', SCID=5, COID=20, EncID=0):
+    """ binary string of transport frames: an SNI frame, then the encoded EAW messages packed """
+    sni = TPEG_frame_packer(SID, 0, continuation_class=TPEG_SNI_frame_continuation)
+    for component in EAW_SNI_components(SCID, COID):
+        sni.add(component)
+
+    packer = TPEG_frame_packer(SID, SCID, EncID, continuation_class=TPEG_EAW_frame_continuation)
+    for message in messages:
+        packer.add(message)
+
+    return sni.to_binary() + packer.to_binary()
+
+
+if __name__ == '__main__':
+    print("TPEG_EAW_CAP")
@@ -35,64 +35,28 @@ import os, sys
 if __name__ == '__main__':
     sys.path.append(os.path.abspath(sys.path[0]+'/..'))
 
-from Base.TPEG_error   import TPEG_log_error
+from Base.TPEG_tables  import TPEG_code_tables
 #
 #
 # add parent directory find when run as main
 if __name__ == '__main__':
     sys.path.append(os.path.abspath(sys.path[0]+'/..'))
 
+# tables compiled at the end of this module
 def EAW_code_to_text(code,TPEG_table,switch_code=None):
-    global _EAW_tables
-    global _EAW_switch_tables
-    #
-    # determine proper table to use
-    if switch_code is not None:
-        table = _EAW_switch_tables.get(TPEG_table,None)
-        if table is not None:
-            table = table.get(switch_code,None)
-    else:
-        table = _EAW_tables.get(TPEG_table,None)
-
-    if table is not None:
-        error_string = "Invalid/Unknown Code in table %s"%TPEG_table
-
-        if switch_code is not None:
-            error_string += ", switched with code "+str(switch_code)
-
-        text = str(code)+": "+table.get(code,error_string)
-    else:
-        text = str(code)+": Invalid/Unknown EAW table %s"%TPEG_table
-        error_string = "==> EAW: unknown table  %s"%TPEG_table
-
-        if switch_code is not None:
-            error_string += ", switched with code "+str(switch_code)
-            text         += ", switched with code "+str(switch_code)
-
-        TPEG_log_error(error_string)
-
-    return text
+    return _EAW_compiled.code_to_text(code,TPEG_table,switch_code)
 
 # return list of available codes
 def EAW_code_list(TPEG_table,switch_code=None):
-    global _EAW_tables
-    global _EAW_switch_tables
-
-    code_list = None
-    #
-    # determine proper table to use
-    if switch_code is not None:
-        table = _EAW_switch_tables.get(TPEG_table,None)
-        if table is not None:
-            table = table.get(switch_code,None)
-    else:
-        table = _EAW_tables.get(TPEG_table,None)
+    return _EAW_compiled.code_list(TPEG_table,switch_code)
 
-    if table is not None:
-        code_list = list(table.keys())
-        code_list.sort()
+# return code of a text, default if unknown
+def EAW_text_to_code(text,TPEG_table,switch_code=None,default=None):
+    return _EAW_compiled.text_to_code(text,TPEG_table,switch_code,default)
 
-    return code_list
+# return compiled table (TPEG_code_table) for bulk lookups, None if unknown
+def EAW_table(TPEG_table,switch_code=None):
+    return _EAW_compiled.table(TPEG_table,switch_code)
 
 EAW_001={
 	0	:"unknown",
@@ -894,6 +858,10 @@ _EAW_switch_tables = {
     "EAW_011":_EAW_011_switch_tables
     }
 
+#
+# compiled lookup structures of all EAW tables
+_EAW_compiled = TPEG_code_tables("EAW", _EAW_tables, _EAW_switch_tables)
+
 #
 # ==============================================================================================
 #
@@ -140,14 +140,17 @@ class TPEG_SNI_component_01(TPEG_SNI_base_component):
             # maintain list of ServiceComponent tuples
             self.ServiceComponents.append([SCID, AID, OriginatorSID, COID, optime, EncID, SafetyFlag])
 
-            # store application table in registry
-            SID = self.Registry["SID"]
-            if SID not in self.Registry:
-                self.Registry[SID] = {}
+    def register(self, Registry):
+        # store application table in registry, all rows at once
+        SID = Registry["SID"]
+        if self.ServiceComponents:
+            table = {comp[0]: comp[1:] for comp in self.ServiceComponents}
+            Registry.setdefault(SID, {}).update(table)
 
-            for comp in self.ServiceComponents:
-                SCID = comp[0]
-                self.Registry[SID][SCID] = comp[1:]
+        # keep the live table for warm starts
+        snapshot = Registry.get("SNISnapshot")
+        if snapshot is not None:
+            snapshot.update(Registry, SID, self.sni_table_version, self.ServiceComponents)
 
 #
 #
@@ -176,15 +179,13 @@ class TPEG_SNI_component_04(TPEG_SNI_base_component):
     def parse_attributes(self, TPEGstring):
         self.attributes.append(["Table version", TPEGstring.IntUnTi()])
 
-        # now parse coverage areas
+        # now parse coverage areas: all complete rows in one go, a truncated row item by item
+        rows = TPEGstring.read_records('>Bhhhh', TPEGstring.len()//9)
         while TPEGstring.len()>0:
-            SCID      =  TPEGstring.IntUnTi();
-            NW_corner0 = TPEGstring.IntSiLi()*0.01
-            NW_corner1 = TPEGstring.IntSiLi()*0.01
-            SE_corner0 = TPEGstring.IntSiLi()*0.01
-            SE_corner1 = TPEGstring.IntSiLi()*0.01
+            rows.append((TPEGstring.IntUnTi(), TPEGstring.IntSiLi(), TPEGstring.IntSiLi(), TPEGstring.IntSiLi(), TPEGstring.IntSiLi()))
 
-            self.attributes.append(["SCID %2d"%SCID, "geo coverage: NW: (lon=%5.2f, lat=%5.2f), SE:(lon=%5.2f, lat=%5.2f)"%(NW_corner0, NW_corner1,SE_corner0, SE_corner1)])
+        for SCID, NW_corner0, NW_corner1, SE_corner0, SE_corner1 in rows:
+            self.attributes.append(["SCID %2d"%SCID, "geo coverage: NW: (lon=%5.2f, lat=%5.2f), SE:(lon=%5.2f, lat=%5.2f)"%(NW_corner0*0.01, NW_corner1*0.01,SE_corner0*0.01, SE_corner1*0.01)])
 
 #
 #
@@ -276,13 +277,16 @@ class HD_RADIO_bearer_linkage_component(TPEG_SNI_base_component):
 
         # parse lists of AM and FM stations
         m1 = TPEGstring.IntUnTi()
+        stations = TPEGstring.read_records('>LB', min(m1, TPEGstring.len()//5))
         for i in range(m1):
-            if TPEGstring.len() == 0:
+            if i < len(stations):
+                StationID, FMfreq = stations[i]
+            elif TPEGstring.len() == 0:
                 TPEG_log_error("==> HD_RADIO_bearer_linkage: not enough room for %d FM alt frequencies"%m1)
                 break
-
-            StationID = TPEGstring.IntUnLo()
-            FMfreq    = TPEGstring.IntUnTi()
+            else:
+                StationID = TPEGstring.IntUnLo()
+                FMfreq    = TPEGstring.IntUnTi()
 
             if FMfreq > 0 and FMfreq < 205:
                 FMfreq = 87.5 +FMfreq/10.0
@@ -292,13 +296,16 @@ class HD_RADIO_bearer_linkage_component(TPEG_SNI_base_component):
             self.attributes.append(["HD Radio alt FM Station %d"%(i+1), "Station ID 0x%04X, FM Freq %6.2f MHz"%(StationID,FMfreq)])
 
         m2 = TPEGstring.IntUnTi()
+        stations = TPEGstring.read_records('>LB', min(m2, TPEGstring.len()//5))
         for i in range(m2):
-            if TPEGstring.len() == 0:
+            if i < len(stations):
+                StationID, AMfreq = stations[i]
+            elif TPEGstring.len() == 0:
                 TPEG_log_error("==> HD_RADIO_bearer_linkage: not enough room for %d AM alt frequencies"%m1)
                 break
-
-            StationID = TPEGstring.IntUnLo()
-            AMfreq    = TPEGstring.IntUnTi()
+            else:
+                StationID = TPEGstring.IntUnLo()
+                AMfreq    = TPEGstring.IntUnTi()
 
             if AMfreq < 123: #ITU region
                 AMfreq = AMfreq       *  9 + 522 #KHz
@@ -331,10 +338,12 @@ class TPEG_SNI_component_14(TPEG_SNI_base_component):
     def parse_attributes(self, TPEGstring):
         self.attributes.append(["Table version", TPEGstring.IntUnTi()])
 
+        # all complete rows in one go, a truncated row item by item
+        rows = TPEGstring.read_records('>BBB', TPEGstring.len()//3)
         while TPEGstring.len()>0:
-            SCID      =  TPEGstring.IntUnTi();
-            Major     =  TPEGstring.IntUnTi();
-            Minor     =  TPEGstring.IntUnTi();
+            rows.append((TPEGstring.IntUnTi(), TPEGstring.IntUnTi(), TPEGstring.IntUnTi()))
+
+        for SCID, Major, Minor in rows:
             self.attributes.append(["SCID %2d"%SCID, "Specification Version: (Major=%2d, Minor=%2d)"%(Major,Minor)])
 #
 #
@@ -347,9 +356,12 @@ class TPEG_SNI_component_33(TPEG_SNI_base_component):
     def parse_attributes(self, TPEGstring):
         self.attributes.append(["Table version", TPEGstring.IntUnTi()])
 
+        # all complete rows in one go, a truncated row item by item
+        rows = TPEGstring.read_records('>BL', TPEGstring.len()//5)
         while TPEGstring.len()>0:
-            SCID        =  TPEGstring.IntUnTi();
-            numMessages =  TPEGstring.IntUnLo();
+            rows.append((TPEGstring.IntUnTi(), TPEGstring.IntUnLo()))
+
+        for SCID, numMessages in rows:
             self.attributes.append(["number of messages for SCID %2d"%SCID, "%d"%numMessages])
 
 
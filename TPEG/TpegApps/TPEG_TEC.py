@@ -40,7 +40,10 @@ import Base
 #
 from Base.TPEG_error              import TPEG_log_error
 #
-from Base.TPEG_string             import TPEG_string
+# datetime is needed for unix time conversion
+from datetime import datetime
+#
+from Base.TPEG_string             import TPEG_string, TPEG_BitArray
 from Base.TPEG_component          import TPEG_component, TPEG_datastructure
 from Base.TPEG_component_frame    import TPEG_ProtPrioCountedComp_frame
 #
@@ -74,6 +77,12 @@ class TEC_Event_component(TPEG_component):
         componentsDict[ 8] = TEC_DiversionRoute_component
         componentsDict[11] = TEC_TemporarySpeedLimit_component
 
+        self.startTime = None
+        self.stopTime  = None
+
+    # fields to be changed by update(), times as timestamp (seconds since 1970)
+    update_fields = ('effectCode', 'startTime', 'stopTime')
+
     def parse_attributes(self,TPEGstring):
 
         self.effectCode  = TPEGstring.IntUnTi();
@@ -81,11 +90,19 @@ class TEC_Event_component(TPEG_component):
 
         selector = TPEGstring.BitArray();
         if selector.is_set(0):
+            if TPEGstring.len() >= 4:
+                self.startTime = TPEGstring.data[0]<<24 | TPEGstring.data[1]<<16 | TPEGstring.data[2]<<8 | TPEGstring.data[3]
             self.attributes.append(['startTime', TPEGstring.DateTime()])
 
         if selector.is_set(1):
+             if TPEGstring.len() >= 4:
+                 self.stopTime = TPEGstring.data[0]<<24 | TPEGstring.data[1]<<16 | TPEGstring.data[2]<<8 | TPEGstring.data[3]
              self.attributes.append(['stopTime', TPEGstring.DateTime()])
 
+        # effectCode, selector and times are re-encoded on update(), see encode_head()
+        self.selector     = selector
+        self._head_length = self._attr_start - TPEGstring.len()
+
         if selector.is_set(2):
             self.tendency = TPEGstring.IntUnTi()
             self.attributes.append(['Tendency', TEC_code_to_text(self.tendency,"TEC_006")]);
@@ -109,6 +126,32 @@ class TEC_Event_component(TPEG_component):
         if selector.is_set(8):
           self.parse_n_datastructures_of_type(TPEGstring, 'temporarySpeedLimt',
                                               TemporarySpeedLimit)
+
+    def update_field(self,name,value):
+        setattr(self,name,value)
+
+        if name == 'effectCode':
+            value = TEC_code_to_text(value,"TEC_001")
+        elif value is not None:
+            value = datetime.utcfromtimestamp(value)
+
+        self.set_attribute(name, value, present=value is not None)
+
+    def encode_head(self,writer):
+        writer.IntUnTi(self.effectCode)
+
+        # keep all other selector bits
+        mask = self.selector.mask & ~0x03
+        if self.startTime is not None:
+            mask |= 0x01
+        if self.stopTime is not None:
+            mask |= 0x02
+        writer.BitArray(TPEG_BitArray.from_mask(mask, len(self.selector.value)))
+
+        if self.startTime is not None:
+            writer.DateTime(self.startTime)
+        if self.stopTime is not None:
+            writer.DateTime(self.stopTime)
 #
 #
 #
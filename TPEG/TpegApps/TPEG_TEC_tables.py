@@ -32,65 +32,28 @@
 #
 import os, sys
 
-from Base.TPEG_error   import TPEG_log_error
+from Base.TPEG_tables  import TPEG_code_tables
 #
 #
 # add parent directory find when run as main
 if __name__ == '__main__':
     sys.path.append(os.path.abspath(sys.path[0]+'/..'))
 
+# tables compiled at the end of this module
 def TEC_code_to_text(code,TPEG_table,switch_code=None):
-    global _TEC_tables
-    global _TEC_switch_tables
-    #
-    # determine proper table to use
-    if switch_code is not None:
-        table = _TEC_switch_tables.get(TPEG_table,None)
-        if table is not None:
-            table = table.get(switch_code,None)
-    else:
-        table = _TEC_tables.get(TPEG_table,None)
-
-    if table is not None:
-        error_string = "Invalid/Unknown Code in table %s"%TPEG_table
-
-        if switch_code is not None:
-            error_string += ", switched with code "+str(switch_code)
-
-        text = str(code)+": "+table.get(code,error_string)
-    else:
-        text = str(code)+": Invalid/Unknown TEC table %s"%TPEG_table
-        error_string = "==> TEC: unknown table  %s"%TPEG_table
-
-        if switch_code is not None:
-            error_string += ", switched with code "+str(switch_code)
-            text         += ", switched with code "+str(switch_code)
-
-        TPEG_log_error(error_string)
-
-    return text
+    return _TEC_compiled.code_to_text(code,TPEG_table,switch_code)
 
 # return list of available codes
 def TEC_code_list(TPEG_table,switch_code=None):
-    global _TEC_tables
-    global _TEC_switch_tables
-
-    code_list = None
-    #
-    # determine proper table to use
-    if switch_code is not None:
-        table = _TEC_switch_tables.get(TPEG_table,None)
-        if table is not None:
-            table = table.get(switch_code,None)
-    else:
-        table = _TEC_tables.get(TPEG_table,None)
-
-    if table is not None:
-        code_list = list(table.keys())
-        code_list.sort()
+    return _TEC_compiled.code_list(TPEG_table,switch_code)
 
-    return code_list
+# return code of a text, default if unknown
+def TEC_text_to_code(text,TPEG_table,switch_code=None,default=None):
+    return _TEC_compiled.text_to_code(text,TPEG_table,switch_code,default)
 
+# return compiled table (TPEG_code_table) for bulk lookups, None if unknown
+def TEC_table(TPEG_table,switch_code=None):
+    return _TEC_compiled.table(TPEG_table,switch_code)
 
 TEC_001={
 	1	:"traffic flow unknown",
@@ -594,3 +557,7 @@ _TEC_switch_tables = {
     "TEC_002":TEC_002_switch_tables,
     "TEC_005":TEC_005_switch_tables
     }
+
+#
+# compiled lookup structures of all TEC tables
+_TEC_compiled = TPEG_code_tables("TEC", _TEC_tables, _TEC_switch_tables)
@@ -29,6 +29,7 @@
 
 __all__ = ["TPEG_EAW",
            "TPEG_EAW_tables",
+           "TPEG_EAW_CAP",
            "TPEG_TEC",
            "TPEG_TEC_tables",
            "TPEG_SNI",
@@ -151,8 +151,9 @@ class ETL_WGS84coordinate(TPEG_datastructure):
         TPEG_datastructure.__init__(self,level,componentsDict,Cname,Ctype)
 
     def parse_attributes(self,TPEGstring):
-        self.attributes.append(['WGS84longitude',  TPEGstring.IntSi24asWGS84Coord()])
-        self.attributes.append(['WGS84latitude',   TPEGstring.IntSi24asWGS84Coord()])
+        self.longitude, self.latitude = TPEGstring.WGS84CoordinatePair()
+        self.attributes.append(['WGS84longitude',  self.longitude])
+        self.attributes.append(['WGS84latitude',   self.latitude])
 
         return
 #
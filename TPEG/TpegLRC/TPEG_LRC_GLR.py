@@ -52,8 +52,9 @@ class GLR_WGS84coordinate(TPEG_datastructure):
         TPEG_datastructure.__init__(self,level,componentsDict,Cname,Ctype)
 
     def parse_attributes(self,TPEGstring):
-        self.attributes.append(['WGS84longitude',  TPEGstring.IntSi24asWGS84Coord()])
-        self.attributes.append(['WGS84latitude',   TPEGstring.IntSi24asWGS84Coord()])
+        self.longitude, self.latitude = TPEGstring.WGS84CoordinatePair()
+        self.attributes.append(['WGS84longitude',  self.longitude])
+        self.attributes.append(['WGS84latitude',   self.latitude])
 
         return
 
@@ -111,7 +112,8 @@ class GLR_GeographicBoundingCircleSector(TPEG_datastructure):
     def parse_attributes(self,TPEGstring):
         self.parse_datastructure(TPEGstring, 'centerPoint',GLR_WGS84coordinate)
 
-        self.attributes.append(['radius',      TPEGstring.DistanceMetres()])
+        self.radius = TPEGstring.DistanceMetres()
+        self.attributes.append(['radius',      self.radius])
 
         selector = TPEGstring.BitArray()
         if selector.is_set(0):
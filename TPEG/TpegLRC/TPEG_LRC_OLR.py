@@ -54,8 +54,9 @@ class OLR_AbsoluteCoordinate(TPEG_datastructure):
         TPEG_datastructure.__init__(self,level,componentsDict,Cname,Ctype)
 
     def parse_attributes(self,TPEGstring):
-        self.attributes.append(['longitude',  TPEGstring.IntSi24asWGS84Coord()])
-        self.attributes.append(['latitude',   TPEGstring.IntSi24asWGS84Coord()])
+        self.longitude, self.latitude = TPEGstring.WGS84CoordinatePair()
+        self.attributes.append(['longitude',  self.longitude])
+        self.attributes.append(['latitude',   self.latitude])
 
         selector = TPEGstring.BitArray();
         if selector.is_set(0):
@@ -70,8 +71,11 @@ class OLR_RelativeCoordinate(TPEG_datastructure):
         TPEG_datastructure.__init__(self,level,componentsDict,Cname,Ctype)
 
     def parse_attributes(self,TPEGstring):
-        self.attributes.append(['delta longitude',  TPEGstring.IntSiLi()])
-        self.attributes.append(['delta latitude',   TPEGstring.IntSiLi()])
+        # difference to the previous coordinate in 1e-5 degrees
+        self.deltaLongitude = TPEGstring.IntSiLi()
+        self.deltaLatitude  = TPEGstring.IntSiLi()
+        self.attributes.append(['delta longitude',  self.deltaLongitude])
+        self.attributes.append(['delta latitude',   self.deltaLatitude])
 
         selector = TPEGstring.BitArray();
         if selector.is_set(0):
@@ -133,7 +137,8 @@ class OLR_CircleLocationReference(TPEG_component):
     def parse_attributes(self,TPEGstring):
         self.parse_datastructure(TPEGstring, 'centerPoint', OLR_AbsoluteCoordinate)
 
-        self.attributes.append(['radius',                   TPEGstring.DistanceMetres()])
+        self.radius = TPEGstring.DistanceMetres()
+        self.attributes.append(['radius',                   self.radius])
 
         selector = TPEGstring.BitArray()
         if selector.is_set(0):
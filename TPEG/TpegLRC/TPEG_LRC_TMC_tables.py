@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# TMC location tables: import of location table exports into a memory mapped index and
+# resolution of decoded TMC/ETL locations
+#
+# TPEG_TMC_import() reads the semicolon separated exchange format files of one or more
+# location tables (COUNTRIES, LOCATIONDATASETS, NAMES, ROADS, SEGMENTS, POINTS, POFFSETS as
+# .DAT or .CSV) and writes one index file:
+#
+#   header   magic, number of records, hash slots and tables, offset/length of strings
+#   tables   (CC, ECC, LTN) of the location tables in the file
+#   records  one per location, see _record
+#   slots    open addressing hash table of record numbers (+1) keyed by (CC, ECC, LTN, LCD)
+#   strings  length prefixed UTF-8 strings referenced by offset
+#
+# TPEG_TMC_resolver maps index files read-only (shared between processes) and looks up
+# locations with one hash probe.
+#
+import os, sys
+import csv
+import mmap
+import struct
+from collections import namedtuple
+from functools import lru_cache
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+#
+from Base.TPEG_error import TPEG_log_error
+
+_magic = b'TPEGTMC1'
+_header = struct.Struct('<8sIIIII')
+_table = struct.Struct('<BBBx')
+# cc, ecc, ltn, class, lcd, negative offset, positive offset, tcd, stcd,
+# longitude, latitude (1e-5 degrees), road number, road name, first name, second name
+_record = struct.Struct('<BBBBHHHBBxxiiIIII')
+_slot = struct.Struct('<I')
+
+# no coordinate
+_NO_COORDINATE = -0x80000000
+
+TPEG_TMC_location = namedtuple('TPEG_TMC_location',
+                               ('cc', 'ecc', 'ltn', 'lcd', 'locationClass', 'tcd', 'stcd', 'longitude', 'latitude',
+                                'roadNumber', 'roadName', 'firstName', 'secondName',
+                                'negativeOffset', 'positiveOffset'))
+
+#
+#
+def _hash(key, bits):
+    # multiplicative hashing of the 64 bit key
+    return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+def _key(cc, ecc, ltn, lcd):
+    return (cc << 32) | (ecc << 24) | (ltn << 16) | lcd
+
+def _read_table_file(directory, name, encoding):
+    # rows of a location table file as dicts by upper case column name
+    for entry in sorted(os.listdir(directory)):
+        base, ext = os.path.splitext(entry)
+        if base.upper() == name and ext.upper() in ('.DAT', '.CSV'):
+            with open(os.path.join(directory, entry), newline='', encoding=encoding, errors='replace') as f:
+                rows = csv.reader(f, delimiter=';')
+                header = [column.strip().upper() for column in next(rows, [])]
+                return [dict(zip(header, [value.strip() for value in row])) for row in rows if row]
+    return []
+
+def _int(value, default=0, base=10):
+    try:
+        return int(value, base)
+    except (TypeError, ValueError):
+        return default
+
+def _coordinate(value):
+    # coordinates are given in 1e-5 degrees, e.g. +00676543
+    return _int(value, _NO_COORDINATE)
+
+#
+#
+def TPEG_TMC_import(directories, index_file, encoding='latin-1'):
+    """
+    Import the location tables exported to the directories (one table set each) into index_file,
+    return the number of locations.
+    """
+    if isinstance(directories, str):
+        directories = [directories]
+
+    strings = bytearray(b'\0\0')  # offset 0: empty string
+    string_offsets = {'': 0}
+
+    def string(text):
+        offset = string_offsets.get(text)
+        if offset is None:
+            data = text.encode('utf-8')[:0xFFFF]
+            offset = string_offsets[text] = len(strings)
+            strings.extend(struct.pack('<H', len(data)))
+            strings.extend(data)
+        return offset
+
+    tables = []
+    records = {}
+    for directory in directories:
+        countries = {}
+        for row in _read_table_file(directory, 'COUNTRIES', encoding):
+            countries[row.get('CID')] = (_int(row.get('CCD'), 0, 16), _int(row.get('ECC'), 0, 16))
+
+        for row in _read_table_file(directory, 'LOCATIONDATASETS', encoding):
+            cc, ecc = countries.get(row.get('CID'), (0, 0))
+            tables.append((cc, ecc, _int(row.get('TABCD'))))
+
+        names = {}
+        for row in _read_table_file(directory, 'NAMES', encoding):
+            # first language wins
+            names.setdefault((row.get('CID'), row.get('NID')), row.get('NAME', ''))
+
+        roads = {}
+        for name in ('ROADS', 'SEGMENTS', 'POINTS'):
+            for row in _read_table_file(directory, name, encoding):
+                cc, ecc = countries.get(row.get('CID'), (0, 0))
+                ltn, lcd = _int(row.get('TABCD')), _int(row.get('LCD'))
+                cid = row.get('CID')
+
+                # points and segments take the road number and name of their road
+                road = roads.get((cid, ltn, _int(row.get('ROA_LCD'))), ('', ''))
+                roadNumber = row.get('ROADNUMBER') or road[0]
+                roadName = names.get((cid, row.get('RNID')), '') or road[1]
+                if name != 'POINTS':
+                    roads[(cid, ltn, lcd)] = (roadNumber, roadName)
+
+                records[_key(cc, ecc, ltn, lcd)] = [
+                    cc, ecc, ltn, ord((row.get('CLASS') or ' ')[0]), lcd, 0, 0,
+                    _int(row.get('TCD')), _int(row.get('STCD')),
+                    _coordinate(row.get('XCOORD')), _coordinate(row.get('YCOORD')),
+                    string(roadNumber), string(roadName),
+                    string(names.get((cid, row.get('N1ID')), '')), string(names.get((cid, row.get('N2ID')), ''))]
+
+        for row in _read_table_file(directory, 'POFFSETS', encoding):
+            cc, ecc = countries.get(row.get('CID'), (0, 0))
+            record = records.get(_key(cc, ecc, _int(row.get('TABCD')), _int(row.get('LCD'))))
+            if record is not None:
+                record[5] = _int(row.get('NEG_OFF_LCD'))
+                record[6] = _int(row.get('POS_OFF_LCD'))
+
+    # hash slots: power of 2, at most half filled
+    bits = max(4, (2 * len(records)).bit_length())
+    slots = [0] * (1 << bits)
+    data = bytearray()
+    for n, (key, record) in enumerate(records.items()):
+        data.extend(_record.pack(*record))
+        slot = _hash(key, bits)
+        while slots[slot]:
+            slot = (slot + 1) & ((1 << bits) - 1)
+        slots[slot] = n + 1
+
+    strings_offset = _header.size + _table.size * len(tables) + len(data) + _slot.size * len(slots)
+    with open(index_file, 'wb') as f:
+        f.write(_header.pack(_magic, len(records), len(slots), len(tables), strings_offset, len(strings)))
+        for table in tables:
+            f.write(_table.pack(*table))
+        f.write(data)
+        f.write(struct.pack('<%dI' % len(slots), *slots))
+        f.write(strings)
+
+    return len(records)
+
+#
+# === class TPEG_TMC_resolver ===============================================
+#
+class _index_file(object):
+    # one memory mapped index
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, nslots, ntables, self.strings, length = _header.unpack_from(self.map, 0)
+        if magic != _magic:
+            raise ValueError("%s is no TMC location index" % path)
+
+        self.tables = [_table.unpack_from(self.map, _header.size + i * _table.size) for i in range(ntables)]
+        self.records = _header.size + ntables * _table.size
+        self.slots = self.records + self.count * _record.size
+        self.bits = nslots.bit_length() - 1
+
+    def string(self, offset):
+        start = self.strings + offset
+        length, = struct.unpack_from('<H', self.map, start)
+        return self.map[start + 2:start + 2 + length].decode('utf-8')
+
+    def record(self, cc, ecc, ltn, lcd):
+        key = _key(cc, ecc, ltn, lcd)
+        mask = (1 << self.bits) - 1
+        slot = _hash(key, self.bits)
+        while True:
+            n, = _slot.unpack_from(self.map, self.slots + slot * _slot.size)
+            if n == 0:
+                return None
+            record = _record.unpack_from(self.map, self.records + (n - 1) * _record.size)
+            if record[:3] == (cc, ecc, ltn) and record[4] == lcd:
+                return record
+            slot = (slot + 1) & mask
+
+
+class TPEG_TMC_resolver(object):
+    def __init__(self, index_files, cache_size=4096):
+        """ resolver over the index files written by TPEG_TMC_import() """
+        if isinstance(index_files, str):
+            index_files = [index_files]
+
+        self.indexes = [_index_file(path) for path in index_files]
+
+        # (CC, LTN) -> [(ECC, index)]
+        self.tables = {}
+        for index in self.indexes:
+            for cc, ecc, ltn in index.tables:
+                self.tables.setdefault((cc, ltn), []).append((ecc, index))
+
+        # hot locations
+        self.location = lru_cache(maxsize=cache_size)(self._location)
+
+    def _location(self, cc, ltn, lcd, ecc=None):
+        for table_ecc, index in self.tables.get((cc, ltn), ()):
+            if ecc is not None and ecc != table_ecc:
+                continue
+
+            record = index.record(cc, table_ecc, ltn, lcd)
+            if record is None:
+                continue
+
+            (cc, ecc, ltn, locationClass, lcd, negativeOffset, positiveOffset, tcd, stcd,
+             longitude, latitude, roadNumber, roadName, firstName, secondName) = record
+            return TPEG_TMC_location(cc, ecc, ltn, lcd, chr(locationClass), tcd, stcd,
+                                     longitude / 100000 if longitude != _NO_COORDINATE else None,
+                                     latitude / 100000 if latitude != _NO_COORDINATE else None,
+                                     index.string(roadNumber), index.string(roadName),
+                                     index.string(firstName), index.string(secondName),
+                                     negativeOffset, positiveOffset)
+        return None
+
+    def extent(self, location, extent, direction):
+        """
+        Locations from location (primary) over extent steps to the secondary location; the secondary
+        location lies against the direction of travel (negative offsets for direction Positive).
+        """
+        locations = [location]
+        for i in range(extent):
+            lcd = location.negativeOffset if direction == 'Positive' else location.positiveOffset
+            if not lcd:
+                break
+            location = self.location(location.cc, location.ltn, lcd, location.ecc)
+            if location is None:
+                break
+            locations.append(location)
+        return locations
+
+    def resolve(self, node):
+        """ locations from primary to secondary of a decoded LRC_TMC component or ETL_TMC data structure """
+        location = self.location(node.countryCode, node.locationTableNumber, node.locationID, node.extendedCountryCode)
+        if location is None:
+            return []
+        return self.extent(location, node.extent, node.direction)
+
+    def annotate(self, node):
+        """ annotate all TMC locations below node with names and coordinates, return the number annotated """
+        count = 0
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node.type in ('LRC_TMC', 'ETL_TMC'):
+                locations = self.resolve(node)
+                if locations:
+                    node.annotations.extend(self._annotations(locations))
+                    count += 1
+                elif (node.countryCode, node.locationTableNumber) in self.tables:
+                    TPEG_log_error(node.levelprefix + "==> " + node.name + ": location %d not in location table %x/%d"
+                                   % (node.locationID, node.countryCode, node.locationTableNumber))
+
+            children = [value for [key, value] in getattr(node, 'attributes', []) if key == '_complex_']
+            pending.extend(reversed(children + getattr(node, 'subcomponents', [])))
+
+        return count
+
+    def _annotations(self, locations):
+        primary, secondary = locations[0], locations[-1]
+        road = primary.roadNumber
+        if primary.roadName and primary.roadName != road:
+            road = (road + ' ' + primary.roadName).strip()
+
+        annotations = []
+        if road:
+            annotations.append(['road', road])
+        annotations.append(['primaryLocation', self._describe(primary)])
+        if len(locations) > 1:
+            annotations.append(['secondaryLocation', self._describe(secondary)])
+        return annotations
+
+    def _describe(self, location):
+        text = '%d %s' % (location.lcd, ' - '.join(name for name in (location.firstName, location.secondName) if name))
+        if location.longitude is not None:
+            text += ' (%.5f, %.5f)' % (location.longitude, location.latitude)
+        return text.strip()
+
+
+if __name__ == '__main__':
+    print("TPEG_LRC_TMC_tables")
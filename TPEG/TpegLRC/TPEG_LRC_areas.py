@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Batch evaluation of positions against areas of location references
+#
+# TPEG_area_set tests M positions against N areas (e.g. the AffectedArea of EAW alerts)
+# in one call: bbox prefiltering on positions sorted by longitude, even-odd ray casting
+# over the vertex arrays of polygons (holes as further rings) and haversine radius tests.
+# NumPy is used if available, otherwise the same tests run per position in Python.
+#
+import os, sys
+import bisect
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+# numpy is optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#
+#
+from .TPEG_LRC_geometry import TPEG_LRC_shapes, TPEG_INFORMATION_AREAS, EARTH_RADIUS
+
+# shapes with an area
+_area_kinds = ('polygon', 'circle', 'bbox')
+
+# max number of position/edge pairs evaluated at once
+_CHUNK = 1 << 20
+
+#
+#
+def TPEG_area_shapes(node, name=None):
+    """
+    shapes with an area (polygon, circle, bbox) below node, only in components named name if given,
+    else outside EAW information areas
+    """
+    if name is None:
+        nodes = [node]
+    else:
+        nodes = []
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node.name == name:
+                nodes.append(node)
+            else:
+                pending.extend(reversed(getattr(node, 'subcomponents', [])))
+
+    return [shape for node in nodes for shape in TPEG_LRC_shapes(node, skip=TPEG_INFORMATION_AREAS if name is None else ())
+            if shape.kind in _area_kinds]
+
+def _haversine(lon1, lat1, lon2, lat2):
+    # TPEG_distance() on arrays
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + \
+        np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def _in_polygon(px, py, edges):
+    # even-odd rule per ring: inside the exterior ring and in none of the holes
+    x1, y1, y2, dx, dy, starts = edges
+    inside = np.zeros(len(px), dtype=bool)
+    step = max(1, _CHUNK // len(x1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, len(px), step):
+            x = px[start:start + step, None]
+            y = py[start:start + step, None]
+            crosses = ((y1 > y) != (y2 > y)) & (x < x1 + (y - y1) * dx / dy)
+            rings = np.add.reduceat(crosses, starts, axis=1) & 1
+            inside[start:start + step] = rings[:, 0].astype(bool) & ~rings[:, 1:].any(axis=1)
+    return inside
+
+def _polygon_edges(shape):
+    # edge arrays of all rings, ring i starts at edge starts[i]
+    rings = [shape.points] + [hole for hole in shape.holes]
+    starts = np.cumsum([0] + [len(ring) for ring in rings[:-1]])
+    points = np.array([point for ring in rings for point in ring], dtype=float)
+    successors = np.concatenate([np.roll(np.arange(start, start + len(ring)), -1)
+                                 for start, ring in zip(starts, rings)])
+    x1, y1 = points[:, 0], points[:, 1]
+    x2, y2 = x1[successors], y1[successors]
+    return x1, y1, y2, x2 - x1, y2 - y1, starts
+
+#
+# === class TPEG_area_set ===================================================
+#
+class TPEG_area_set(object):
+    def __init__(self, areas):
+        """ areas: one list of TPEG_shape per area (e.g. TPEG_area_shapes(alert, 'AffectedArea')) """
+        self.areas = [[shape for shape in shapes if shape.kind in _area_kinds] for shapes in areas]
+
+        # vertex arrays prepared once
+        self.prepared = None
+        if np is not None:
+            self.prepared = [[(shape, _polygon_edges(shape) if shape.kind == 'polygon' else None)
+                              for shape in shapes] for shapes in self.areas]
+
+    def __len__(self):
+        return len(self.areas)
+
+    def contains(self, lons, lats):
+        """
+        Sparse hit matrix of the positions (lons[j], lats[j]) in the areas: list with the (sorted)
+        indices of the positions inside area i at index i.
+        """
+        if self.prepared is None:
+            return self._contains_python(lons, lats)
+
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        order = np.argsort(lons, kind='stable')
+        sorted_lons = lons[order]
+
+        hits = []
+        for shapes in self.prepared:
+            found = []
+            for shape, edges in shapes:
+                west, south, east, north = shape.bbox
+                index = order[np.searchsorted(sorted_lons, west, 'left'):np.searchsorted(sorted_lons, east, 'right')]
+                index = index[(lats[index] >= south) & (lats[index] <= north)]
+                if len(index) == 0:
+                    continue
+
+                if shape.kind == 'polygon':
+                    index = index[_in_polygon(lons[index], lats[index], edges)]
+                elif shape.kind == 'circle':
+                    lon, lat = shape.points[0]
+                    index = index[_haversine(lon, lat, lons[index], lats[index]) <= shape.radius]
+                found.append(index)
+
+            hits.append(np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.intp))
+        return hits
+
+    def _contains_python(self, lons, lats):
+        order = sorted(range(len(lons)), key=lons.__getitem__)
+        sorted_lons = [lons[j] for j in order]
+
+        hits = []
+        for shapes in self.areas:
+            found = set()
+            for shape in shapes:
+                west, south, east, north = shape.bbox
+                for j in order[bisect.bisect_left(sorted_lons, west):bisect.bisect_right(sorted_lons, east)]:
+                    if j not in found and shape.contains(lons[j], lats[j]):
+                        found.add(j)
+            hits.append(sorted(found))
+        return hits
+
+
+if __name__ == '__main__':
+    print("TPEG_LRC_areas")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Coverage index of messages by geohash cells
+#
+# The areas of the location references of a message (see TPEG_LRC_geometry.py) are
+# rasterised into geohash cells of a fixed precision. A cell is interior if it lies
+# completely inside an area, else boundary. Position lookups probe the cell of the
+# position and test the exact geometry only for messages on boundary cells.
+#
+import os, sys
+import bisect
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+#
+from .TPEG_LRC_geometry import TPEG_LRC_shapes, TPEG_INFORMATION_AREAS, TPEG_distance, TPEG_bbox_distance
+
+# geohash alphabet
+_base32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+#
+#
+class _geohash_grid(object):
+    # cells of the geohashes of one precision
+    def __init__(self, precision):
+        self.precision = precision
+        self.lon_bits = (5 * precision + 1) // 2
+        self.lat_bits = 5 * precision // 2
+        self.width = 360.0 / (1 << self.lon_bits)
+        self.height = 180.0 / (1 << self.lat_bits)
+
+    def cell(self, lon, lat):
+        ix = min(max(int((lon + 180.0) / self.width), 0), (1 << self.lon_bits) - 1)
+        iy = min(max(int((lat + 90.0) / self.height), 0), (1 << self.lat_bits) - 1)
+        return ix, iy
+
+    def bounds(self, ix, iy):
+        west = ix * self.width - 180.0
+        south = iy * self.height - 90.0
+        return west, south, west + self.width, south + self.height
+
+    def geohash(self, ix, iy):
+        # interleave longitude and latitude bits, longitude first
+        code = 0
+        for i in range(5 * self.precision):
+            if i & 1:
+                bit = (iy >> (self.lat_bits - 1 - (i >> 1))) & 1
+            else:
+                bit = (ix >> (self.lon_bits - 1 - (i >> 1))) & 1
+            code = (code << 1) | bit
+
+        return ''.join(_base32[(code >> shift) & 0x1F] for shift in range(5 * self.precision - 5, -1, -5))
+
+def TPEG_geohash(lon, lat, precision=5):
+    """ geohash of a WGS84 coordinate """
+    grid = _geohash_grid(precision)
+    return grid.geohash(*grid.cell(lon, lat))
+
+#
+# rasterisation: {(ix, iy): interior}
+#
+def _raster_bbox(grid, bbox):
+    west, south, east, north = bbox
+    ix0, iy0 = grid.cell(west, south)
+    ix1, iy1 = grid.cell(east, north)
+    cells = {}
+    for ix in range(ix0, ix1 + 1):
+        for iy in range(iy0, iy1 + 1):
+            w, s, e, n = grid.bounds(ix, iy)
+            cells[(ix, iy)] = west <= w and e <= east and south <= s and n <= north
+    return cells
+
+def _raster_circle(grid, shape):
+    lon, lat = shape.points[0]
+    cells = {}
+    for (ix, iy) in _raster_bbox(grid, shape.bbox):
+        bounds = grid.bounds(ix, iy)
+        if TPEG_bbox_distance(bounds, lon, lat) > shape.radius:
+            continue
+        w, s, e, n = bounds
+        # a circle is convex: inside if all corners are
+        cells[(ix, iy)] = all(TPEG_distance(lon, lat, x, y) <= shape.radius for x, y in ((w, s), (w, n), (e, s), (e, n)))
+    return cells
+
+def _raster_polygon(grid, shape):
+    rings = [shape.points] + list(shape.holes)
+    cells = {}
+
+    # boundary: cells along every edge, walked in steps of at most one cell
+    for ring in rings:
+        x1, y1 = ring[-1]
+        for x2, y2 in ring:
+            steps = int(max(abs(x2 - x1) / grid.width, abs(y2 - y1) / grid.height)) + 1
+            for i in range(steps):
+                xa, ya = x1 + (x2 - x1) * i / steps, y1 + (y2 - y1) * i / steps
+                xb, yb = x1 + (x2 - x1) * (i + 1) / steps, y1 + (y2 - y1) * (i + 1) / steps
+                ix0, iy0 = grid.cell(min(xa, xb), min(ya, yb))
+                ix1, iy1 = grid.cell(max(xa, xb), max(ya, yb))
+                for ix in range(ix0, ix1 + 1):
+                    for iy in range(iy0, iy1 + 1):
+                        cells[(ix, iy)] = False
+            x1, y1 = x2, y2
+
+    # interior: cells without edges whose center is inside (scanline over the cell rows)
+    ix0, iy0 = grid.cell(shape.bbox[0], shape.bbox[1])
+    ix1, iy1 = grid.cell(shape.bbox[2], shape.bbox[3])
+    for iy in range(iy0, iy1 + 1):
+        lat = (iy + 0.5) * grid.height - 90.0
+        crossings = []
+        for ring in rings:
+            xs = []
+            x1, y1 = ring[-1]
+            for x2, y2 in ring:
+                if (y1 > lat) != (y2 > lat):
+                    xs.append(x1 + (lat - y1) * (x2 - x1) / (y2 - y1))
+                x1, y1 = x2, y2
+            crossings.append(sorted(xs))
+
+        for ix in range(ix0, ix1 + 1):
+            if (ix, iy) in cells:
+                continue
+            lon = (ix + 0.5) * grid.width - 180.0
+            # even-odd rule as in TPEG_shape.contains(): crossings east of the center
+            inside = [(len(xs) - bisect.bisect_right(xs, lon)) & 1 for xs in crossings]
+            if inside[0] and not any(inside[1:]):
+                cells[(ix, iy)] = True
+    return cells
+
+def _raster(grid, shape):
+    if shape.kind == 'bbox':
+        return _raster_bbox(grid, shape.bbox)
+    if shape.kind == 'circle':
+        return _raster_circle(grid, shape)
+    if shape.kind == 'polygon':
+        return _raster_polygon(grid, shape)
+    return {}
+
+#
+# === class TPEG_coverage_index =============================================
+#
+class TPEG_coverage_index(object):
+    def __init__(self, precision=5, max_cells=65536):
+        """
+        geohash cells of precision; messages covering more than max_cells cells are not rasterised
+        but tested on every lookup
+        """
+        self.grid = _geohash_grid(precision)
+        self.max_cells = max_cells
+
+        self.cells = {}         # geohash -> {key: interior}
+        self.uncovered = set()  # keys not rasterised
+        self.entries = {}       # key -> (message, shapes, geohashes)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, message, shapes=None):
+        """
+        index message under key by the areas of shapes (default: the GLR/OLR locations of message
+        outside EAW information areas)
+        """
+        self.remove(key)
+        if shapes is None:
+            shapes = TPEG_LRC_shapes(message, skip=TPEG_INFORMATION_AREAS)
+        shapes = [shape for shape in shapes if shape.kind in ('bbox', 'circle', 'polygon')]
+        if not shapes:
+            return
+
+        cells = {}
+        for shape in shapes:
+            west, south, east, north = shape.bbox
+            ix0, iy0 = self.grid.cell(west, south)
+            ix1, iy1 = self.grid.cell(east, north)
+            if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > self.max_cells:
+                self.uncovered.add(key)
+                cells = {}
+                break
+            for cell, interior in _raster(self.grid, shape).items():
+                cells[cell] = cells.get(cell, False) or interior
+
+        geohashes = []
+        for (ix, iy), interior in cells.items():
+            geohash = self.grid.geohash(ix, iy)
+            self.cells.setdefault(geohash, {})[key] = interior
+            geohashes.append(geohash)
+        self.entries[key] = (message, shapes, geohashes)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        for geohash in entry[2]:
+            keys = self.cells[geohash]
+            del keys[key]
+            if not keys:
+                del self.cells[geohash]
+        self.uncovered.discard(key)
+
+    def update(self, event, key, message):
+        """ listener for TPEG_message_state """
+        if event in ('added', 'updated'):
+            self.add(key, message)
+        else:
+            self.remove(key)
+
+    def cell_keys(self, geohash):
+        """ {key: interior} of the messages covering a geohash cell (of the index precision) """
+        return self.cells.get(geohash, {})
+
+    def lookup(self, lon, lat):
+        """ list of (key, message) with an area containing the coordinate """
+        result = []
+        for key, interior in self.cells.get(self.grid.geohash(*self.grid.cell(lon, lat)), {}).items():
+            message, shapes, geohashes = self.entries[key]
+            if interior or any(shape.contains(lon, lat) for shape in shapes):
+                result.append((key, message))
+
+        for key in self.uncovered:
+            message, shapes, geohashes = self.entries[key]
+            if any(shape.contains(lon, lat) for shape in shapes):
+                result.append((key, message))
+        return result
+
+
+if __name__ == '__main__':
+    print("TPEG_LRC_coverage")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Geometry of decoded location references
+#
+# TPEG_LRC_shapes() collects the GLR and OLR locations below a component as TPEG_shape
+# (point, line, polygon, circle or bbox) in WGS84 degrees, e.g. for TPEG_spatial_index.
+#
+import os, sys
+import math
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+# mean earth radius (m)
+EARTH_RADIUS = 6371008.8
+
+# metres per degree of latitude
+METRES_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+
+# location containers telling where a message is of interest rather than where it applies
+# (EAW InformationArea), left out of containment tests
+TPEG_INFORMATION_AREAS = ('InformationArea',)
+
+#
+#
+def TPEG_distance(lon1, lat1, lon2, lat2):
+    """ great circle distance (m) of two WGS84 coordinates """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+def TPEG_bbox_distance(bbox, lon, lat):
+    """ distance (m) of a coordinate to a bbox (west, south, east, north), 0 inside """
+    west, south, east, north = bbox
+    return TPEG_distance(lon, lat, min(max(lon, west), east), min(max(lat, south), north))
+
+def _in_ring(ring, lon, lat):
+    # ray casting (even-odd rule)
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+#
+# === class TPEG_shape ======================================================
+#
+class TPEG_shape(object):
+    __slots__ = ('kind', 'points', 'radius', 'holes', 'bbox')
+
+    def __init__(self, kind, points, radius=0, holes=()):
+        """
+        kind point, line, polygon, circle (center and radius in m) or bbox (two corners);
+        points and holes are lists of (longitude, latitude)
+        """
+        self.kind = kind
+        self.points = points
+        self.radius = radius
+        self.holes = holes
+
+        lons = [lon for lon, lat in points]
+        lats = [lat for lon, lat in points]
+        west, south, east, north = min(lons), min(lats), max(lons), max(lats)
+        if radius:
+            dlat = radius / METRES_PER_DEGREE
+            dlon = dlat / max(math.cos(math.radians(min(max(abs(south), abs(north)) + dlat, 90))), 1e-6)
+            west, south, east, north = west - dlon, south - dlat, east + dlon, north + dlat
+        self.bbox = (west, south, east, north)
+
+    def __repr__(self):
+        return "TPEG_shape(%s, %d points, bbox=%s)" % (self.kind, len(self.points), self.bbox)
+
+    def intersects(self, bbox):
+        """ True if the bbox (west, south, east, north) of the shape overlaps bbox """
+        west, south, east, north = self.bbox
+        return west <= bbox[2] and bbox[0] <= east and south <= bbox[3] and bbox[1] <= north
+
+    def contains(self, lon, lat):
+        """ True if the area of the shape (circle, bbox, polygon) contains the coordinate """
+        west, south, east, north = self.bbox
+        if not (west <= lon <= east and south <= lat <= north):
+            return False
+
+        if self.kind == 'bbox':
+            return True
+        if self.kind == 'circle':
+            center = self.points[0]
+            return TPEG_distance(center[0], center[1], lon, lat) <= self.radius
+        if self.kind == 'polygon':
+            return _in_ring(self.points, lon, lat) and not any(_in_ring(hole, lon, lat) for hole in self.holes)
+
+        # points and lines have no area
+        return False
+
+    def distance(self, lon, lat):
+        """ distance (m) of a coordinate to the shape, 0 if contained """
+        if self.kind == 'circle':
+            center = self.points[0]
+            return max(0.0, TPEG_distance(center[0], center[1], lon, lat) - self.radius)
+        if self.kind in ('point', 'line'):
+            return min(TPEG_distance(x, y, lon, lat) for x, y in self.points)
+        if self.contains(lon, lat):
+            return 0.0
+        return min(TPEG_distance(x, y, lon, lat) for x, y in self.points) if self.kind == 'polygon' else \
+            TPEG_bbox_distance(self.bbox, lon, lat)
+
+#
+#
+def _coordinates(node, dstype):
+    return [(ds.longitude, ds.latitude) for ds in node.datastructures(dstype)]
+
+def _OLR_path(node):
+    # start coordinate followed by coordinates relative to their predecessor (1e-5 degrees)
+    points = _coordinates(node, 'OLR_AbsoluteGeoCoordinate')[:1]
+    if not points:
+        return points
+
+    lon, lat = points[0]
+    for ds in node.datastructures('OLR_RelativeGeoCoordinate'):
+        lon = round(lon + ds.deltaLongitude / 100000, 5)
+        lat = round(lat + ds.deltaLatitude / 100000, 5)
+        points.append((lon, lat))
+    return points
+
+def _corners(points):
+    # bbox shape from two opposite corners
+    return [(min(points[0][0], points[1][0]), min(points[0][1], points[1][1])),
+            (max(points[0][0], points[1][0]), max(points[0][1], points[1][1]))]
+
+def _shape(node):
+    # shape of a location reference node, None if it is none
+    kind = node.type
+    if kind == 'GLR_GeographicBoundingBox':
+        points = _coordinates(node, 'GLR_WGS84coordinate')
+        return TPEG_shape('bbox', _corners(points)) if len(points) == 2 else None
+
+    if kind in ('GLR_GeographicBoundingCircleSector', 'OLR_CircleLR'):
+        points = _coordinates(node, 'GLR_WGS84coordinate') or _coordinates(node, 'OLR_AbsoluteGeoCoordinate')
+        return TPEG_shape('circle', points[:1], radius=node.radius) if points else None
+
+    if kind == 'GLR_GeographicPointReference':
+        points = _coordinates(node, 'GLR_WGS84coordinate')
+        return TPEG_shape('point', points) if points else None
+
+    if kind == 'OLR_GeoCoordinateLR':
+        points = _coordinates(node, 'OLR_AbsoluteGeoCoordinate')
+        return TPEG_shape('point', points) if points else None
+
+    if kind == 'GLR_GeographicLineReference':
+        points = _coordinates(node, 'GLR_WGS84coordinate')
+        return TPEG_shape('line', points) if points else None
+
+    if kind == 'GLR_GeographicAreaReference':
+        points = _coordinates(node, 'GLR_WGS84coordinate')
+        return TPEG_shape('polygon', points) if len(points) >= 3 else None
+
+    if kind == 'GLR_GeographicAreaWithHolesReference':
+        rings = [_coordinates(polygon, 'GLR_WGS84coordinate') for polygon in node.datastructures('GLR_Polygon')]
+        if not rings or len(rings[0]) < 3:
+            return None
+        return TPEG_shape('polygon', rings[0], holes=[ring for ring in rings[1:] if len(ring) >= 3])
+
+    if kind == 'OLR_RectangleLR':
+        rectangles = node.datastructures('OLR_Rectangle')
+        points = _coordinates(rectangles[0], 'OLR_AbsoluteGeoCoordinate') if rectangles else []
+        return TPEG_shape('bbox', _corners(points)) if len(points) == 2 else None
+
+    if kind == 'OLR_PolygonLR':
+        points = _OLR_path(node)
+        holes = [_OLR_path(hole) for hole in node.subcomponents if hole.type == 'OLR_PolygonLR']
+        return TPEG_shape('polygon', points, holes=[hole for hole in holes if len(hole) >= 3]) \
+            if len(points) >= 3 else None
+
+    return None
+
+_shape_types = ('GLR_GeographicBoundingBox', 'GLR_GeographicBoundingCircleSector', 'GLR_GeographicPointReference',
+                'GLR_GeographicLineReference', 'GLR_GeographicAreaReference', 'GLR_GeographicAreaWithHolesReference',
+                'OLR_GeoCoordinateLR', 'OLR_CircleLR', 'OLR_RectangleLR', 'OLR_PolygonLR')
+
+def TPEG_LRC_shapes(node, skip=()):
+    """ list of TPEG_shape of all GLR and OLR location references in node and below, not below nodes named in skip """
+    shapes = []
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if node.name in skip:
+            continue
+        if node.type in _shape_types:
+            shape = _shape(node)
+            if shape is not None:
+                shapes.append(shape)
+            continue
+
+        children = [value for [key, value] in getattr(node, 'attributes', []) if key == '_complex_']
+        pending.extend(reversed(children + getattr(node, 'subcomponents', [])))
+
+    return shapes
+
+
+if __name__ == '__main__':
+    print("TPEG_LRC_geometry")
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Simplification of lines and polygons for encoding (e.g. EAW areas with < 400 coordinates)
+#
+# Every vertex gets a significance in metres: Douglas-Peucker split distance (all segments
+# split at once per round, as far as needed) or Visvalingam-Whyatt square root of the
+# effective area (heap elimination). A simplification keeps the vertices more significant than the
+# tolerance; for a max number of points the tolerance is searched by bisection. With
+# preserve_topology, segments crossing other segments of the result are split again at
+# their farthest original vertex. Coordinates are (longitude, latitude) in WGS84 degrees,
+# computations run on NumPy arrays in a local equirectangular projection.
+#
+import os, sys
+import heapq
+import math
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+# numpy is optional, without it shapes are not simplified
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#
+#
+from Base.TPEG_string     import TPEG_string
+from Base.TPEG_data_types import encodeWGS84coordinate
+from Base.TPEG_error      import TPEG_log_error
+from .TPEG_LRC_geometry   import METRES_PER_DEGREE
+
+DOUGLAS_PEUCKER    = 'douglas-peucker'
+VISVALINGAM_WHYATT = 'visvalingam-whyatt'
+
+# range of OLR relative coordinates (IntSiLi, 1e-5 degrees)
+_OLR_MAX_DELTA = 32767
+
+#
+#
+def _project(rings):
+    # local equirectangular projection (m) around the mean latitude
+    lat0 = np.mean([ring[:, 1].mean() for ring in rings])
+    scale = np.array([METRES_PER_DEGREE * np.cos(np.radians(lat0)), METRES_PER_DEGREE])
+    return [np.asfortranarray(ring * scale) for ring in rings]
+
+def _farthest(xy, first, last):
+    # index and distance of the vertex between first and last farthest from their segment
+    x = xy[first + 1:last, 0] - xy[first, 0]
+    y = xy[first + 1:last, 1] - xy[first, 1]
+    dx, dy = xy[last] - xy[first]
+    length2 = dx * dx + dy * dy
+    if length2 > 0:
+        t = np.clip((x * dx + y * dy) / length2, 0.0, 1.0)
+        x, y = x - t * dx, y - t * dy
+    distances2 = x * x + y * y
+    i = int(distances2.argmax())
+    return first + 1 + i, math.sqrt(distances2[i])
+
+def _douglas_peucker(xy, tolerance, max_points, rounds):
+    # split distance, made monotonic along the splits (a vertex is never more significant than the
+    # vertex splitting its segment), unvisited vertices keep 0. All segments are split at once per
+    # round; after the first rounds segments are not split further once they can not contain a vertex
+    # above tolerance or among the max_points most significant ones.
+    n = len(xy)
+    significance = np.zeros(n)
+    significance[[0, -1]] = np.inf
+
+    x, y = xy[:, 0], xy[:, 1]
+    first, last, limit = np.array([0]), np.array([n - 1]), np.array([np.inf])
+    while True:
+        active = last - first > 1
+        if rounds > 0:
+            rounds -= 1
+        else:
+            threshold = tolerance
+            if np.count_nonzero(significance) >= max_points:
+                threshold = max(threshold, np.partition(significance, n - max_points)[n - max_points])
+            active &= limit > threshold
+        first, last, limit = first[active], last[active], limit[active]
+        if len(first) == 0:
+            return significance
+
+        # vertices between first and last of each segment
+        lengths = last - first - 1
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(first)), lengths)
+        index = np.arange(lengths.sum()) - offsets[segment] + first[segment] + 1
+
+        x0, y0 = x[first][segment], y[first][segment]
+        dx, dy = (x[last] - x[first])[segment], (y[last] - y[first])[segment]
+        px, py = x[index] - x0, y[index] - y0
+        length2 = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(length2 > 0, np.clip((px * dx + py * dy) / length2, 0.0, 1.0), 0.0)
+        px, py = px - t * dx, py - t * dy
+        distances2 = px * px + py * py
+
+        # first farthest vertex of each segment
+        farthest2 = np.maximum.reduceat(distances2, offsets)
+        candidates = np.flatnonzero(distances2 == farthest2[segment])
+        split = index[candidates[np.unique(segment[candidates], return_index=True)[1]]]
+
+        distance = np.minimum(np.sqrt(farthest2), limit)
+        significance[split] = distance
+        first, last = np.concatenate([first, split]), np.concatenate([split, last])
+        limit = np.concatenate([distance, distance])
+
+def _visvalingam_whyatt(xy):
+    # square root of the effective triangle area at elimination, never below an earlier one
+    n = len(xy)
+    significance = np.full(n, np.inf)
+    if n < 3:
+        return significance
+
+    x, y = xy[:, 0], xy[:, 1]
+    area = np.zeros(n)
+    area[1:-1] = 0.5 * np.abs((x[:-2] - x[1:-1]) * (y[2:] - y[1:-1]) - (y[:-2] - y[1:-1]) * (x[2:] - x[1:-1]))
+
+    # elimination on python lists, element access on arrays is slow
+    x, y, area = x.tolist(), y.tolist(), area.tolist()
+    previous = list(range(-1, n - 1))
+    following = list(range(1, n + 1))
+    eliminated = [None] * n
+    heap = [(area[i], i) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+
+    removed = 0.0
+    while heap:
+        a, i = heapq.heappop(heap)
+        if a != area[i] or eliminated[i] is not None:
+            continue   # stale entry
+
+        removed = max(removed, a)
+        eliminated[i] = math.sqrt(removed)
+        p, f = previous[i], following[i]
+        following[p], previous[f] = f, p
+        for j in (p, f):
+            if 0 < j < n - 1:
+                pj, fj = previous[j], following[j]
+                area[j] = 0.5 * abs((x[pj] - x[j]) * (y[fj] - y[j]) - (y[pj] - y[j]) * (x[fj] - x[j]))
+                heapq.heappush(heap, (area[j], j))
+
+    significance[1:-1] = eliminated[1:-1]
+    return significance
+
+def _crossing_segments(rings, kept):
+    # (ring, position) of the kept segments properly crossing another kept segment
+    starts = np.concatenate([xy[k[:-1]] for xy, k in zip(rings, kept)])
+    ends   = np.concatenate([xy[k[1:]] for xy, k in zip(rings, kept)])
+    ring   = np.concatenate([np.full(len(k) - 1, r) for r, k in enumerate(kept)])
+    pos    = np.concatenate([np.arange(len(k) - 1) for k in kept])
+    count  = np.array([len(k) - 1 for k in kept])[ring]
+    closed = np.array([np.array_equal(xy[k[0]], xy[k[-1]]) for xy, k in zip(rings, kept)])[ring]
+    if len(starts) < 3:
+        return set()
+
+    # candidate pairs overlapping in longitude, from the segments ordered by their west end
+    west, east = np.minimum(starts[:, 0], ends[:, 0]), np.maximum(starts[:, 0], ends[:, 0])
+    order = np.argsort(west, kind='stable')
+    stop = np.searchsorted(west[order], east[order], 'right')
+    length = stop - np.arange(1, len(order) + 1)
+    a = np.repeat(order, length)
+    b = order[np.arange(len(a)) - np.repeat(np.cumsum(length) - length, length) +
+              np.repeat(np.arange(1, len(order) + 1), length)]
+
+    # neighbours along a ring share a vertex
+    same = ring[a] == ring[b]
+    gap = np.abs(pos[a] - pos[b])
+    keep = ~(same & ((gap == 1) | (closed[a] & (gap == count[a] - 1))))
+    a, b = a[keep], b[keep]
+
+    def orientation(p, q, r):
+        return np.sign((q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0]))
+
+    p1, p2, q1, q2 = starts[a], ends[a], starts[b], ends[b]
+    crossing = (orientation(p1, p2, q1) * orientation(p1, p2, q2) < 0) & \
+               (orientation(q1, q2, p1) * orientation(q1, q2, p2) < 0)
+    return {(int(ring[s]), int(pos[s])) for s in np.concatenate([a[crossing], b[crossing]])}
+
+def _select(rings, significances, tolerance, preserve_topology):
+    kept = [np.flatnonzero(significance > tolerance) for significance in significances]
+    if not preserve_topology:
+        return kept
+
+    while True:
+        crossings = _crossing_segments(rings, kept)
+        splits = [[] for _ in rings]
+        for r, p in crossings:
+            first, last = kept[r][p], kept[r][p + 1]
+            if last - first > 1:
+                splits[r].append(_farthest(rings[r], first, last)[0])
+        if not any(splits):
+            if crossings:
+                TPEG_log_error("==> TPEG_simplify: %d crossing segments left" % len(crossings))
+            return kept
+        kept = [np.union1d(k, s).astype(int) for k, s in zip(kept, splits)]
+
+def _count(kept):
+    return sum(len(k) for k in kept)
+
+#
+#
+def TPEG_simplify_polygon(rings, tolerance=0.0, max_points=None, method=DOUGLAS_PEUCKER,
+                          preserve_topology=False):
+    """
+    Simplify rings of (longitude, latitude), e.g. a polygon and its holes. Vertices deviating less than
+    tolerance (m) are dropped; with max_points the total number of vertices (first and last of a closed
+    ring counted both) is at most max_points, dropping as many vertices as needed. Closed rings (first
+    vertex repeated at the end) keep at least 4 vertices. Returns the simplified rings as arrays.
+    """
+    if np is None:
+        TPEG_log_error("==> TPEG_simplify: numpy not available, shapes not simplified")
+        return rings
+
+    rings = [np.asarray(ring, dtype=float).reshape(-1, 2) for ring in rings]
+    projected = _project(rings) if rings else []
+    limit = max_points if max_points is not None else sum(len(ring) for ring in rings)
+
+    significances = []
+    for xy in projected:
+        closed = len(xy) > 3 and np.array_equal(xy[0], xy[-1])
+        if method == DOUGLAS_PEUCKER:
+            significance = _douglas_peucker(xy, tolerance, limit, 2 if closed else 0)
+        elif method == VISVALINGAM_WHYATT:
+            significance = _visvalingam_whyatt(xy)
+        else:
+            TPEG_log_error("==> TPEG_simplify: unknown method %s" % method)
+            return rings
+
+        # a ring keeps its most significant interior vertices
+        if closed:
+            significance[1 + np.argsort(-significance[1:-1], kind='stable')[:2]] = np.inf
+        significances.append(significance)
+
+    if max_points is not None:
+        # bisection over the significances for the lowest tolerance with at most max_points vertices,
+        # first on the vertex counts without crossing repairs (which only add vertices)
+        significance = np.concatenate(significances)
+        candidates = np.unique(significance[significance > tolerance])
+        candidates = np.concatenate(([tolerance], candidates[np.isfinite(candidates)], [np.inf]))
+
+        def bisect(low, high, count):
+            while low < high:
+                middle = (low + high) // 2
+                if count(candidates[middle]) <= max_points:
+                    high = middle
+                else:
+                    low = middle + 1
+            return low
+
+        low = bisect(0, len(candidates) - 1, lambda limit: np.count_nonzero(significance > limit))
+        if preserve_topology:
+            low = bisect(low, len(candidates) - 1,
+                         lambda limit: _count(_select(projected, significances, limit, True)))
+        tolerance = candidates[low]
+
+    kept = _select(projected, significances, tolerance, preserve_topology)
+    if max_points is not None and _count(kept) > max_points:
+        TPEG_log_error("==> TPEG_simplify: %d vertices left, %d requested" % (_count(kept), max_points))
+
+    return [ring[k] for ring, k in zip(rings, kept)]
+
+def TPEG_simplify(points, tolerance=0.0, max_points=None, method=DOUGLAS_PEUCKER, preserve_topology=False):
+    """ simplify a line or closed ring of (longitude, latitude), see TPEG_simplify_polygon() """
+    return TPEG_simplify_polygon([points], tolerance, max_points, method, preserve_topology)[0]
+
+#
+#
+def TPEG_WGS84_coordinates(points):
+    """ encoded WGS84 coordinates of points (encodeWGS84coordinate), repeated coordinates dropped """
+    encoded = []
+    for lon, lat in points:
+        coordinate = encodeWGS84coordinate(lon, lat)
+        if not encoded or encoded[-1] != coordinate:
+            encoded.append(coordinate)
+    return encoded
+
+def TPEG_OLR_relative_coordinates(points):
+    """
+    OLR start coordinate and path of points: (longitude, latitude) as decoded from its WGS84 encoding
+    and the list of (deltaLongitude, deltaLatitude) in 1e-5 degrees to be encoded as OLR relative
+    coordinates. Deltas are relative to the decoded predecessor (no drift), out of range deltas are
+    split, zero deltas dropped.
+    """
+    if np is not None and isinstance(points, np.ndarray):
+        points = points.tolist()
+    points = iter(points)
+    lon, lat = next(points)
+    start = TPEG_string(encodeWGS84coordinate(lon, lat)).WGS84CoordinatePair()
+
+    path = []
+    x, y = round(start[0] * 100000), round(start[1] * 100000)
+    for lon, lat in points:
+        dx, dy = round(lon * 100000) - x, round(lat * 100000) - y
+        steps = -(-max(abs(dx), abs(dy)) // _OLR_MAX_DELTA)
+        for step in range(1, steps + 1):
+            path.append((dx * step // steps - dx * (step - 1) // steps,
+                         dy * step // steps - dy * (step - 1) // steps))
+        x, y = x + dx, y + dy
+    return start, path
+
+
+if __name__ == '__main__':
+    print("TPEG_LRC_simplify")
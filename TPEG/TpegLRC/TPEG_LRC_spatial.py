@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Spatial index of messages by the geometry of their location references
+#
+# Uniform grids in WGS84 degrees: every cell holds the keys of the messages whose shapes
+# (see TPEG_LRC_geometry.py) overlap it. Shapes covering very many cells go to a grid of
+# coarser cells (16 times the size per level). Messages are added and removed one by one,
+# e.g. as listener of TPEG_message_state.
+#
+import os, sys
+import math
+import heapq
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+#
+from .TPEG_LRC_geometry import TPEG_LRC_shapes, TPEG_INFORMATION_AREAS, METRES_PER_DEGREE
+
+#
+# === class TPEG_spatial_index ==============================================
+#
+class TPEG_spatial_index(object):
+    def __init__(self, cell_size=0.25, max_cells=256, levels=3):
+        """
+        grid of cell_size degrees, shapes spanning more than max_cells cells go to the next coarser
+        of levels grids
+        """
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.sizes     = [cell_size * 16 ** level for level in range(levels)]
+
+        self.cells   = {}                           # (level, ix, iy) -> set of keys
+        self.coarse  = [set() for size in self.sizes]  # keys by level above 0
+        self.entries = {}                           # key -> (message, shapes, cells, areas)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _cell_range(self, bbox, level=0):
+        size = self.sizes[level]
+        return (int(math.floor(bbox[0] / size)), int(math.floor(bbox[1] / size)),
+                int(math.floor(bbox[2] / size)), int(math.floor(bbox[3] / size)))
+
+    def add(self, key, message, shapes=None):
+        """
+        index message under key by shapes (default: the GLR/OLR locations of message), point
+        queries test the shapes given or those outside information areas
+        """
+        self.remove(key)
+        if shapes is None:
+            shapes = TPEG_LRC_shapes(message)
+            areas  = TPEG_LRC_shapes(message, skip=TPEG_INFORMATION_AREAS)
+        else:
+            areas  = shapes
+        if not shapes:
+            return
+
+        cells = set()
+        for shape in shapes:
+            # finest level with at most max_cells cells (all cells on the coarsest)
+            for level in range(len(self.sizes)):
+                ix0, iy0, ix1, iy1 = self._cell_range(shape.bbox, level)
+                if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) <= self.max_cells:
+                    break
+            if level:
+                self.coarse[level].add(key)
+            cells.update((level, ix, iy) for ix in range(ix0, ix1 + 1) for iy in range(iy0, iy1 + 1))
+
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(key)
+        self.entries[key] = (message, shapes, cells, areas)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        for cell in entry[2]:
+            keys = self.cells[cell]
+            keys.discard(key)
+            if not keys:
+                del self.cells[cell]
+        for keys in self.coarse:
+            keys.discard(key)
+
+    def update(self, event, key, message):
+        """ listener for TPEG_message_state """
+        if event in ('added', 'updated'):
+            self.add(key, message)
+        else:
+            self.remove(key)
+
+    def _candidates(self, bbox):
+        keys = set()
+        for level in range(len(self.sizes)):
+            if level and not self.coarse[level]:
+                continue
+
+            ix0, iy0, ix1, iy1 = self._cell_range(bbox, level)
+            if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) <= len(self.cells):
+                for ix in range(ix0, ix1 + 1):
+                    for iy in range(iy0, iy1 + 1):
+                        keys.update(self.cells.get((level, ix, iy), ()))
+            else:
+                # query larger than the occupied grid
+                for (l, ix, iy), cell in self.cells.items():
+                    if l == level and ix0 <= ix <= ix1 and iy0 <= iy <= iy1:
+                        keys.update(cell)
+        return keys
+
+    def query_bbox(self, bbox):
+        """ list of (key, message) with shapes intersecting bbox (west, south, east, north) """
+        result = []
+        for key in self._candidates(bbox):
+            message, shapes, cells, areas = self.entries[key]
+            if any(shape.intersects(bbox) for shape in shapes):
+                result.append((key, message))
+        return result
+
+    def query_point(self, lon, lat):
+        """
+        list of (key, message) with an area (circle, bbox, polygon) containing the coordinate,
+        EAW information areas excluded
+        """
+        result = []
+        for key in self._candidates((lon, lat, lon, lat)):
+            message, shapes, cells, areas = self.entries[key]
+            if any(shape.contains(lon, lat) for shape in areas):
+                result.append((key, message))
+        return result
+
+    def nearest(self, lon, lat, k=1):
+        """ list of (distance in m, key, message) of the k messages nearest to the coordinate """
+        distances = {}
+
+        def visit(keys):
+            for key in keys:
+                if key not in distances:
+                    distances[key] = min(shape.distance(lon, lat) for shape in self.entries[key][1])
+
+        # rings are searched on the finest grid
+        for keys in self.coarse:
+            visit(keys)
+        cx, cy = self._cell_range((lon, lat, lon, lat))[:2]
+        visited = 0
+        ring = 0
+        while True:
+            if visited > len(self.cells):
+                # rings cover more than the occupied grid: check all
+                visit(self.entries)
+                break
+
+            if ring == 0:
+                cells = [(cx, cy)]
+            else:
+                cells = [(cx + dx, cy + dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)] + \
+                        [(cx + dx, cy + dy) for dx in (-ring, ring) for dy in range(-ring + 1, ring)]
+            for cx1, cy1 in cells:
+                visit(self.cells.get((0, cx1, cy1), ()))
+            visited += len(cells)
+
+            # cells beyond this ring are at least ring cells away
+            if len(distances) >= k:
+                bound = ring * self.cell_size * METRES_PER_DEGREE * \
+                        math.cos(math.radians(min(abs(lat) + (ring + 1) * self.cell_size, 90)))
+                if heapq.nsmallest(k, distances.values())[-1] <= bound:
+                    break
+            ring += 1
+
+        return [(distance, key, self.entries[key][0])
+                for key, distance in heapq.nsmallest(k, distances.items(), key=lambda item: item[1])]
+
+
+if __name__ == '__main__':
+    print("TPEG_LRC_spatial")
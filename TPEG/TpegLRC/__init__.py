@@ -32,5 +32,11 @@ __all__ = [
     "TPEG_LRC_TMC",
     "TPEG_LRC_ETL",
     "TPEG_LRC_GLR",
-    "TPEG_LRC_OLR"
+    "TPEG_LRC_OLR",
+    "TPEG_LRC_geometry",
+    "TPEG_LRC_spatial",
+    "TPEG_LRC_areas",
+    "TPEG_LRC_coverage",
+    "TPEG_LRC_TMC_tables",
+    "TPEG_LRC_simplify"
     ]
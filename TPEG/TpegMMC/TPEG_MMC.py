@@ -40,7 +40,7 @@ if __name__ == '__main__':
 #
 from .TPEG_MMC_tables     import MMC_code_to_text
 #
-from Base.TPEG_string    import TPEG_string
+from Base.TPEG_string    import TPEG_string, TPEG_BitArray
 from Base.TPEG_component import TPEG_component, TPEG_datastructure
 
 # datetime is needed for unix time conversion
@@ -59,6 +59,12 @@ class TPEG_MMCTemplate(TPEG_component):
         self.messageGenerationTime = None
         self.priority              = None
 
+        # selector as encoded by encode_head()
+        self.selector              = TPEG_BitArray([0])
+
+    # fields to be changed by update(), e.g. update(versionID=3)
+    update_fields = ('messageID', 'versionID', 'messageExpiryTime', 'cancelFlag', 'messageGenerationTime', 'priority')
+
     def parse_attributes(self,TPEGstring):
 
         self.messageID         = TPEGstring.IntUnLoMB()
@@ -92,9 +98,48 @@ class TPEG_MMCTemplate(TPEG_component):
             self.attributes.append(['messageGenerationTime',TPEGstring.DateTime()])
 
         if selector.is_set(2):
-            self.attributes.append(['priority',TPEGstring.IntUnTi()]);
+            self.priority = TPEGstring.IntUnTi()
+            self.attributes.append(['priority',self.priority]);
+
+        # template attributes are re-encoded on update(), see encode_head()
+        self.selector     = selector
+        self._head_length = self._attr_start - TPEGstring.len()
 
         return selector
+
+    def update_field(self,name,value):
+        setattr(self,name,value)
+
+        # times are given as timestamp (seconds since 1970)
+        if name in ['messageExpiryTime', 'messageGenerationTime'] and value is not None:
+            value = datetime.utcfromtimestamp(value)
+
+        self.set_attribute(name, value, present=value not in [None, False])
+
+    def copy_template(self,mmc):
+        # take over the template attributes of another MMC container (e.g. for the parts of a message)
+        self.update(messageID=mmc.messageID, versionID=mmc.versionID, messageExpiryTime=mmc.messageExpiryTime,
+                    cancelFlag=mmc.cancelFlag, messageGenerationTime=mmc.messageGenerationTime, priority=mmc.priority)
+
+    def encode_head(self,writer):
+        writer.IntUnLoMB(self.messageID)
+        writer.IntUnTi(self.versionID)
+        writer.DateTime(self.messageExpiryTime)
+
+        # keep selector bits of specialisations
+        mask = self.selector.mask & ~0x07
+        if self.cancelFlag:
+            mask |= 0x01
+        if self.messageGenerationTime is not None:
+            mask |= 0x02
+        if self.priority is not None:
+            mask |= 0x04
+        writer.BitArray(TPEG_BitArray.from_mask(mask, len(self.selector.value)))
+
+        if self.messageGenerationTime is not None:
+            writer.DateTime(self.messageGenerationTime)
+        if self.priority is not None:
+            writer.IntUnTi(self.priority)
 #
 #
 class MMC_MultiPartMessageDirectory(TPEG_datastructure):
@@ -102,8 +147,11 @@ class MMC_MultiPartMessageDirectory(TPEG_datastructure):
         TPEG_datastructure.__init__(self,level,componentsDict,Cname,Ctype)
 
     def parse_attributes(self,TPEGstring):
-        self.attributes.append(['partID',   TPEGstring.IntUnTi()])
-        self.attributes.append(['partType', MMC_code_to_text(TPEGstring.IntUnTi(),"MMC_001")])
+        self.partID   = TPEGstring.IntUnTi()
+        self.partType = TPEGstring.IntUnTi()
+
+        self.attributes.append(['partID',   self.partID])
+        self.attributes.append(['partType', MMC_code_to_text(self.partType,"MMC_001")])
 
         return
 #
@@ -122,18 +170,56 @@ class TPEG_MMCMaster_component(TPEG_MMCTemplate):
     def __init__(self,id,level=1,componentsDict={},Cname="MMCMaster_component",Ctype="MMCMaster_component"):
         TPEG_MMCTemplate.__init__(self,id,level,componentsDict,Cname,Ctype)
 
+        # list of (partID, partType)
+        self.directory = []
+
+    update_fields = TPEG_MMCTemplate.update_fields + ('directory',)
+
     def parse_attributes(self,TPEGstring):
         selector = TPEG_MMCTemplate.parse_attributes(self,TPEGstring)
 
         self.parse_n_datastructures_of_type(TPEGstring, 'multiPartMessageDirectory',MMC_MultiPartMessageDirectory)
 
+        # the directory is part of the head re-encoded on update()
+        self.directory    = [(ds.partID, ds.partType) for ds in self.datastructures('MMC_MultiPartMessageDirectory')]
+        self._head_length = self._attr_start - TPEGstring.len()
+
         return
+
+    def update_field(self,name,value):
+        if name != 'directory':
+            return TPEG_MMCTemplate.update_field(self,name,value)
+
+        self.directory  = list(value)
+        self.attributes = [[key, attr] for [key, attr] in self.attributes if key != '_complex_']
+        for i, (partID, partType) in enumerate(self.directory):
+            DataStructure = MMC_MultiPartMessageDirectory(self.level + 1, Cname='multiPartMessageDirectory_%d' % i)
+            DataStructure.partID   = partID
+            DataStructure.partType = partType
+            DataStructure.attributes.append(['partID',   partID])
+            DataStructure.attributes.append(['partType', MMC_code_to_text(partType,"MMC_001")])
+            self.attributes.append(['_complex_', DataStructure])
+
+        self._render_key = None
+
+    def encode_head(self,writer):
+        TPEG_MMCTemplate.encode_head(self,writer)
+
+        writer.IntUnLoMB(len(self.directory))
+        for partID, partType in self.directory:
+            writer.IntUnTi(partID)
+            writer.IntUnTi(partType)
 #
 #
 class TPEG_MMCMessagePart_component(TPEG_MMCTemplate):
     def __init__(self,id,level=1,componentsDict={},Cname="MMCMessagePart_component",Ctype="MMCMessagePart_component"):
         TPEG_MMCTemplate.__init__(self,id,level,componentsDict,Cname,Ctype)
 
+        # versions of the master message the part applies to (all if empty)
+        self.messageVersions = []
+
+    update_fields = TPEG_MMCTemplate.update_fields + ('PartID', 'updateMode', 'messageVersions')
+
     def parse_attributes(self,TPEGstring):
         selector = TPEG_MMCTemplate.parse_attributes(self,TPEGstring)
 
@@ -143,10 +229,45 @@ class TPEG_MMCMessagePart_component(TPEG_MMCTemplate):
         self.attributes.append(['partID',       self.PartID])
         self.attributes.append(['updateMode',   MMC_code_to_text(self.updateMode,"MMC_002")])
         if selector.is_set(3):
-            self.parse_n_attributes_of_type(TPEGstring, 'messageVersion', TPEGstring.IntUnTi)
+            n = self.parse_n_attributes_of_type(TPEGstring, 'messageVersion', TPEGstring.IntUnTi)
+            self.messageVersions = [value for [key, value] in self.attributes[-n:]] if n else []
+
+        # all part attributes are re-encoded on update()
+        self._head_length = self._attr_start - TPEGstring.len()
 
         return
 
+    def update_field(self,name,value):
+        if name == 'PartID':
+            self.PartID = value
+            self.set_attribute('partID', value)
+        elif name == 'updateMode':
+            self.updateMode = value
+            self.set_attribute('updateMode', MMC_code_to_text(value,"MMC_002"))
+        elif name == 'messageVersions':
+            self.messageVersions = list(value)
+            self.attributes = [[key, attr] for [key, attr] in self.attributes if not key.startswith('messageVersion_')]
+            self.attributes.extend([['messageVersion_%d' % i, version] for i, version in enumerate(self.messageVersions)])
+            self._render_key = None
+        else:
+            TPEG_MMCTemplate.update_field(self,name,value)
+
+    def encode_head(self,writer):
+        # selector bit 3: list of master message versions
+        mask = self.selector.mask & ~0x08
+        if self.messageVersions:
+            mask |= 0x08
+        self.selector = TPEG_BitArray.from_mask(mask, len(self.selector.value))
+
+        TPEG_MMCTemplate.encode_head(self,writer)
+
+        writer.IntUnTi(self.PartID)
+        writer.IntUnTi(self.updateMode)
+        if self.messageVersions:
+            writer.IntUnLoMB(len(self.messageVersions))
+            for version in self.messageVersions:
+                writer.IntUnTi(version)
+
 #
 # Test functionality
 #
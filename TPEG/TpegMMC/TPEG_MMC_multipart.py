@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Multi-part messages: split of an application message into an MMC master message
+# and message parts, and reassembly of received parts
+#
+# The top level components of the message (apart from the MMC) are distributed in order
+# over the parts, every component is encoded once, parts are concatenations of the encoded
+# components. The encoded master and parts can be given to TPEG_frame_packer.add().
+#
+# Received masters and parts are buffered per (SID, COID, messageID, versionID) until the
+# directory of the master is complete, bounded in number, bytes, waiting time and by the
+# message expiry time.
+#
+# The component ids of MMCMaster and MMCMessagePart are defined by the application, which
+# has to register them in the componentsDict of its message component, e.g.
+#
+#   componentsDict[4] = TPEG_MMCMaster_component
+#   componentsDict[5] = TPEG_MMCMessagePart_component
+#
+# Without, masters and parts are decoded as plain MMC components and the reassembler passes
+# the messages on as they are (the EAW, TEC and TFP messages here only map the plain MMC).
+#
+import os, sys
+import copy
+import time
+import heapq
+from collections import OrderedDict
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+#
+from .TPEG_MMC            import TPEG_MMCTemplate, TPEG_MMCMaster_component, TPEG_MMCMessagePart_component
+#
+from Base.TPEG_error      import TPEG_log_error
+from Base.TPEG_writer     import TPEG_to_binary
+from Base.TPEG_data_types import encodeIntUnLoMB
+from Base.TPEG_packer     import TPEG_encoded_component, TPEG_MAX_SERVICE_FRAME_PAYLOAD
+
+# max size of an encoded message, leaving room for a component frame around it
+TPEG_MMC_MAX_MESSAGE_SIZE = TPEG_MAX_SERVICE_FRAME_PAYLOAD - 16
+
+# MMC_001 part types, MMC_002 update modes
+MMC_PART_MANDATORY    = 1
+MMC_PART_ADDITIONAL   = 2
+MMC_UPDATE_REPLACE    = 1
+
+#
+#
+def _message_with(message, components):
+    # encoded message holding the given encoded components (attributes as in message)
+    part = copy.copy(message)
+    part.subcomponents = components
+    part.comp_string   = None
+    part.dirty         = True
+    return TPEG_to_binary(part)
+
+def _message_size(message, size):
+    # bytes of a message (attributes as in message) with subcomponents of size bytes
+    attr_length = len(message.attr_string)
+    attributes  = len(encodeIntUnLoMB(attr_length)) + attr_length
+    return 1 + len(encodeIntUnLoMB(attributes + size)) + attributes + size
+
+#
+#
+def TPEG_MMC_split_message(message, master_id, part_id, max_size=TPEG_MMC_MAX_MESSAGE_SIZE,
+                           partType=MMC_PART_MANDATORY, updateMode=MMC_UPDATE_REPLACE):
+    """
+    Return the encoded messages (binary strings) for an application message, master first.
+
+    Messages up to max_size bytes are returned as one; larger ones are split at component
+    boundaries into a master (component id master_id) and parts 1..n (component id part_id),
+    the component ids of MMCMaster and MMCMessagePart are defined by the application.
+    """
+    binary = TPEG_to_binary(message)
+    if len(binary) <= max_size:
+        return [binary]
+
+    mmc = None
+    components = []
+    for component in message.subcomponents:
+        if mmc is None and isinstance(component, TPEG_MMCTemplate):
+            mmc = component
+        else:
+            components.append(TPEG_to_binary(component))
+
+    if mmc is None:
+        TPEG_log_error("==> " + message.name + ": no MMC component, message of %d bytes not split" % len(binary))
+        return [binary]
+
+    def new_part(PartID):
+        part = TPEG_MMCMessagePart_component(part_id, mmc.level)
+        part.copy_template(mmc)
+        part.update(PartID=PartID, updateMode=updateMode)
+        return part
+
+    # size of the part MMC does not depend on the part ID
+    part_size = len(TPEG_to_binary(new_part(1)))
+
+    # distribute components in order, one pass
+    groups  = [[]]
+    size    = part_size
+    for component in components:
+        if groups[-1] and _message_size(message, size + len(component)) > max_size:
+            groups.append([])
+            size = part_size
+        if _message_size(message, part_size + len(component)) > max_size:
+            TPEG_log_error("==> " + message.name + ": component of %d bytes exceeds part size %d" % (len(component), max_size))
+        groups[-1].append(component)
+        size += len(component)
+
+    master = TPEG_MMCMaster_component(master_id, mmc.level)
+    master.copy_template(mmc)
+    master.update(directory=[(i + 1, partType) for i in range(len(groups))])
+
+    messages = [_message_with(message, [master])]
+    for i, group in enumerate(groups):
+        part = TPEG_encoded_component(TPEG_to_binary(new_part(i + 1)))
+        messages.append(_message_with(message, [part] + [TPEG_encoded_component(c) for c in group]))
+
+    return messages
+
+
+#
+# === class TPEG_MMC_reassembler ============================================
+#
+class _part_set(object):
+    # master and parts received for one multi-part message
+    def __init__(self, arrival):
+        self.message = None   # application message holding the master
+        self.parts   = {}     # PartID -> application message holding the part
+        self.size    = 0      # bytes buffered
+        self.expiry  = 0      # messageExpiryTime, 0 if unknown
+        self.arrival = arrival
+
+    def master(self):
+        return self.message.subcomponents[0] if self.message is not None else None
+
+    def is_complete(self):
+        # additional parts are optional, they are joined when received
+        master = self.master()
+        return master is not None and all(partID in self.parts for partID, partType in master.directory
+                                          if partType != MMC_PART_ADDITIONAL)
+
+
+class TPEG_MMC_reassembler(object):
+    def __init__(self, max_sets=1024, max_bytes=4 << 20, max_wait=600):
+        """
+        Join MMC master and message parts to logical messages.
+
+        At most max_sets multi-part messages taking max_bytes are buffered (oldest dropped first),
+        incomplete ones for max_wait seconds and none beyond their messageExpiryTime.
+        """
+        self.max_sets  = max_sets
+        self.max_bytes = max_bytes
+        self.max_wait  = max_wait
+
+        self.pending  = OrderedDict()  # key -> _part_set, incomplete, oldest first
+        self.complete = OrderedDict()  # key -> _part_set, emitted, kept for part updates
+        self.versions = {}             # (SID, COID, messageID) -> versionID buffered
+        self.expiries = []             # heap of (expiry, key), stale entries compacted
+        self.size     = 0
+
+        self.counters = dict.fromkeys(('masters', 'parts', 'completed', 'updated', 'repeated', 'superseded',
+                                       'cancelled', 'expired', 'timed_out', 'evicted'), 0)
+
+    def incomplete(self):
+        """ number of multi-part messages waiting for parts """
+        return len(self.pending)
+
+    def add(self, message, SID=None, COID=None, now=None):
+        """
+        Add a decoded application message. Return the message itself if it is no multi-part message,
+        the combined logical message (master first, then the components of all parts) when a
+        multi-part message is complete or updated, or None.
+        """
+        mmc = message.subcomponents[0] if message.subcomponents else None
+        if not isinstance(mmc, (TPEG_MMCMaster_component, TPEG_MMCMessagePart_component)):
+            return message
+
+        if now is None:
+            now = time.time()
+        self.purge(now)
+
+        key = (SID, COID, mmc.messageID, mmc.versionID)
+
+        # a new version replaces all buffered parts of the message
+        version = self.versions.get(key[:3])
+        if version is not None and version != mmc.versionID:
+            self._drop((SID, COID, mmc.messageID, version), 'superseded')
+
+        if isinstance(mmc, TPEG_MMCMaster_component):
+            self.counters['masters'] += 1
+            if mmc.cancelFlag:
+                self._drop(key, 'cancelled')
+                return message
+        else:
+            self.counters['parts'] += 1
+
+        part_set = self.complete.get(key) or self.pending.get(key)
+        if part_set is None:
+            part_set = self.pending[key] = _part_set(now)
+            self.versions[key[:3]] = mmc.versionID
+
+        if isinstance(mmc, TPEG_MMCMaster_component):
+            old = part_set.message
+        else:
+            # updateMode replaceTopLevel: the components of a part replace those received before
+            old = part_set.parts.get(mmc.PartID)
+
+        if old is not None and old.comp_string == message.comp_string:
+            # carousel repetition
+            self.counters['repeated'] += 1
+            return None
+
+        if isinstance(mmc, TPEG_MMCMaster_component):
+            part_set.message = message
+        else:
+            part_set.parts[mmc.PartID] = message
+        part_set.size += message.comp_length - (old.comp_length if old is not None else 0)
+        self.size     += message.comp_length - (old.comp_length if old is not None else 0)
+
+        if mmc.messageExpiryTime and mmc.messageExpiryTime != part_set.expiry:
+            part_set.expiry = mmc.messageExpiryTime
+            heapq.heappush(self.expiries, (part_set.expiry, key))
+            self._compact_expiries()
+
+        result = None
+        if key in self.complete:
+            self.counters['updated'] += 1
+            result = self.combined(part_set)
+        elif part_set.is_complete():
+            self.counters['completed'] += 1
+            del self.pending[key]
+            self.complete[key] = part_set
+            result = self.combined(part_set)
+
+        self.purge(now)
+        return result
+
+    def add_component_frame(self, frame, Registry={}, now=None):
+        """ messages of a parsed component frame, multi-part messages replaced by the combined ones """
+        try:
+            COID = Registry[frame.SID][frame.SCID][2]
+        except (KeyError, IndexError, TypeError):
+            COID = None
+
+        messages = []
+        for message in getattr(frame.frame_continuation, 'components', []):
+            message = self.add(message, frame.SID, COID, now)
+            if message is not None:
+                messages.append(message)
+        return messages
+
+    def combined(self, part_set):
+        # logical message: master, then the top level components of the parts in directory order
+        master = part_set.master()
+        message = copy.copy(part_set.message)
+        message.subcomponents = [master]
+        for partID, partType in master.directory:
+            if partID in part_set.parts:
+                message.subcomponents.extend(part_set.parts[partID].subcomponents[1:])
+        message.comp_string = None
+        message.comp_length = sum(part.comp_length for part in part_set.parts.values())
+        return message
+
+    def purge(self, now):
+        """ drop expired, timed out and (beyond the bounds) oldest multi-part messages """
+        while self.expiries and self.expiries[0][0] <= now:
+            expiry, key = heapq.heappop(self.expiries)
+            part_set = self.pending.get(key) or self.complete.get(key)
+            if part_set is not None and part_set.expiry == expiry:
+                self._drop(key, 'expired')
+
+        while self.pending:
+            key, part_set = next(iter(self.pending.items()))
+            if part_set.arrival + self.max_wait > now:
+                break
+            self._drop(key, 'timed_out')
+
+        while self.size > self.max_bytes or len(self.pending) + len(self.complete) > self.max_sets:
+            # emitted messages go first
+            if self.complete:
+                self._drop(next(iter(self.complete)), None)
+            else:
+                self._drop(next(iter(self.pending)), 'evicted')
+
+    def _drop(self, key, reason):
+        part_set = self.pending.pop(key, None) or self.complete.pop(key, None)
+        if part_set is None:
+            return
+
+        self.size -= part_set.size
+        if self.versions.get(key[:3]) == key[3]:
+            del self.versions[key[:3]]
+        if reason:
+            self.counters[reason] += 1
+        self._compact_expiries()
+
+    def _compact_expiries(self):
+        # entries of dropped sets and replaced expiry times stay in the heap until they are due:
+        # rebuild it from the buffered sets when they make up more than half of it
+        if len(self.expiries) <= 2 * (len(self.pending) + len(self.complete)) + 16:
+            return
+
+        self.expiries = [(part_set.expiry, key)
+                         for sets in (self.pending, self.complete) for key, part_set in sets.items()
+                         if part_set.expiry]
+        heapq.heapify(self.expiries)
+
+
+if __name__ == '__main__':
+    print("TPEG_MMC_multipart")
+    #
+    # check: the messages of the given files, enlarged beyond a service frame, are split
+    # into a master and parts of at most TPEG_MMC_MAX_MESSAGE_SIZE bytes, decoded again
+    # they hold the components of the message and are reassembled to it (in any order)
+    # (run from the TPEG directory: python -m TpegMMC.TPEG_MMC_multipart <files>)
+    from Base.TPEG_string       import TPEG_string
+    from Base.TPEG_sync_frame   import TPEG_sync_frame
+    from Base.TPEG_frame        import TPEG_Transport_Frame
+    from Base.TPEG_applications import TPEG_application_registry
+
+    applications = TPEG_application_registry()
+    for fname in sys.argv[1:]:
+        with open(fname, "rb") as f:
+            TPEGstring = TPEG_string(f.read())
+
+        Registry = {}
+        while TPEGstring.len() > 0:
+            if not TPEG_sync_frame(TPEGstring, AppName="TPEG"):
+                continue
+            frame = TPEG_Transport_Frame(0, ApplicationFramesDict=applications)
+            frame.parse(TPEGstring, Registry)
+
+            for compframe in getattr(frame.serviceframe, 'CompFrames', []):
+                for message in getattr(compframe.frame_continuation, 'components', []):
+                    subcomponents = getattr(message, 'subcomponents', [])
+                    if not subcomponents or not isinstance(subcomponents[0], TPEG_MMCTemplate):
+                        continue
+
+                    repeat = TPEG_MAX_SERVICE_FRAME_PAYLOAD // len(TPEG_to_binary(message)) + 1
+                    large = copy.copy(message)
+                    large.subcomponents = subcomponents[:1] + subcomponents[1:] * repeat
+                    large.comp_string   = None
+                    large.dirty         = True
+                    size = len(TPEG_to_binary(large))
+
+                    # master and part component ids unused by the application message
+                    componentsDict = type(message)(message.id, message.level, componentsDict={}).componentsDict
+                    master_id, part_id = [CompID for CompID in range(1, 256) if CompID not in componentsDict][:2]
+                    componentsDict[master_id] = TPEG_MMCMaster_component
+                    componentsDict[part_id]   = TPEG_MMCMessagePart_component
+
+                    parts = TPEG_MMC_split_message(large, master_id, part_id)
+                    assert size > TPEG_MAX_SERVICE_FRAME_PAYLOAD and len(parts) > 2, (size, len(parts))
+                    assert all(len(part) <= TPEG_MMC_MAX_MESSAGE_SIZE for part in parts), [len(part) for part in parts]
+
+                    # decoded master and parts hold the components of the message in order
+                    decoded = []
+                    for part in parts:
+                        PartString = TPEG_string(part)
+                        decoded.append(type(message)(PartString.IntUnTi(), message.level, componentsDict=componentsDict))
+                        decoded[-1].parse(PartString)
+
+                    master = decoded[0].subcomponents[0]
+                    assert isinstance(master, TPEG_MMCMaster_component) and len(decoded[0].subcomponents) == 1
+                    assert master.directory == [(i, MMC_PART_MANDATORY) for i in range(1, len(parts))], master.directory
+                    assert all(isinstance(part.subcomponents[0], TPEG_MMCMessagePart_component) and
+                               part.subcomponents[0].PartID == i + 1 for i, part in enumerate(decoded[1:]))
+                    assert ([TPEG_to_binary(c) for part in decoded[1:] for c in part.subcomponents[1:]] ==
+                            [TPEG_to_binary(c) for c in large.subcomponents[1:]])
+
+                    # master first or last, the message is complete with its last part;
+                    # at time 0 as the messages of the samples expired long ago
+                    for received in (decoded, decoded[::-1]):
+                        reassembler = TPEG_MMC_reassembler()
+                        results = [reassembler.add(part, compframe.SID, now=0) for part in received]
+                        assert results[:-1] == [None] * (len(results) - 1) and reassembler.incomplete() == 0
+                        assert ([TPEG_to_binary(c) for c in results[-1].subcomponents[1:]] ==
+                                [TPEG_to_binary(c) for c in large.subcomponents[1:]])
+                        assert reassembler.add(received[1], compframe.SID, now=0) is None
+                        assert reassembler.counters['completed'] == 1 and reassembler.counters['repeated'] == 1
+                    print("%s: message of %d bytes split into %s" % (fname, size, [len(part) for part in parts]))
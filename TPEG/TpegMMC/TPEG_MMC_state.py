@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Message state: the messages currently active per (SID, COID, messageID)
+#
+# Decoded messages (e.g. from TPEG_MMC_reassembler) are applied by their MMC: a new
+# version replaces the previous one, cancelFlag removes the message and messages are
+# removed at their messageExpiryTime (min-heap on expiry time). Every change is
+# reported as event (event, key, message) with event added, updated, cancelled or expired.
+#
+# Versions are kept to skip repetitions: of messages with an expiry time until it is due,
+# of messages removed without one (e.g. cancelled) for a bounded time and number.
+#
+import os, sys
+import time
+import heapq
+from collections import OrderedDict
+from types import MappingProxyType
+#
+#
+# add parent directory find when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+#
+from .TPEG_MMC import TPEG_MMCTemplate
+
+# state change events
+MESSAGE_ADDED     = 'added'
+MESSAGE_UPDATED   = 'updated'
+MESSAGE_CANCELLED = 'cancelled'
+MESSAGE_EXPIRED   = 'expired'
+
+#
+#
+def _is_newer(versionID, current):
+    # versionID is IntUnTi and wraps: newer if at most half the range ahead
+    return 0 < (versionID - current) % 256 < 128
+
+#
+# === class TPEG_message_state ==============================================
+#
+class TPEG_message_state(object):
+    def __init__(self, listeners=(), max_retired=4096, max_keep=3600):
+        """
+        Current messages by (SID, COID, messageID).
+
+        listeners are called as listener(event, key, message) for every state change.
+        Versions of messages removed without a pending expiry time are kept for max_keep
+        seconds, at most max_retired of them (oldest dropped first).
+        """
+        self.max_retired = max_retired
+        self.max_keep    = max_keep
+
+        self.messages  = {}             # key -> message
+        self.versions  = {}             # key -> (versionID, expiry) of the latest version (also cancelled ones)
+        self.expiries  = []             # heap of (expiry, key, versionID), stale entries compacted
+        self.retired   = OrderedDict()  # key -> time removed, of versions without pending expiry, oldest first
+        self.listeners = list(listeners)
+
+        self._active = MappingProxyType(self.messages)
+
+    def active(self):
+        """ read only view of the current messages by key """
+        return self._active
+
+    def add(self, message, SID=None, COID=None, now=None):
+        """ apply a decoded application message, return the list of events """
+        mmc = message.subcomponents[0] if message.subcomponents else None
+        if not isinstance(mmc, TPEG_MMCTemplate):
+            return []
+
+        if now is None:
+            now = time.time()
+        events = self.purge(now)
+
+        key = (SID, COID, mmc.messageID)
+        version = self.versions.get(key)
+        if version is not None and not _is_newer(mmc.versionID, version[0]):
+            # same version (repetition) or an outdated one
+            if not (mmc.cancelFlag and version[0] == mmc.versionID and key in self.messages):
+                return events
+
+        expiry = mmc.messageExpiryTime
+        self.versions[key] = (mmc.versionID, expiry)
+        self.retired.pop(key, None)
+
+        if expiry and expiry <= now:
+            # already expired: only the version is taken over
+            self._retire(key, now)
+            if key in self.messages:
+                events.append(self._remove(key, MESSAGE_EXPIRED))
+            return events
+
+        if expiry:
+            heapq.heappush(self.expiries, (expiry, key, mmc.versionID))
+            self._compact_expiries()
+
+        if mmc.cancelFlag:
+            if not expiry:
+                self._retire(key, now)
+            if key in self.messages:
+                events.append(self._remove(key, MESSAGE_CANCELLED))
+            return events
+
+        event = MESSAGE_UPDATED if key in self.messages else MESSAGE_ADDED
+        self.messages[key] = message
+        events.append(self._notify(event, key, message))
+        return events
+
+    def add_component_frame(self, frame, Registry={}, now=None):
+        """ apply all messages of a parsed component frame, return the list of events """
+        try:
+            COID = Registry[frame.SID][frame.SCID][2]
+        except (KeyError, IndexError, TypeError):
+            COID = None
+
+        events = []
+        for message in getattr(frame.frame_continuation, 'components', []):
+            events.extend(self.add(message, frame.SID, COID, now))
+        return events
+
+    def purge(self, now):
+        """ remove the messages expired at now and old retired versions, return the list of events """
+        events = []
+        while self.expiries and self.expiries[0][0] <= now:
+            expiry, key, versionID = heapq.heappop(self.expiries)
+            if self.versions.get(key) != (versionID, expiry):
+                # entry of a replaced version
+                continue
+
+            del self.versions[key]
+            if key in self.messages:
+                events.append(self._remove(key, MESSAGE_EXPIRED))
+
+        while self.retired:
+            key, removed = next(iter(self.retired.items()))
+            if removed + self.max_keep > now:
+                break
+            del self.retired[key]
+            self.versions.pop(key, None)
+        return events
+
+    def _retire(self, key, now):
+        # keep the version of a removed message without pending expiry, oldest dropped first
+        self.retired[key] = now
+        while len(self.retired) > self.max_retired:
+            self.versions.pop(self.retired.popitem(last=False)[0], None)
+
+    def _compact_expiries(self):
+        # entries of replaced versions stay in the heap until they are due:
+        # rebuild it from the versions when they make up more than half of it
+        if len(self.expiries) <= 2 * len(self.versions) + 16:
+            return
+
+        self.expiries = [(expiry, key, versionID) for key, (versionID, expiry) in self.versions.items()
+                         if expiry and key not in self.retired]
+        heapq.heapify(self.expiries)
+
+    def _remove(self, key, event):
+        return self._notify(event, key, self.messages.pop(key))
+
+    def _notify(self, event, key, message):
+        for listener in self.listeners:
+            listener(event, key, message)
+        return (event, key, message)
+
+
+if __name__ == '__main__':
+    print("TPEG_MMC_state")
@@ -35,64 +35,28 @@ import os, sys
 if __name__ == '__main__':
     sys.path.append(os.path.abspath(sys.path[0]+'/..'))
 
-from Base.TPEG_error   import TPEG_log_error
+from Base.TPEG_tables  import TPEG_code_tables
 #
 #
 # add parent directory find when run as main
 if __name__ == '__main__':
     sys.path.append(os.path.abspath(sys.path[0]+'/..'))
 
+# tables compiled at the end of this module
 def MMC_code_to_text(code,TPEG_table,switch_code=None):
-    global _MMC_tables
-    global _MMC_switch_tables
-    #
-    # determine proper table to use
-    if switch_code is not None:
-        table = _MMC_switch_tables.get(TPEG_table,None)
-        if table is not None:
-            table = table.get(switch_code,None)
-    else:
-        table = _MMC_tables.get(TPEG_table,None)
-
-    if table is not None:
-        error_string = "Invalid/Unknown Code in table %s"%TPEG_table
-
-        if switch_code is not None:
-            error_string += ", switched with code "+str(switch_code)
-
-        text = str(code)+": "+table.get(code,error_string)
-    else:
-        text = str(code)+": Invalid/Unknown MMC table %s"%TPEG_table
-        error_string = "==> MMC: unknown table  %s"%TPEG_table
-
-        if switch_code is not None:
-            error_string += ", switched with code "+str(switch_code)
-            text         += ", switched with code "+str(switch_code)
-
-        TPEG_log_error(error_string)
-
-    return text
+    return _MMC_compiled.code_to_text(code,TPEG_table,switch_code)
 
 # return list of available codes
 def MMC_code_list(TPEG_table,switch_code=None):
-    global _MMC_tables
-    global _MMC_switch_tables
-
-    code_list = None
-    #
-    # determine proper table to use
-    if switch_code is not None:
-        table = _MMC_switch_tables.get(TPEG_table,None)
-        if table is not None:
-            table = table.get(switch_code,None)
-    else:
-        table = _MMC_tables.get(TPEG_table,None)
+    return _MMC_compiled.code_list(TPEG_table,switch_code)
 
-    if table is not None:
-        code_list = list(table.keys())
-        code_list.sort()
+# return code of a text, default if unknown
+def MMC_text_to_code(text,TPEG_table,switch_code=None,default=None):
+    return _MMC_compiled.text_to_code(text,TPEG_table,switch_code,default)
 
-    return code_list
+# return compiled table (TPEG_code_table) for bulk lookups, None if unknown
+def MMC_table(TPEG_table,switch_code=None):
+    return _MMC_compiled.table(TPEG_table,switch_code)
 
 MMC_001={
 	1	:"mandatory",
@@ -116,3 +80,7 @@ _MMC_tables = {
 #
 # no switching tables
 _MMC_switch_tables = {}
+
+#
+# compiled lookup structures of all MMC tables
+_MMC_compiled = TPEG_code_tables("MMC", _MMC_tables, _MMC_switch_tables)
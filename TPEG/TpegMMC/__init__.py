@@ -29,4 +29,6 @@
 
 __all__ = [
     "TPEG_MMC",
+    "TPEG_MMC_multipart",
+    "TPEG_MMC_state",
     "TPEG_MMC_tables"]
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022-2024 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Generic JSON conversion of decoded TPEG trees, built on the TPEG visitor
+#
+# Every decoded node (SNI component, application component, data structure)
+# is converted in a single visitor pass. Each top-level component of a
+# component frame (i.e. one TPEG message) is emitted as one JSON object.
+#
+import os, sys, json
+#
+#
+# add parent directory when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+from datetime import datetime
+#
+from .TPEGvisitor import TPEGvisitor
+#
+from Base.TPEG_frame              import TPEG_ServiceFrame1
+from Base.TPEG_component_frame    import TPEG_component_frame, TPEG_comp_frame_continuation
+from Base.TPEG_SNI_base_component import TPEG_SNI_base_component
+from Base.TPEG_component          import TPEG_component, TPEG_datastructure
+from Base.TPEG_string             import TPEG_localised_text
+
+
+#
+# ---- value converters, cached per value type ---------------------------------------------
+#
+def _identity(value):
+    return value
+
+
+def _bytes_to_json(value):
+    return bytes(value).hex()
+
+
+def _list_to_json(value):
+    return [_value_to_json(item) for item in value]
+
+
+def _dict_to_json(value):
+    return {str(key): _value_to_json(item) for key, item in value.items()}
+
+
+def _localised_text_to_json(value):
+    return {"language": value.language, "text": str(value)}
+
+
+_value_converters = {
+    type(None):          _identity,
+    bool:                _identity,
+    int:                 _identity,
+    float:               _identity,
+    str:                 _identity,
+    TPEG_localised_text: _localised_text_to_json,
+    datetime:            datetime.isoformat,
+    bytes:               _bytes_to_json,
+    bytearray:           _bytes_to_json,
+    list:                _list_to_json,
+    tuple:               _list_to_json,
+    dict:                _dict_to_json,
+}
+
+
+def _value_to_json(value):
+    """ convert an attribute value to a JSON serialisable value """
+    typ = type(value)
+    converter = _value_converters.get(typ)
+    if converter is None:
+        # resolve once per type via the class hierarchy, fall back to str()
+        converter = str
+        for base in typ.__mro__[1:]:
+            if base in _value_converters:
+                converter = _value_converters[base]
+                break
+        _value_converters[typ] = converter
+
+    return converter(value)
+
+
+#
+# ---- node converters, cached per node class ----------------------------------------------
+#
+_COMPLEX = object()   # placeholder for a data structure in the attribute list
+
+
+def _make_node_converter(cls):
+    """ create the converter for nodes of class cls """
+    with_components = issubclass(cls, (TPEG_component, TPEG_SNI_base_component))
+
+    def convert(node):
+        entries   = []
+        n_complex = 0
+        for key, value in node.attributes:
+            if key == '_complex_':
+                entries.append((value.name, _COMPLEX))
+                n_complex += 1
+            else:
+                entries.append((key, _value_to_json(value)))
+
+        if with_components:
+            result = {"name": node.name, "type": node.type, "id": node.id, "attributes": None, "components": []}
+        else:
+            result = {"name": node.name, "type": node.type, "attributes": None}
+
+        return result, entries, n_complex
+
+    return convert
+
+
+_node_converters = {}
+
+
+def _node_converter(cls):
+    converter = _node_converters.get(cls)
+    if converter is None:
+        converter = _node_converters[cls] = _make_node_converter(cls)
+    return converter
+
+
+def _add_attribute(attributes, key, value):
+    # repeated keys are collected in a list rather than overwritten
+    if key in attributes:
+        previous = attributes[key]
+        if type(previous) is _Repeated:
+            previous.append(value)
+        else:
+            attributes[key] = _Repeated([previous, value])
+    else:
+        attributes[key] = value
+
+
+class _Repeated(list):
+    pass
+
+
+#
+# ---- converter ---------------------------------------------------------------------------
+#
+class TPEG_JSON_converter(object):
+    """
+    Convert decoded TPEG frames to one JSON compatible dict per TPEG message.
+
+    The conversion is done in a single pass of the TPEGvisitor: pre handlers open
+    a node, post handlers close it and attach it to its parent. When a top-level
+    component of a component frame is closed, the message callback is invoked with
+    a record containing the frame context and the converted message.
+    """
+    def __init__(self, message_callback):
+        self.message_callback = message_callback
+
+        self.SID         = None
+        self.EncID       = None
+        self.SCID        = None
+        self.application = None
+        self._stack      = []
+
+        node_pre  = self._node_pre
+        node_post = self._node_post
+
+        pre_handlers = {
+            TPEG_ServiceFrame1:           self._service_frame_pre,
+            TPEG_component_frame:         self._component_frame_pre,
+            TPEG_comp_frame_continuation: self._continuation_pre,
+            TPEG_SNI_base_component:      node_pre,
+            TPEG_component:               node_pre,
+            TPEG_datastructure:           node_pre,
+        }
+        post_handlers = {
+            TPEG_SNI_base_component:      node_post,
+            TPEG_component:               node_post,
+            TPEG_datastructure:           node_post,
+        }
+        self.visitor = TPEGvisitor(pre_handlers=pre_handlers, post_handlers=post_handlers)
+
+    def convert(self, target):
+        """ convert a transport frame (or any sub tree of it) """
+        self._stack = []
+        self.visitor.visit(target)
+
+    #
+    # frame context
+    def _service_frame_pre(self, target):
+        self.SID   = target.SID
+        self.EncID = target.EncID
+
+    def _component_frame_pre(self, target):
+        self.SCID        = target.SCID
+        self.application = None
+
+    def _continuation_pre(self, target):
+        self.application = target.name
+
+    #
+    # components and data structures
+    def _node_pre(self, target):
+        result, entries, n_complex = _node_converter(type(target))(target)
+        self._stack.append((result, entries, n_complex, []))
+
+    def _node_post(self, target):
+        result, entries, n_complex, datastructures = self._stack.pop()
+
+        attributes = {}
+        ds_index   = 0
+        for key, value in entries:
+            if value is _COMPLEX:
+                value = datastructures[ds_index]
+                ds_index += 1
+            _add_attribute(attributes, key, value)
+        result["attributes"] = attributes
+
+        if self._stack:
+            # the visitor visits the '_complex_' attributes before the sub components
+            parent = self._stack[-1]
+            if len(parent[3]) < parent[2]:
+                parent[3].append(result)
+            else:
+                parent[0]["components"].append(result)
+        else:
+            self.message_callback({"SID":         self.SID,
+                                   "EncID":       self.EncID,
+                                   "SCID":        self.SCID,
+                                   "application": self.application,
+                                   "message":     result})
+
+
+def TPEG_to_JSON(target):
+    """
+    Convert a decoded transport frame (or component) to a list of message records.
+
+    Args:
+        target: The decoded TPEG transport frame, component frame or component.
+
+    Returns:
+        A list with one dict per TPEG message.
+    """
+    records = []
+    TPEG_JSON_converter(records.append).convert(target)
+    return records
+
+
+#
+# ---- streaming NDJSON exporter ----------------------------------------------------------
+#
+class TPEG_NDJSON_exporter(object):
+    """
+    Write decoded TPEG messages as newline delimited JSON to a text stream.
+
+    Messages are written as soon as a frame is exported; buffering is left to the
+    stream, see TPEG_NDJSON_stream().
+    """
+    def __init__(self, stream):
+        self.stream   = stream
+        self.count    = 0
+        self._write   = stream.write
+        self._encode  = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+        self._convert = TPEG_JSON_converter(self._write_record)
+
+    def _write_record(self, record):
+        self._write(self._encode(record))
+        self._write('\n')
+        self.count += 1
+
+    def export_frame(self, frame):
+        """ write all messages of a decoded transport frame, return number of messages written """
+        count = self.count
+        self._convert.convert(frame)
+        return self.count - count
+
+    def flush(self):
+        self.stream.flush()
+
+
+def TPEG_NDJSON_stream(fileobj=None, buffer_size=1 << 20):
+    """
+    Open a large-buffered UTF-8 text stream on a file descriptor (default: stdout).
+    """
+    if fileobj is None:
+        fileobj = sys.stdout
+        fileobj.flush()
+
+    return open(fileobj.fileno(), 'w', buffering=buffer_size, encoding='utf-8', closefd=False)
+
+
+if __name__=='__main__':
+    print("TPEGjson")
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022-2024 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Path queries over decoded TPEG trees
+#
+# A path selects nodes (components, SNI components, data structures) step by step from the
+# messages of a frame, e.g.
+#
+#   EAW/AlertInformation/LocalisedAlertTextInfo@headline
+#   EAW/*/LRC/LRC_OLR/OLR_PolygonLR/coordinatePath
+#   **/OLR_AbsoluteGeoCoordinate@longitude
+#
+#   name   child nodes with type name, type ending in _name (AlertInformation matches
+#          EAW_AlertInformation) or with name name, also of list items (coordinatePath
+#          matches coordinatePath_0, coordinatePath_1, ...)
+#   *      all child nodes
+#   **     the nodes and all their descendants
+#   @key   values of attribute key (also of list items key_0, key_1, ...), @* all
+#          (key, value) pairs; only at the end of a path
+#
+# Children of a node are its data structures (_complex_ attributes) followed by its sub
+# components. The first step selects from the messages of the target: the components of a
+# transport frame, component frame or continuation, the nodes of a list, or the node itself.
+# Anything else (service frames without components, other objects) has no messages.
+#
+# Steps only descend, so a path starts at the message level: on EAW messages
+#
+#   */LRC/LRC_OLR/OLR_PolygonLR/coordinatePath
+#
+# selects nothing, the LRC of the affected area is a child of AlertInformation, and
+#
+#   EAW/*/LRC/LRC_OLR/OLR_PolygonLR/coordinatePath
+#
+# selects the polygon points.
+#
+# Paths are compiled once into a chain of step functions. Children are found by class
+# (resolved once per class) and nodes with many children get an index by type.
+#
+import os, sys
+import re
+#
+#
+# add parent directory when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+#
+from Base.TPEG_frame              import TPEG_Transport_Frame, TPEG_ServiceFrame0, TPEG_ServiceFrame1
+from Base.TPEG_component_frame    import TPEG_component_frame, TPEG_comp_frame_continuation
+from Base.TPEG_SNI_base_component import TPEG_SNI_base_component
+from Base.TPEG_component          import TPEG_component_base
+
+# nodes with more children get an index by type
+_INDEX_MIN_CHILDREN = 8
+
+# list item suffix of names and attribute keys
+_item = re.compile(r'_\d+$')
+
+#
+# ---- roots and children, resolved once per class -------------------------------------------
+#
+def _node_children(node):
+    children = [value for key, value in node.attributes if key == '_complex_']
+    children.extend(getattr(node, 'subcomponents', ()))
+    return children
+
+def _no_children(node):
+    return []
+
+def _roots_transport_frame(target):
+    return _roots(target.serviceframe) if getattr(target, 'serviceframe', None) is not None else []
+
+def _roots_service_frame(target):
+    return [root for frame in target.CompFrames for root in _roots(frame)]
+
+def _roots_component_frame(target):
+    return _roots(target.frame_continuation) if target.frame_continuation else []
+
+def _roots_continuation(target):
+    return list(target.components)
+
+def _roots_list(target):
+    return [root for item in target for root in _roots(item)]
+
+def _roots_node(target):
+    return [target]
+
+def _roots_none(target):
+    return []
+
+class _Roots(object):
+    """ virtual parent of the roots, the first step selects from its children """
+    attributes = ()
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+def _roots_children(node):
+    return node.nodes
+
+_children_functions = {}
+_root_functions     = {}
+
+_children_by_class = (
+    (TPEG_component_base,     _node_children),
+    (TPEG_SNI_base_component, _node_children),
+    (_Roots,                  _roots_children),
+)
+_roots_by_class = (
+    (TPEG_Transport_Frame,         _roots_transport_frame),
+    (TPEG_ServiceFrame0,           _roots_none),
+    (TPEG_ServiceFrame1,           _roots_service_frame),
+    (TPEG_component_frame,         _roots_component_frame),
+    (TPEG_comp_frame_continuation, _roots_continuation),
+    (list,                         _roots_list),
+    (tuple,                        _roots_list),
+    (TPEG_component_base,          _roots_node),
+    (TPEG_SNI_base_component,      _roots_node),
+)
+
+def _resolve(functions, by_class, cls, default):
+    function = default
+    for base, candidate in by_class:
+        if issubclass(cls, base):
+            function = candidate
+            break
+    functions[cls] = function
+    return function
+
+def _children(node):
+    cls = type(node)
+    function = _children_functions.get(cls) or _resolve(_children_functions, _children_by_class, cls, _no_children)
+    return function(node)
+
+def _roots(target):
+    cls = type(target)
+    function = _root_functions.get(cls) or _resolve(_root_functions, _roots_by_class, cls, _roots_none)
+    return function(target)
+
+def _children_index(node, children):
+    # type -> children, kept on the node while its attributes and sub components are unchanged
+    key = (len(node.attributes), len(getattr(node, 'subcomponents', ())), len(children))
+    cached = node.__dict__.get('_query_index')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    index = {}
+    for child in children:
+        index.setdefault(child.type, []).append(child)
+    node.__dict__['_query_index'] = (key, index)
+    return index
+
+def _descendants(node, out):
+    out.append(node)
+    for child in _children(node):
+        _descendants(child, out)
+
+#
+# ---- steps ---------------------------------------------------------------------------------
+#
+class _Name(object):
+    """ node test of a name step, results cached per type and per name """
+
+    def __init__(self, name):
+        self.name   = name
+        self.suffix = '_' + name
+        self.types  = {}
+        self.names  = {}
+
+    def by_type(self, node_type):
+        match = self.types.get(node_type)
+        if match is None:
+            match = self.types[node_type] = node_type == self.name or node_type.endswith(self.suffix)
+        return match
+
+    def by_name(self, node_name):
+        match = self.names.get(node_name)
+        if match is None:
+            match = self.names[node_name] = node_name == self.name or _item.sub('', node_name) == self.name
+        return match
+
+    def select(self, node, out):
+        children = _children(node)
+        if len(children) < _INDEX_MIN_CHILDREN:
+            by_type = self.by_type
+            by_name = self.by_name
+            out.extend(child for child in children if by_type(child.type) or by_name(child.name))
+            return
+
+        # in document order: groups of matching types are taken at once, others tested by name
+        index = _children_index(node, children)
+        if all(self.by_type(node_type) for node_type in index):
+            out.extend(children)
+        elif not any(self.by_type(node_type) for node_type in index):
+            out.extend(child for child in children if self.by_name(child.name))
+        else:
+            out.extend(child for child in children if self.by_type(child.type) or self.by_name(child.name))
+
+def _name_step(name):
+    test = _Name(name)
+
+    def step(nodes):
+        out = []
+        for node in nodes:
+            test.select(node, out)
+        return out
+    return step
+
+def _any_step(nodes):
+    out = []
+    for node in nodes:
+        out.extend(_children(node))
+    return out
+
+def _descendant_step(nodes):
+    out = []
+    for node in nodes:
+        _descendants(node, out)
+    return out
+
+def _attribute_step(key):
+    if key == '*':
+        def step(nodes):
+            return [(k, value) for node in nodes for k, value in node.attributes if k != '_complex_']
+        return step
+
+    keys = {}
+
+    def matches(k):
+        match = keys.get(k)
+        if match is None:
+            match = keys[k] = k == key or (k != '_complex_' and _item.sub('', k) == key)
+        return match
+
+    def step(nodes):
+        return [value for node in nodes for k, value in node.attributes if matches(k)]
+    return step
+
+#
+# === class TPEG_query ===
+#
+class TPEG_query(object):
+    """ compiled path query, see the description at the top of this module """
+
+    def __init__(self, expression):
+        self.expression = expression
+
+        path, at, key = expression.partition('@')
+        if at and (not key or '/' in key):
+            raise ValueError("TPEG query %r: attribute @key expected at the end" % expression)
+
+        self.steps = []
+        for name in path.split('/') if path else []:
+            if name == '**':
+                self.steps.append(_descendant_step)
+            elif name == '*':
+                self.steps.append(_any_step)
+            elif name and re.match(r'^[A-Za-z0-9_]+$', name):
+                self.steps.append(_name_step(name))
+            else:
+                raise ValueError("TPEG query %r: invalid step %r" % (expression, name))
+
+        # a path of only @key selects attributes of the roots themselves
+        self.on_roots = not self.steps
+        if at:
+            self.steps.append(_attribute_step(key))
+
+        # '**' as last step also yields the virtual parent of the roots
+        self.descendants = self.steps[-1] is _descendant_step if self.steps else False
+
+    def all(self, target):
+        """ list of the selected nodes or attribute values """
+        nodes = _roots(target)
+        if not self.on_roots:
+            nodes = [_Roots(nodes)]
+
+        for step in self.steps:
+            if not nodes:
+                return []
+            nodes = step(nodes)
+
+        if self.descendants:
+            nodes = [node for node in nodes if type(node) is not _Roots]
+        return nodes
+
+    __call__ = all
+
+    def first(self, target, default=None):
+        """ first selected node or attribute value, default if none """
+        result = self.all(target)
+        return result[0] if result else default
+
+#
+# compiled queries by expression
+_queries = {}
+
+def TPEG_select(expression, target):
+    """ nodes or attribute values selected by expression from target, queries are compiled once """
+    query = _queries.get(expression)
+    if query is None:
+        query = _queries[expression] = TPEG_query(expression)
+    return query.all(target)
+
+def TPEG_select_first(expression, target, default=None):
+    """ first node or attribute value selected by expression from target, default if none """
+    result = TPEG_select(expression, target)
+    return result[0] if result else default
+
+
+if __name__ == '__main__':
+    print("TPEGquery")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022-2024 TISA ASBL
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#   Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   Neither the name of the copyright holder nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; # OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Time index of decoded messages: which messages are valid at a time
+#
+# The validity of a message runs from the earliest start (TEC Event startTime, EAW
+# CapTimeInfo effective/onset) to the latest end (TEC stopTime, EAW expires), cut at the
+# MMC messageExpiryTime; open ends are unbounded. Intervals are kept in time buckets of
+# increasing size (hour, day, 32 days). Intervals open at one end are kept sorted by their
+# finite end, as are those longer than max_buckets of the largest buckets; only intervals
+# open at both ends are checked on every query. All interval ends are kept in one sorted
+# list for "next change" queries.
+#
+import os, sys
+import bisect
+#
+#
+# add parent directory when run as main
+if __name__ == '__main__':
+    sys.path.append(os.path.abspath(sys.path[0]+'/..'))
+
+# bucket sizes (s)
+_bucket_sizes = (3600, 86400, 32 * 86400)
+
+_INF = float('inf')
+
+#
+#
+def TPEG_message_interval(message):
+    """ (start, end) of the validity of a decoded message as timestamps, -inf/inf if open """
+    starts, ends, expiries = [], [], []
+    pending = [message]
+    while pending:
+        node = pending.pop()
+        if node.type == 'TEC_Event':
+            starts.append(node.startTime)
+            ends.append(node.stopTime)
+        elif node.type == 'EAW_CapTimeInfo':
+            starts.extend((node.effective, node.onset))
+            ends.append(node.expires)
+        elif node.type.startswith('MMC') and getattr(node, 'messageExpiryTime', 0):
+            expiries.append(node.messageExpiryTime)
+
+        pending.extend([value for [key, value] in getattr(node, 'attributes', []) if key == '_complex_'])
+        pending.extend(getattr(node, 'subcomponents', []))
+
+    starts = [start for start in starts if start is not None]
+    ends = [end for end in ends if end is not None]
+    start = min(starts) if starts else -_INF
+    end = max(ends) if ends else _INF
+    if expiries:
+        end = min(end, min(expiries))
+    return start, end
+
+#
+# keys sorted by a time, for intervals with one open end
+#
+class _sorted_keys(object):
+    def __init__(self):
+        self.times = []
+        self.keys  = []
+
+    def add(self, time, key):
+        i = bisect.bisect_right(self.times, time)
+        self.times.insert(i, time)
+        self.keys.insert(i, key)
+
+    def remove(self, time, key):
+        i = bisect.bisect_left(self.times, time)
+        while self.keys[i] != key:
+            i += 1
+        del self.times[i]
+        del self.keys[i]
+
+    def after(self, time):
+        """ keys with a time later than time """
+        return self.keys[bisect.bisect_right(self.times, time):]
+
+    def until(self, time):
+        """ keys with a time up to time """
+        return self.keys[:bisect.bisect_right(self.times, time)]
+
+#
+# === class TPEG_time_index =================================================
+#
+class TPEG_time_index(object):
+    def __init__(self, max_buckets=64):
+        """ index of the intervals [start, end) of messages """
+        self.max_buckets = max_buckets
+
+        self.buckets = {}        # (level, bucket) -> set of keys
+        self.unbounded = set()   # keys of intervals open at both ends
+        self.by_end = _sorted_keys()    # keys of intervals open at the start or very long, by end
+        self.by_start = _sorted_keys()  # keys of intervals open at the end, by start
+        self.ends = []           # sorted interval ends (start and end times)
+        self.entries = {}        # key -> (message, start, end, buckets)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _bucket_range(self, start, end, level):
+        size = _bucket_sizes[level]
+        return int(start // size), int(end // size)
+
+    def add(self, key, message, interval=None):
+        """ index message under key by interval (default: TPEG_message_interval(message)) """
+        self.remove(key)
+        start, end = interval if interval is not None else TPEG_message_interval(message)
+
+        buckets = []
+        if start == -_INF and end == _INF:
+            self.unbounded.add(key)
+        elif end == _INF:
+            self.by_start.add(start, key)
+        elif start == -_INF:
+            self.by_end.add(end, key)
+        else:
+            # finest level with at most max_buckets buckets
+            for level in range(len(_bucket_sizes)):
+                first, last = self._bucket_range(start, end, level)
+                if last - first < self.max_buckets:
+                    buckets = [(level, bucket) for bucket in range(first, last + 1)]
+                    break
+            else:
+                self.by_end.add(end, key)
+
+        for bucket in buckets:
+            self.buckets.setdefault(bucket, set()).add(key)
+        for time in (start, end):
+            if -_INF < time < _INF:
+                bisect.insort(self.ends, time)
+        self.entries[key] = (message, start, end, buckets)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        message, start, end, buckets = entry
+        for bucket in buckets:
+            keys = self.buckets[bucket]
+            keys.discard(key)
+            if not keys:
+                del self.buckets[bucket]
+        if start == -_INF and end == _INF:
+            self.unbounded.discard(key)
+        elif end == _INF:
+            self.by_start.remove(start, key)
+        elif not buckets:
+            self.by_end.remove(end, key)
+        for time in (start, end):
+            if -_INF < time < _INF:
+                del self.ends[bisect.bisect_left(self.ends, time)]
+
+    def update(self, event, key, message):
+        """ listener for TPEG_message_state """
+        if event in ('added', 'updated'):
+            self.add(key, message)
+        else:
+            self.remove(key)
+
+    def _candidates(self, start, end):
+        keys = set(self.unbounded)
+        keys.update(self.by_end.after(start))
+        keys.update(self.by_start.until(end))
+        for level in range(len(_bucket_sizes)):
+            first, last = self._bucket_range(max(start, self.ends[0]), min(end, self.ends[-1]), level) \
+                if self.ends else (0, -1)
+            if last - first + 1 <= len(self.buckets):
+                for bucket in range(first, last + 1):
+                    keys.update(self.buckets.get((level, bucket), ()))
+            else:
+                for (l, bucket), bucket_keys in self.buckets.items():
+                    if l == level and first <= bucket <= last:
+                        keys.update(bucket_keys)
+        return keys
+
+    def overlapping(self, start, end):
+        """ list of (key, message) valid at some time in [start, end) """
+        result = []
+        for key in self._candidates(start, end):
+            message, s, e, buckets = self.entries[key]
+            if s < end and start < e:
+                result.append((key, message))
+        return result
+
+    def active(self, time):
+        """ list of (key, message) valid at time """
+        result = []
+        for key in self._candidates(time, time):
+            message, start, end, buckets = self.entries[key]
+            if start <= time < end:
+                result.append((key, message))
+        return result
+
+    def next_change(self, time):
+        """ first start or end of an interval after time, None if there is none """
+        i = bisect.bisect_right(self.ends, time)
+        return self.ends[i] if i < len(self.ends) else None
+
+
+if __name__ == '__main__':
+    print("TPEGtimeindex")
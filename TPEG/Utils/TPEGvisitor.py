@@ -29,6 +29,9 @@
 #
 # General for TPEG transport frames
 #
+# The handlers and the children of a node are resolved once per concrete node class.
+# The tree is walked with an explicit stack, so deep structures (e.g. GLR) do not hit
+# the recursion limit.
 #
 import os, sys
 #
@@ -39,10 +42,6 @@ if __name__ == '__main__':
 
 #
 #
-from . import visitor
-#
-import Base
-#
 # import TPEG frame types
 from Base.TPEG_frame              import TPEG_Transport_Frame, TPEG_ServiceFrame0, TPEG_ServiceFrame1
 
@@ -51,170 +50,142 @@ from Base.TPEG_SNI_base_component import TPEG_SNI_base_component
 from Base.TPEG_component          import TPEG_component, TPEG_datastructure
 #
 #
-# Now define TPEG Visitor Class
+# children of the visited node types, in visiting order
 #
-class TPEGvisitor(object):
-    def __init__(self, pre_handlers={}, post_handlers={}, default_handler=None):
-        # install optional pre and post handlers
-       self.pre_handlers     = pre_handlers
-       self.post_handlers    = post_handlers
-       self.default_handler  = default_handler
-
-
-    @visitor.on('target')
-    def visit(self, target):
-        """
-        This is the generic vist method that initializes the
-        dynamic dispatcher.
-        """
-        pass
-    #
-    #
-    # TPEG Transport frame
-    @visitor.when(TPEG_Transport_Frame)
-    def visit(self, target):
-        """
-        Visit method for a TPEG Transport Frames
-        """
-        #print "TPEG Transport frame:", target.name, target.type
-        if self.pre_handlers.get(TPEG_Transport_Frame,False):
-            self.pre_handlers.get(TPEG_Transport_Frame)(target)
-
-        self.visit(target.serviceframe)
-
-        if self.post_handlers.get(TPEG_Transport_Frame,False):
-            self.post_handlers.get(TPEG_Transport_Frame)(target)
-
-
-
-    #
-    # TPEG service frame type 0
-    @visitor.when(TPEG_ServiceFrame0)
-    def visit(self, target):
-        """
-        Visit method for a TPEG Service Frame of type 0
-        """
-        #print "TPEG_ServiceFrame0", target.name, target.type
-        if self.pre_handlers.get(TPEG_ServiceFrame0,False):
-            self.pre_handlers.get(TPEG_ServiceFrame0)(target)
-
-        if self.post_handlers.get(TPEG_ServiceFrame0,False):
-            self.post_handlers.get(TPEG_ServiceFrame0)(target)
-
-    #
-    # TPEG service frame type 1
-    @visitor.when(TPEG_ServiceFrame1)
-    def visit(self, target):
-         """
-         Visit method for a TPEG Service Frame of type 1
-         """
-         #print "TPEG_ServiceFrame1", target.type, target.name
-         if self.pre_handlers.get(TPEG_ServiceFrame1,False):
-            self.pre_handlers.get(TPEG_ServiceFrame1)(target)
-
-         for compFrame in target.CompFrames:
-             self.visit(compFrame)
-
-         if self.post_handlers.get(TPEG_ServiceFrame1,False):
-            self.post_handlers.get(TPEG_ServiceFrame1)(target)
-
-    #
-    # TPEG component frame
-    @visitor.when(TPEG_component_frame)
-    def visit(self, target):
-         """
-         Visit method for a TPEG component frame
-         """
-         #print "TPEG_component_frame", target.type, target.name
-         if self.pre_handlers.get(TPEG_component_frame,False):
-            self.pre_handlers.get(TPEG_component_frame)(target)
-
-         if target.frame_continuation:
-             self.visit(target.frame_continuation)
-
-         if self.post_handlers.get(TPEG_component_frame,False):
-            self.post_handlers.get(TPEG_component_frame)(target)
-
-    #
-    # TPEG component frame continuation
-    @visitor.when(TPEG_comp_frame_continuation)
-    def visit(self, target):
-         """
-         Visit method for a TPEG component frame continuation
-         """
-         #print "TPEG_comp_frame_continuation", target.type, arget.name
-         if self.pre_handlers.get(TPEG_comp_frame_continuation,False):
-            self.pre_handlers.get(TPEG_comp_frame_continuation)(target)
+def _no_children(target):
+    return ()
 
-         for comp in target.components:
-             self.visit(comp)
+def _transport_frame_children(target):
+    return (target.serviceframe,)
 
-         if self.post_handlers.get(TPEG_comp_frame_continuation,False):
-            self.post_handlers.get(TPEG_comp_frame_continuation)(target)
+def _service_frame_children(target):
+    return target.CompFrames
 
+def _component_frame_children(target):
+    return (target.frame_continuation,) if target.frame_continuation else ()
 
+def _continuation_children(target):
+    return target.components
 
+def _SNI_component_children(target):
+    return target.subcomponents
 
-    @visitor.when(TPEG_SNI_base_component)
-    def visit(self, target):
-         """
-         Visit method for a TPEG SNI component
-         """
-         #print "TPEG_SNI_component", target.type, target.name
-         if self.pre_handlers.get(TPEG_SNI_base_component,False):
-            self.pre_handlers.get(TPEG_SNI_base_component)(target)
-
-         for comp in target.subcomponents:
-            self.visit(comp)
+def _component_children(target):
+    # datastructures are visited before the sub components
+    children = target.datastructures()
+    children.extend(target.subcomponents)
+    return children
 
-         if self.post_handlers.get(TPEG_SNI_base_component,False):
-            self.post_handlers.get(TPEG_SNI_base_component)(target)
+def _datastructure_children(target):
+    return target.datastructures()
 
+#
+# visited node type -> children, object is the fallback for anything else
+_CHILDREN = {
+    TPEG_Transport_Frame:         _transport_frame_children,
+    TPEG_ServiceFrame0:           _no_children,
+    TPEG_ServiceFrame1:           _service_frame_children,
+    TPEG_component_frame:         _component_frame_children,
+    TPEG_comp_frame_continuation: _continuation_children,
+    TPEG_SNI_base_component:      _SNI_component_children,
+    TPEG_component:               _component_children,
+    TPEG_datastructure:           _datastructure_children,
+    object:                       _no_children,
+}
 
-    @visitor.when(TPEG_component)
-    def visit(self, target):
-         """
-         Visit method for a TPEG component
-         """
-         #print "TPEG_component", target.type, target.name
-         if self.pre_handlers.get(TPEG_component,False):
-            self.pre_handlers.get(TPEG_component)(target)
+# concrete class -> visited node type, the most specific one in the class hierarchy
+_node_types = {}
 
-         # visit datastructures if applicable
-         for ds in target.datastructures():
-             self.visit(ds)
+def _node_type(cls):
+    node_type = _node_types.get(cls)
+    if node_type is None:
+        node_type = _node_types[cls] = next(base for base in cls.__mro__ if base in _CHILDREN)
+    return node_type
 
-         for comp in target.subcomponents:
-             self.visit(comp)
+#
+#
+# walk a TPEG tree in visiting order
+#
+def TPEG_walk(target):
+    """
+    Generator of (node, depth, path) for target and all nodes below it, in visiting order.
 
-         if self.post_handlers.get(TPEG_component,False):
-            self.post_handlers.get(TPEG_component)(target)
+    depth is 0 for target, path is the tuple of the names from target down to the node.
+    """
+    stack = [(target, 0, ())]
+    pop   = stack.pop
+    push  = stack.extend
+    while stack:
+        node, depth, path = pop()
+        path = path + (getattr(node, 'name', None),)
+        yield node, depth, path
 
-    @visitor.when(TPEG_datastructure)
-    def visit(self, target):
-         """
-         Visit method for a TPEG datastructure
-         """
-         #print "TPEG_datastructure", target.type, target.name
-         if self.pre_handlers.get(TPEG_datastructure,False):
-            self.pre_handlers.get(TPEG_datastructure)(target)
+        children = _CHILDREN[_node_type(type(node))](node)
+        if children:
+            depth += 1
+            push([(child, depth, path) for child in reversed(children)])
+#
+#
+# Now define TPEG Visitor Class
+#
+class TPEGvisitor(object):
+    def __init__(self, pre_handlers={}, post_handlers={}, default_handler=None):
+        # install optional pre and post handlers, keyed by the visited node types above
+        self.pre_handlers     = pre_handlers
+        self.post_handlers    = post_handlers
+        self.default_handler  = default_handler
+        # concrete class -> (pre handler, children, post handler)
+        self._plans           = {}
 
-         # visit sub datastructures if applicable
-         for ds in target.datastructures():
-             self.visit(ds)
 
-         if self.post_handlers.get(TPEG_datastructure,False):
-            self.post_handlers.get(TPEG_datastructure)(target)
+    def _plan(self, cls):
+        """
+        Resolve the handlers and children of a concrete class, once
+        """
+        node_type = _node_type(cls)
+        if node_type is object:
+            # fallback if nothing else matched
+            plan = (self.default_handler, _no_children, None)
+        else:
+            plan = (self.pre_handlers.get(node_type) or None,
+                    _CHILDREN[node_type],
+                    self.post_handlers.get(node_type) or None)
+        self._plans[cls] = plan
+        return plan
 
 
-    @visitor.when(object)
     def visit(self, target):
-        """ fallback visitor """
-        #fallback if nothing else matched
-        #print "Default: Visited",target
-        if self.default_handler is not None:
-            self.default_handler(target)
-        pass
+        """
+        Visit target and all nodes below it: pre handler, children, post handler
+        """
+        plans = self._plans
+        # entries (None, node) to visit a node, (post handler, node) to close it
+        stack = [(None, target)]
+        pop   = stack.pop
+        push  = stack.append
+        while stack:
+            post, node = pop()
+            if post is not None:
+                post(node)
+                continue
+
+            cls = type(node)
+            pre, children, post = plans.get(cls) or self._plan(cls)
+            if pre is not None:
+                pre(node)
+            if post is not None:
+                push((post, node))
+
+            children = children(node)
+            if children:
+                stack.extend([(None, child) for child in reversed(children)])
+
+
+    def walk(self, target):
+        """
+        Generator of (node, depth, path), see TPEG_walk
+        """
+        return TPEG_walk(target)
 
 
 
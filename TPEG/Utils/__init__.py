@@ -28,5 +28,8 @@
 # init file for Utils - TPEG utility structures
 
 __all__ = ["TPEGvisitor",
-           "visitor"
+           "TPEGjson",
+           "visitor",
+           "TPEGtimeindex",
+           "TPEGquery"
            ]
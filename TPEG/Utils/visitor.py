@@ -58,24 +58,29 @@ class Dispatcher(object):
   def __init__(self, param_name, fn):
     frame = inspect.currentframe().f_back.f_back
     top_level = frame.f_locals == frame.f_globals
-    self.param_index = inspect.getargspec(fn).args.index(param_name)
+    self.param_index = inspect.getfullargspec(fn).args.index(param_name)
     self.param_name = param_name
     self.targets = {}
+    # concrete type -> most specific target (None if none), resolved once per type
+    self.cache = {}
 
   def __call__(self, *args, **kw):
     typ = type(args[self.param_index])
-    d = self.targets.get(typ)
+    d = self.cache.get(typ, self)
 
+    if d is self:
+      d = self.cache[typ] = self.resolve(typ)
     if d is not None:
       return d(*args, **kw)
-    else:
-      t = self.targets
-      # find most specific visitor
-      types = inspect.getmro(typ)
-      for subtype in types:
-        if subtype in t:
-          # if found execute and return
-          return t[subtype](*args, **kw)
+
+  def resolve(self, typ):
+    # find most specific visitor
+    t = self.targets
+    for subtype in typ.__mro__:
+      if subtype in t:
+        return t[subtype]
+    return None
 
   def add_target(self, typ, target):
     self.targets[typ] = target
+    self.cache.clear()
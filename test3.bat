@@ -9,3 +9,6 @@ mkdir %RESULTDIR%
 
 forfiles /S /P sample_data /M *.tpeg /C "cmd.exe /C %PYTHON% %HOMEDIR%\TPEG\TPEG_parser.py @PATH >%RESULTDIR%\@FILE.result"
 forfiles /S /P sample_data /M *.tpg /C "cmd.exe /C %PYTHON% %HOMEDIR%\TPEG\TPEG_parser.py @PATH >%RESULTDIR%\@FILE.result"
+forfiles /S /P sample_data\EAW_sample_data /M *.tpeg /C "cmd.exe /C cd /d %HOMEDIR%\TPEG && %PYTHON% -m TpegMMC.TPEG_MMC_multipart @PATH >%RESULTDIR%\@FILE.mmc"
+forfiles /S /P sample_data /M *.cap /C "cmd.exe /C %PYTHON% %HOMEDIR%\TPEG\CAP_to_EAW.py @PATH >%RESULTDIR%\@FNAME.eaw"
+forfiles /P %RESULTDIR% /M *.eaw /C "cmd.exe /C %PYTHON% %HOMEDIR%\TPEG\TPEG_parser.py @PATH >%RESULTDIR%\@FNAME.result"
@@ -20,12 +20,19 @@ printf "    - .tpg->.result... "
 find $SAMPLE_DATA_DIR -name '*.tpg' -type f -exec bash -c '$PYTHON $HOME_DIR/TPEG/TPEG_parser.py {} > "$RESULT_DIR/$(basename {} .tpg).result"' \;
 printf " - Done\n"
 
+printf "    - .tpeg->.mmc (multi-part split check)... "
+find $SAMPLE_DATA_DIR/EAW_sample_data -name '*.tpeg' -type f -exec bash -c 'cd $HOME_DIR/TPEG && $PYTHON -m TpegMMC.TPEG_MMC_multipart {} > "$RESULT_DIR/$(basename {} .tpeg).mmc"' \;
+printf " - Done\n"
+
 printf "    - .cap->.txt... "
 find $SAMPLE_DATA_DIR -name '*.cap' -type f -exec bash -c '$PYTHON $HOME_DIR/CAP/CAP_to_text.py {} > "$RESULT_DIR/$(basename {} .cap).txt"' \;
 printf " - Done\n"
 
 printf "    - .cap->.eaw... "
-find $SAMPLE_DATA_DIR -name '*.cap' -type f -exec bash -c '$PYTHON $HOME_DIR/CAP/CAP_to_EAW.py {} > "$RESULT_DIR/$(basename {} .cap).eaw"' \;
+find $SAMPLE_DATA_DIR -name '*.cap' -type f -exec bash -c '$PYTHON $HOME_DIR/TPEG/CAP_to_EAW.py {} > "$RESULT_DIR/$(basename {} .cap).eaw"' \;
+printf " - Done\n"
+printf "    - .eaw->.result... "
+find $RESULT_DIR -name '*.eaw' -type f -exec bash -c '$PYTHON $HOME_DIR/TPEG/TPEG_parser.py {} > "$RESULT_DIR/$(basename {} .eaw).result"' \;
 printf " - Done\n"
 
 printf "    - .cap->.kml... "